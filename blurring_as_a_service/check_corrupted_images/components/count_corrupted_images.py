@@ -1,11 +1,12 @@
+import json
+import logging
 import os
 import sys
-import logging
+from collections import Counter
 
 from azure.ai.ml.constants import AssetTypes
 from mldesigner import Output, command_component
 
-
 sys.path.append("../../..")
 from aml_interface.azure_logging import AzureLoggingConfigurer  # noqa: E402
 
@@ -23,8 +24,13 @@ settings = BlurringAsAServiceSettings.get_settings()
 azureLoggingConfigurer = AzureLoggingConfigurer(settings["logging"], __name__)
 azureLoggingConfigurer.setup_baas_logging()
 
-from blurring_as_a_service.check_corrupted_images.source.count_corrupted_images_per_folder import count_corrupted_images_per_folder  # noqa: E402
-
+from blurring_as_a_service.check_corrupted_images.source.count_corrupted_images_per_folder import (  # noqa: E402
+    iter_corrupted_images_per_folder,
+)
+from blurring_as_a_service.check_corrupted_images.source.scan_index import (  # noqa: E402
+    SCAN_INDEX_FILENAME,
+    ScanIndex,
+)
 
 aml_experiment_settings = settings["aml_experiment_details"]
 
@@ -38,7 +44,77 @@ aml_experiment_settings = settings["aml_experiment_details"]
 )
 def count_corrupted_images(
     input_structured_container: Output(type=AssetTypes.URI_FOLDER),  # type: ignore # noqa: F821
+    report_folder: Output(type=AssetTypes.URI_FOLDER),  # type: ignore # noqa: F821
+    scan_index_folder: Output(type=AssetTypes.URI_FOLDER),  # type: ignore # noqa: F821
+    validation_tier: str = "cheap",
+    incremental: bool = False,
 ):
-    image_counts = count_corrupted_images_per_folder(input_structured_container)
-    for folder, count in image_counts.items():
-        logging.info(f"{folder}: {count} images")
+    """
+    Counts the corrupted images per folder of input_structured.
+
+    Parameters
+    ----------
+    input_structured_container:
+        Path of the mounted folder containing the images to check.
+    report_folder:
+        Where to store corrupted_images_report.jsonl, with one JSON line per folder
+        containing the folder path relative to input_structured and its counts.
+    validation_tier:
+        How thoroughly to validate the images: "cheap" (size and SOI/EOI markers),
+        "medium" (also parses the JPEG markers and frame dimensions) or "full"
+        (also decodes the images, which reads every image entirely).
+    scan_index_folder:
+        Where the scan index is kept between runs in incremental mode, outside
+        input_structured, so the audited data is never written to.
+    incremental:
+        Whether to keep a scan index in scan_index_folder, so only images that are
+        new or changed since the previous run are checked. The images whose status
+        changed, and the images that were removed, are written to
+        corrupted_images_delta.jsonl.
+    """
+    report_path = os.path.join(report_folder, "corrupted_images_report.jsonl")
+    scan_index = (
+        ScanIndex.load(
+            input_structured_container,
+            os.path.join(scan_index_folder, SCAN_INDEX_FILENAME),
+        )
+        if incremental
+        else None
+    )
+    total_counts: Counter = Counter()
+    scan_completed = False
+    try:
+        with open(report_path, "w") as report:
+            for folder, count in iter_corrupted_images_per_folder(
+                input_structured_container, validation_tier, scan_index=scan_index
+            ):
+                logging.info(f"{folder}: {count} images")
+                relative_folder = os.path.relpath(folder, input_structured_container)
+                report.write(json.dumps({"folder": relative_folder, **count}) + "\n")
+                report.flush()
+                total_counts.update(count)
+        scan_completed = True
+    finally:
+        if scan_index is not None:
+            # Images not seen in an interrupted scan may still exist, keep them.
+            scan_index.save(prune_removed=scan_completed)
+    logging.info(f"Total ({validation_tier} validation): {dict(total_counts)} images")
+    logging.info(f"Report written to {report_path}")
+
+    if scan_index is not None:
+        _write_delta_report(scan_index, report_folder)
+
+
+def _write_delta_report(scan_index: ScanIndex, report_folder: str):
+    delta_path = os.path.join(report_folder, "corrupted_images_delta.jsonl")
+    removed_paths = scan_index.removed_paths()
+    with open(delta_path, "w") as delta_report:
+        for delta in scan_index.deltas:
+            delta_report.write(json.dumps(vars(delta)) + "\n")
+        for path in removed_paths:
+            delta_report.write(json.dumps({"path": path, "removed": True}) + "\n")
+    logging.info(
+        f"Checked {scan_index.n_checked} new or changed images, "
+        f"{len(scan_index.deltas)} changed status and {len(removed_paths)} were "
+        f"removed since the previous scan. Deltas written to {delta_path}"
+    )
@@ -1,10 +1,37 @@
 import os
-from collections import defaultdict
+from collections import Counter, defaultdict
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+from functools import partial
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from blurring_as_a_service.check_corrupted_images.source.jpeg_validation import (
+    ValidationCode,
+    ValidationTier,
+    validate_jpeg,
+)
+from blurring_as_a_service.check_corrupted_images.source.scan_index import ScanIndex
 
 IMG_FORMATS = "jpeg", "jpg"
 
+# Cheap and medium checks only read a few bytes, so they are dominated by blob mount
+# latency. Full decodes are CPU bound and run in a process pool with one worker per
+# core instead.
+DEFAULT_MAX_WORKERS = 32
+MAX_CONCURRENT_FOLDERS = 4
+
 
-def count_corrupted_images_per_folder(input_container: str) -> defaultdict:
+def count_corrupted_images_per_folder(
+    input_container: str,
+    validation_tier: Union[ValidationTier, str] = ValidationTier.CHEAP,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    scan_index: Optional[ScanIndex] = None,
+) -> defaultdict:
     """
     Count the number of corrupted images in each folder within the input container.
 
@@ -12,68 +39,143 @@ def count_corrupted_images_per_folder(input_container: str) -> defaultdict:
     ----------
     input_container : str
         The path to the input container directory.
+    validation_tier : Union[ValidationTier, str]
+        How thoroughly to validate the images: "cheap", "medium" or "full",
+        see ValidationTier.
+    max_workers : int
+        Number of threads checking images concurrently. Ignored for the full tier,
+        which uses one process per CPU core.
+    scan_index : Optional[ScanIndex]
+        Results of previous scans. If given, only new or changed images are checked
+        and the results are recorded in the index.
 
     Returns
     -------
     defaultdict
         A nested defaultdict where the keys are folder paths and the values are dictionaries
-        with counts of total, good, empty, and corrupted images.
+        with counts of total, good, empty, and corrupted images, and of the images
+        checked in this run if a scan index is used.
     """
     image_counts: defaultdict[str, defaultdict[str, int]] = defaultdict(
         lambda: defaultdict(int)
     )
-    for root, _, files in os.walk(input_container):
-        total_images = good_images = empty_images = corrupted_images = 0
-        for file in files:
-            if file.lower().endswith(IMG_FORMATS):
-                validation_code = check_jpgs(os.path.join(root, file))
-                total_images += 1
-                if validation_code == 0:
-                    good_images += 1
-                elif validation_code == 1:
-                    empty_images += 1
-                elif validation_code == 2:
-                    corrupted_images += 1
-
-        if total_images > 0:
-            image_counts[root]["total_images"] += total_images
-        if good_images > 0:
-            image_counts[root]["good_images"] += good_images
-        if empty_images > 0:
-            image_counts[root]["empty_images"] += empty_images
-        if corrupted_images > 0:
-            image_counts[root]["corrupted_images"] += corrupted_images
-
+    for root, folder_counts in iter_corrupted_images_per_folder(
+        input_container, validation_tier, max_workers, scan_index
+    ):
+        image_counts[root].update(folder_counts)
     return image_counts
 
 
-def check_jpgs(filename: str) -> int:
+def iter_corrupted_images_per_folder(
+    input_container: str,
+    validation_tier: Union[ValidationTier, str] = ValidationTier.CHEAP,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    scan_index: Optional[ScanIndex] = None,
+) -> Iterator[Tuple[str, Dict[str, int]]]:
     """
-    Checks if a jpg image file is corrupted based on its size and end-of-file marker.
+    Checks the images of all folders within the input container concurrently and
+    yields the counts of each folder as soon as all its images have been checked.
+    Checks are I/O bound on blob mounts, so they are run in a thread pool that is
+    shared by all folders, while the directory tree is still being walked. Full
+    decodes are CPU bound, so for that tier the images are checked in a process pool.
 
     Parameters
     ----------
-    filename : str
-        The path to the image file to be checked.
+    input_container : str
+        The path to the input container directory.
+    validation_tier : Union[ValidationTier, str]
+        How thoroughly to validate the images: "cheap", "medium" or "full",
+        see ValidationTier.
+    max_workers : int
+        Number of threads checking images concurrently. Ignored for the full tier,
+        which uses one process per CPU core.
+    scan_index : Optional[ScanIndex]
+        Results of previous scans. If given, only new or changed images are checked
+        and the results are recorded in the index.
 
     Returns
     -------
-    int
-        A validation code indicating the status of the image file:
-        - 0: The image file is valid.
-        - 1: The image file is empty.
-        - 2: The image file does not end with the JPEG end-of-image marker (0xFFD9).
+    Iterator[Tuple[str, Dict[str, int]]]
+        Tuples of folder path and the non-zero counts of total, good, empty, and
+        corrupted images in that folder, in order of completion. Folders without
+        images are skipped.
     """
-    validation_code = 0
-    statfile = os.stat(filename)
-    filesize = statfile.st_size
-    if filesize == 0:
-        validation_code = 1
+    validation_tier = ValidationTier(validation_tier)
+    if validation_tier == ValidationTier.FULL:
+        file_executor: Executor = ProcessPoolExecutor()
     else:
-        with open(filename, "rb") as f:
-            check_chars = f.read()[-2:]
-        if (
-            check_chars != b"\xff\xd9"
-        ):  # Check if the last two bytes are the JPEG end-of-image marker
-            validation_code = 2
-    return validation_code
+        file_executor = ThreadPoolExecutor(max_workers=max_workers)
+    with (
+        file_executor,
+        ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FOLDERS) as folder_executor,
+    ):
+        pending: Set[Future] = set()
+        for root, _, files in os.walk(input_container):
+            image_paths = [
+                os.path.join(root, file)
+                for file in files
+                if file.lower().endswith(IMG_FORMATS)
+            ]
+            if not image_paths:
+                continue
+            pending.add(
+                folder_executor.submit(
+                    _count_folder,
+                    root,
+                    image_paths,
+                    file_executor,
+                    validation_tier,
+                    scan_index,
+                )
+            )
+            done = {future for future in pending if future.done()}
+            pending -= done
+            for future in done:
+                yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
+
+
+def _count_folder(
+    root: str,
+    image_paths: List[str],
+    file_executor: Executor,
+    validation_tier: ValidationTier,
+    scan_index: Optional[ScanIndex],
+) -> Tuple[str, Dict[str, int]]:
+    validation_codes: Counter = Counter()
+    paths_to_check = image_paths
+    if scan_index is not None:
+        stat_results = {path: os.stat(path) for path in image_paths}
+        paths_to_check = []
+        for path in image_paths:
+            validation_code = scan_index.lookup(
+                path, stat_results[path], validation_tier
+            )
+            if validation_code is None:
+                paths_to_check.append(path)
+            else:
+                validation_codes[validation_code] += 1
+
+    checked_codes = file_executor.map(
+        partial(validate_jpeg, validation_tier=validation_tier),
+        paths_to_check,
+        chunksize=16 if isinstance(file_executor, ProcessPoolExecutor) else 1,
+    )
+    for path, validation_code in zip(paths_to_check, checked_codes):
+        validation_codes[validation_code] += 1
+        if scan_index is not None:
+            scan_index.record(
+                path, stat_results[path], validation_tier, validation_code
+            )
+    empty_images = validation_codes[ValidationCode.EMPTY]
+    good_images = validation_codes[ValidationCode.VALID]
+    folder_counts = {
+        "total_images": len(image_paths),
+        "good_images": good_images,
+        "empty_images": empty_images,
+        "corrupted_images": len(image_paths) - good_images - empty_images,
+    }
+    if scan_index is not None:
+        folder_counts["checked_images"] = len(paths_to_check)
+    return root, {key: count for key, count in folder_counts.items() if count > 0}
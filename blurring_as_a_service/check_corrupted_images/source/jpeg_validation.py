@@ -0,0 +1,226 @@
+import os
+import struct
+from enum import Enum, IntEnum, unique
+
+import numpy as np
+from PIL import Image
+
+JPEG_SOI_MARKER = b"\xff\xd8"
+JPEG_EOI_MARKER = b"\xff\xd9"
+
+# Start-of-frame markers (SOF0-SOF15), except DHT (0xC4), JPG (0xC8) and DAC (0xCC).
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7}
+SOF_MARKERS |= {0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+SOS_MARKER = 0xDA
+# Markers without a length field: TEM and RST0-RST7.
+STANDALONE_MARKERS = {0x01} | set(range(0xD0, 0xD8))
+# libjpeg does not fail on scan data that ends early, it fills the missing blocks
+# with this value and only emits a warning.
+LIBJPEG_MISSING_DATA_FILL = 128
+# Number of bottom pixel rows that must all be filled before an image is considered
+# truncated. The fill covers whole rows of 8 or 16 pixel high blocks, minus one row
+# blended with the data above it by chroma upsampling.
+MISSING_DATA_MIN_ROWS = 4
+
+
+@unique
+class ValidationCode(IntEnum):
+    VALID = 0
+    EMPTY = 1
+    MISSING_EOI = 2
+    MISSING_SOI = 3
+    INVALID_STRUCTURE = 4
+    INVALID_DIMENSIONS = 5
+    DECODE_FAILED = 6
+
+
+@unique
+class ValidationTier(Enum):
+    """
+    How thoroughly images are validated, each tier includes the checks of the
+    previous ones.
+
+    - cheap: file size and the SOI/EOI markers, reading four bytes per image.
+    - medium: parses the marker segments up to the start of the scan and the frame
+      dimensions, without decoding pixels. Segment payloads are skipped, so only
+      a few hundred bytes per image are read.
+    - full: decodes the whole image. This reads the entire file and is CPU bound,
+      so it should be run in a process pool. Truncation that the decoder tolerates
+      is detected heuristically, see decode_jpeg.
+    """
+
+    CHEAP = "cheap"
+    MEDIUM = "medium"
+    FULL = "full"
+
+
+def check_jpgs(filename: str, check_header: bool = False) -> int:
+    """
+    Checks if a jpg image file is corrupted based on its size and end-of-file marker.
+    Only the bytes needed for the check are read, so the whole image is never
+    transferred over the blob mount.
+
+    Parameters
+    ----------
+    filename : str
+        The path to the image file to be checked.
+    check_header : bool
+        Whether to also check the first two bytes for the JPEG start-of-image marker.
+
+    Returns
+    -------
+    int
+        A validation code indicating the status of the image file:
+        - 0: The image file is valid.
+        - 1: The image file is empty.
+        - 2: The image file does not end with the JPEG end-of-image marker (0xFFD9).
+        - 3: The image file does not start with the JPEG start-of-image marker (0xFFD8),
+             only checked if check_header is True.
+    """
+    with open(filename, "rb") as f:
+        filesize = os.fstat(f.fileno()).st_size
+        if filesize == 0:
+            return ValidationCode.EMPTY
+        if filesize < len(JPEG_EOI_MARKER):
+            return ValidationCode.MISSING_EOI
+        if check_header and f.read(len(JPEG_SOI_MARKER)) != JPEG_SOI_MARKER:
+            return ValidationCode.MISSING_SOI
+        f.seek(-len(JPEG_EOI_MARKER), os.SEEK_END)
+        if f.read(len(JPEG_EOI_MARKER)) != JPEG_EOI_MARKER:
+            return ValidationCode.MISSING_EOI
+    return ValidationCode.VALID
+
+
+def validate_jpeg(
+    filename: str, validation_tier: ValidationTier = ValidationTier.CHEAP
+) -> int:
+    """
+    Validates a jpg image file with the checks of the given tier, see ValidationTier.
+
+    Parameters
+    ----------
+    filename : str
+        The path to the image file to be checked.
+    validation_tier : ValidationTier
+        How thoroughly to validate the image.
+
+    Returns
+    -------
+    int
+        A validation code indicating the status of the image file, the codes of
+        check_jpgs and:
+        - 4: The marker segments are malformed, or there is no frame or scan header.
+        - 5: The frame header declares an image with a zero width or height.
+        - 6: The image could not be decoded, e.g. because the scan data is truncated.
+    """
+    validation_tier = ValidationTier(validation_tier)
+    validation_code = check_jpgs(filename, check_header=True)
+    if (
+        validation_code != ValidationCode.VALID
+        or validation_tier == ValidationTier.CHEAP
+    ):
+        return validation_code
+
+    validation_code, dimensions = parse_jpeg_markers(filename)
+    if (
+        validation_code != ValidationCode.VALID
+        or validation_tier == ValidationTier.MEDIUM
+    ):
+        return validation_code
+
+    return decode_jpeg(filename, dimensions)
+
+
+def parse_jpeg_markers(filename: str):
+    """
+    Walks the marker segments from the start-of-image marker up to the start-of-scan
+    marker, reading only the marker headers and the frame header.
+
+    Parameters
+    ----------
+    filename : str
+        The path to the image file to be checked.
+
+    Returns
+    -------
+    Tuple[int, Optional[Tuple[int, int]]]
+        The validation code and the (width, height) declared by the frame header.
+    """
+    dimensions = None
+    with open(filename, "rb") as f:
+        filesize = os.fstat(f.fileno()).st_size
+        position = len(JPEG_SOI_MARKER)
+        f.seek(position)
+        while True:
+            marker_header = f.read(2)
+            if len(marker_header) < 2 or marker_header[0] != 0xFF:
+                return ValidationCode.INVALID_STRUCTURE, dimensions
+            marker = marker_header[1]
+            if marker == 0xFF:
+                # Fill byte, the marker code follows.
+                f.seek(-1, os.SEEK_CUR)
+                position += 1
+                continue
+            if marker in STANDALONE_MARKERS:
+                position += 2
+                continue
+            length_bytes = f.read(2)
+            if len(length_bytes) < 2:
+                return ValidationCode.INVALID_STRUCTURE, dimensions
+            (length,) = struct.unpack(">H", length_bytes)
+            if length < 2 or position + 2 + length > filesize:
+                return ValidationCode.INVALID_STRUCTURE, dimensions
+            if marker in SOF_MARKERS:
+                frame_header = f.read(5)
+                if len(frame_header) < 5:
+                    return ValidationCode.INVALID_STRUCTURE, dimensions
+                _, height, width = struct.unpack(">BHH", frame_header)
+                if width == 0 or height == 0:
+                    return ValidationCode.INVALID_DIMENSIONS, (width, height)
+                dimensions = (width, height)
+            if marker == SOS_MARKER:
+                if dimensions is None:
+                    return ValidationCode.INVALID_STRUCTURE, dimensions
+                return ValidationCode.VALID, dimensions
+            position += 2 + length
+            f.seek(position)
+
+
+def decode_jpeg(filename: str, dimensions=None) -> int:
+    """
+    Fully decodes an image, failing on truncated or corrupt scan data. PIL raises an
+    error when the file ends before the scan data does, but scan data that is
+    truncated and still followed by an EOI marker decodes without errors. That case
+    is detected by the bottom MISSING_DATA_MIN_ROWS pixel rows being exactly
+    LIBJPEG_MISSING_DATA_FILL in every channel.
+
+    This is a heuristic: a valid image whose bottom rows are flat mid-grey, e.g. a
+    grey letterbox, is a false positive, and an image truncated within its last
+    row of blocks, or a progressive image missing only its later scans, is not
+    detected.
+
+    Parameters
+    ----------
+    filename : str
+        The path to the image file to be checked.
+    dimensions : Optional[Tuple[int, int]]
+        The (width, height) the decoded image is expected to have.
+
+    Returns
+    -------
+    int
+        ValidationCode.VALID or ValidationCode.DECODE_FAILED.
+    """
+    try:
+        with Image.open(filename) as image:
+            image.load()
+            if dimensions is not None and image.size != tuple(dimensions):
+                return ValidationCode.DECODE_FAILED
+            width, height = image.size
+            n_rows = min(height, MISSING_DATA_MIN_ROWS)
+            bottom_rows = np.asarray(image.crop((0, height - n_rows, width, height)))
+            if np.all(bottom_rows == LIBJPEG_MISSING_DATA_FILL):
+                return ValidationCode.DECODE_FAILED
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        return ValidationCode.DECODE_FAILED
+    return ValidationCode.VALID
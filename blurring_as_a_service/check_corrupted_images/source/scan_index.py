@@ -0,0 +1,185 @@
+import csv
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from blurring_as_a_service.check_corrupted_images.source.jpeg_validation import (
+    ValidationCode,
+    ValidationTier,
+)
+
+SCAN_INDEX_FILENAME = "corrupted_images_scan_index.csv"
+TIER_ORDER = list(ValidationTier)
+
+
+class ScanIndexEntry(NamedTuple):
+    size: int
+    mtime_ns: int
+    validation_tier: ValidationTier
+    validation_code: int
+
+
+@dataclass
+class ScanDelta:
+    path: str
+    previous_code: Optional[int]
+    validation_code: int
+
+
+class ScanIndex:
+    """
+    Persisted results of previous corruption scans, keyed by the image path relative
+    to the scanned container. Uploaded images are immutable, so an image whose size
+    and modification time did not change since it was last checked does not have to
+    be checked again, unless it is now validated with a more thorough tier.
+
+    The index is stored as a CSV file outside the scanned container, so checking
+    the data never writes to it, and is safe to use from multiple threads.
+
+    Parameters
+    ----------
+    root_dir : str
+        The scanned container, paths in the index are relative to it.
+    index_path : str
+        Where the index is stored, e.g. SCAN_INDEX_FILENAME in a folder that is
+        kept between runs.
+    """
+
+    FIELDNAMES = ["path", "size", "mtime_ns", "validation_tier", "validation_code"]
+
+    def __init__(self, root_dir: str, index_path: str):
+        self.root_dir = root_dir
+        self.index_path = index_path
+        self._entries: Dict[str, ScanIndexEntry] = {}
+        self._seen: Set[str] = set()
+        self._deltas: List[ScanDelta] = []
+        self._n_checked = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, root_dir: str, index_path: str) -> "ScanIndex":
+        """
+        Loads the index of root_dir from index_path, or returns an empty index if
+        none exists yet.
+        """
+        scan_index = cls(root_dir, index_path)
+        if os.path.isfile(scan_index.index_path):
+            with open(scan_index.index_path, newline="") as f:
+                for row in csv.DictReader(f):
+                    scan_index._entries[row["path"]] = ScanIndexEntry(
+                        size=int(row["size"]),
+                        mtime_ns=int(row["mtime_ns"]),
+                        validation_tier=ValidationTier(row["validation_tier"]),
+                        validation_code=int(row["validation_code"]),
+                    )
+        return scan_index
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(
+        self, path: str, stat_result: os.stat_result, validation_tier: ValidationTier
+    ) -> Optional[int]:
+        """
+        Returns the stored validation code of an image, or None if it has to be
+        checked because it is new, changed or was checked with a less thorough tier.
+        Images that failed a check fail every more thorough tier as well, so their
+        code is always reused.
+        """
+        key = self._key(path)
+        with self._lock:
+            self._seen.add(key)
+            entry = self._entries.get(key)
+        if (
+            entry is None
+            or entry.size != stat_result.st_size
+            or entry.mtime_ns != stat_result.st_mtime_ns
+        ):
+            return None
+        if entry.validation_code == ValidationCode.VALID and TIER_ORDER.index(
+            entry.validation_tier
+        ) < TIER_ORDER.index(validation_tier):
+            return None
+        return entry.validation_code
+
+    def record(
+        self,
+        path: str,
+        stat_result: os.stat_result,
+        validation_tier: ValidationTier,
+        validation_code: int,
+    ) -> None:
+        """
+        Stores the result of checking an image. A delta is recorded if the image is
+        new and not valid, or if its validation code changed.
+        """
+        key = self._key(path)
+        entry = ScanIndexEntry(
+            size=stat_result.st_size,
+            mtime_ns=stat_result.st_mtime_ns,
+            validation_tier=validation_tier,
+            validation_code=int(validation_code),
+        )
+        with self._lock:
+            self._seen.add(key)
+            previous_entry = self._entries.get(key)
+            self._entries[key] = entry
+            self._n_checked += 1
+            previous_code = previous_entry.validation_code if previous_entry else None
+            if (previous_code is None and validation_code != ValidationCode.VALID) or (
+                previous_code is not None and previous_code != validation_code
+            ):
+                self._deltas.append(ScanDelta(key, previous_code, int(validation_code)))
+
+    @property
+    def deltas(self) -> List[ScanDelta]:
+        return list(self._deltas)
+
+    @property
+    def n_checked(self) -> int:
+        """Number of images checked since the index was loaded."""
+        return self._n_checked
+
+    def removed_paths(self) -> List[str]:
+        """
+        Paths in the index that were not seen since it was loaded, i.e. images that
+        were deleted, assuming the whole container has been scanned.
+        """
+        return sorted(set(self._entries) - self._seen)
+
+    def save(self, prune_removed: bool = True) -> None:
+        """
+        Writes the index to a temporary file first and then replaces the previous
+        index, so an interrupted run never leaves a truncated index behind.
+
+        Parameters
+        ----------
+        prune_removed : bool
+            Whether to drop entries of images that were not seen in this scan.
+        """
+        with self._lock:
+            entries = {
+                key: entry
+                for key, entry in self._entries.items()
+                if not prune_removed or key in self._seen
+            }
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.FIELDNAMES)
+            for key in sorted(entries):
+                entry = entries[key]
+                writer.writerow(
+                    [
+                        key,
+                        entry.size,
+                        entry.mtime_ns,
+                        entry.validation_tier.value,
+                        entry.validation_code,
+                    ]
+                )
+        os.replace(tmp_path, self.index_path)
+
+    def _key(self, path: str) -> str:
+        return os.path.relpath(path, self.root_dir)
@@ -1,3 +1,5 @@
+import os
+
 from aml_interface.azure_logging import AzureLoggingConfigurer  # noqa: E402
 from azure.ai.ml import Output
 from azure.ai.ml.dsl import pipeline
@@ -27,11 +29,34 @@ def check_corrupted_images_pipeline():
         settings["inference_pipeline"]["datastore_input_structured"]
     )
 
-    count_corrupted_images_step = count_corrupted_images()
+    check_corrupted_images_settings = settings["check_corrupted_images"] or {}
+    incremental = check_corrupted_images_settings.get("incremental", False)
+    count_corrupted_images_step = count_corrupted_images(
+        validation_tier=check_corrupted_images_settings.get("validation_tier", "cheap"),
+        incremental=incremental,
+    )
 
     count_corrupted_images_step.outputs.input_structured_container = Output(
         type="uri_folder", mode="rw_mount", path=azureml_output_formatted
     )
+    if incremental:
+        # The scan index must survive between runs, but not inside the audited data.
+        scan_index_datastore = check_corrupted_images_settings.get(
+            "scan_index_datastore"
+        )
+        if not scan_index_datastore:
+            raise ValueError(
+                "check_corrupted_images.incremental requires "
+                "check_corrupted_images.scan_index_datastore."
+            )
+        count_corrupted_images_step.outputs.scan_index_folder = Output(
+            type="uri_folder",
+            mode="rw_mount",
+            path=os.path.join(
+                aml_interface.get_datastore_full_path(scan_index_datastore),
+                f"{settings['customer']}_corrupted_images_scan_index",
+            ),
+        )
 
     return {}
 
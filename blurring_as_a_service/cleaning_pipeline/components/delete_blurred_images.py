@@ -1,6 +1,5 @@
 import logging
 import os
-import re
 import sys
 
 from azure.ai.ml.constants import AssetTypes
@@ -21,7 +20,20 @@ log_settings = BlurringAsAServiceSettings.set_from_yaml(config_path)["logging"]
 azureLoggingConfigurer = AzureLoggingConfigurer(settings["logging"], __name__)
 azureLoggingConfigurer.setup_baas_logging()
 
-from cvtoolkit.helpers.file_helpers import delete_file, find_image_paths  # noqa: E402
+from blurring_as_a_service.cleaning_pipeline.source.blurred_images_cleaner import (  # noqa: E402
+    CHECKPOINT_FILENAME,
+    DeletionCheckpoint,
+    delete_images,
+    get_pending_upload_folders,
+    group_processed_images_by_upload_folder,
+    iter_blurred_image_paths,
+)
+from blurring_as_a_service.cleaning_pipeline.source.processed_images import (  # noqa: E402
+    iter_processed_images,
+)
+from blurring_as_a_service.inference_pipeline.source.db_utils import (  # noqa: E402
+    create_db_connector,
+)
 
 aml_experiment_settings = settings["aml_experiment_details"]
 logger = logging.getLogger("delete_blurred_images")
@@ -38,6 +50,8 @@ def delete_blurred_images(
     _: Input(type=AssetTypes.URI_FOLDER),  # type: ignore # noqa: F821
     output_folder: Input(type=AssetTypes.URI_FOLDER),  # type: ignore # noqa: F821
     input_structured_folder: Output(type=AssetTypes.URI_FOLDER),  # type: ignore # noqa: F821
+    cleanup_mode: str = "output_folder",
+    verify_output_exists: bool = True,
 ):
     """
     Deletes from input_structured images that have already been blurred.
@@ -50,25 +64,44 @@ def delete_blurred_images(
     output_folder:
         Path of the mounted folder containing the blurred images.
     input_structured_folder:
-        Path of the mounted folder containing the images to delete.
+        Path of the mounted folder containing the images to delete. It also holds
+        the checkpoint of the folders that are done, so a killed job can resume.
+        The checkpoint is removed when all images were deleted.
+    cleanup_mode:
+        How to find the images to delete: "output_folder" walks the output folder,
+        "database" queries the images marked processed in ImageProcessingStatus,
+        only for the upload folders in input_structured that are not empty.
+    verify_output_exists:
+        In database mode, only delete images whose blurred version exists in the
+        output folder.
     """
-    for image_path in find_image_paths(output_folder):
-        delete_output_images_from_input_structured(image_path, input_structured_folder)
-
-
-def delete_output_images_from_input_structured(
-    output_image_path, input_structured_folder
-):
-    input_structured_path = replace_azure_uri_folder_path(
-        output_image_path, input_structured_folder
+    checkpoint = DeletionCheckpoint(
+        os.path.join(input_structured_folder, CHECKPOINT_FILENAME)
     )
-    if input_structured_path:
-        delete_file(input_structured_path)
-
-
-def replace_azure_uri_folder_path(path, new_uri_folder_path):
-    match = re.search(r"/wd/[^/]+/(.+)", path)
-    if match:
-        return new_uri_folder_path + "/" + match.group(1)
+    db_connector = None
+    if cleanup_mode == "output_folder":
+        image_groups = iter_blurred_image_paths(output_folder)
+    elif cleanup_mode == "database":
+        upload_folders = get_pending_upload_folders(input_structured_folder, checkpoint)
+        logger.info(f"Upload folders to clean: {len(upload_folders)}")
+        db_connector = create_db_connector()
+        db_connector.create_connection()
+        image_groups = group_processed_images_by_upload_folder(
+            iter_processed_images(db_connector, settings["customer"], upload_folders),
+            output_folder=output_folder if verify_output_exists else None,
+        )
     else:
-        print("There might be an error on the replace_azure_uri_folder_path function.")
+        raise ValueError(
+            f"Unknown cleanup_mode {cleanup_mode}, expected output_folder or database."
+        )
+
+    try:
+        summary = delete_images(
+            image_groups, input_structured_folder, checkpoint=checkpoint
+        )
+    finally:
+        if db_connector is not None:
+            db_connector.close_connection()
+    logger.info(f"Deleted blurred images from input_structured: {summary}")
+    if summary.n_failed == 0:
+        checkpoint.clear()
@@ -0,0 +1,276 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from itertools import groupby
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+from blurring_as_a_service.pre_inference_pipeline.source.image_paths import (
+    IMG_FORMATS,
+    split_image_filename,
+)
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FILENAME = "delete_blurred_images_checkpoint.txt"
+UPLOAD_DATE_FORMAT = "%Y-%m-%d_%H_%M_%S"
+DEFAULT_BATCH_SIZE = 1000
+# Deletes on blob mounts are I/O bound, the workers mostly wait on the network.
+DEFAULT_MAX_WORKERS = 16
+
+
+class DeletionStatus(Enum):
+    DELETED = "deleted"
+    MISSING = "missing"
+    FAILED = "failed"
+
+
+@dataclass
+class DeletionSummary:
+    n_deleted: int = 0
+    n_missing: int = 0
+    n_failed: int = 0
+    n_skipped_folders: int = 0
+    n_unresolved_folders: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.n_deleted} images deleted, {self.n_missing} already missing, "
+            f"{self.n_failed} failed, {self.n_skipped_folders} folders skipped "
+            f"from a previous run, {self.n_unresolved_folders} folders without any "
+            f"existing image"
+        )
+
+
+class DeletionCheckpoint:
+    """
+    Keeps track of the folders whose images have all been deleted, so a job that
+    was killed continues with the first folder it did not finish. A folder is
+    appended to the checkpoint file as soon as it is done.
+
+    Parameters
+    ----------
+    checkpoint_path : str
+        Path of the checkpoint file, it is created if it does not exist.
+    """
+
+    def __init__(self, checkpoint_path: str):
+        self.checkpoint_path = checkpoint_path
+        self.completed_folders: Set[str] = set()
+        if os.path.isfile(checkpoint_path):
+            with open(checkpoint_path) as f:
+                self.completed_folders = {line.rstrip("\n") for line in f if line}
+            logger.info(
+                f"Resuming from checkpoint {checkpoint_path}, "
+                f"{len(self.completed_folders)} folders already done."
+            )
+
+    def is_done(self, folder: str) -> bool:
+        return folder in self.completed_folders
+
+    def mark_done(self, folder: str) -> None:
+        self.completed_folders.add(folder)
+        with open(self.checkpoint_path, "a") as f:
+            f.write(folder + "\n")
+
+    def clear(self) -> None:
+        """Removes the checkpoint once the whole run has finished."""
+        self.completed_folders = set()
+        if os.path.isfile(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+
+def iter_blurred_image_paths(output_folder: str) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Walks the output folder incrementally, one folder at a time, instead of
+    listing the whole tree first.
+
+    Parameters
+    ----------
+    output_folder : str
+        Path of the mounted folder containing the blurred images.
+
+    Returns
+    -------
+    Iterator[Tuple[str, List[str]]]
+        Tuples of a folder and the images in it, both relative to output_folder.
+        The blurred images have the same relative paths as their originals in
+        input_structured.
+    """
+    for root, dirs, files in os.walk(output_folder):
+        dirs.sort()
+        relative_folder = os.path.relpath(root, output_folder)
+        image_paths = [
+            os.path.normpath(os.path.join(relative_folder, file))
+            for file in sorted(files)
+            if os.path.splitext(file)[1].lstrip(".").lower() in IMG_FORMATS
+        ]
+        if image_paths:
+            yield relative_folder, image_paths
+
+
+def get_pending_upload_folders(
+    input_structured_folder: str, checkpoint: Optional[DeletionCheckpoint] = None
+) -> List[str]:
+    """
+    Returns the upload folders in input_structured that still contain files, so
+    only the images that have not been cleaned yet are queried from the database.
+
+    Parameters
+    ----------
+    input_structured_folder : str
+        Path of the mounted folder containing one folder per upload, named
+        'YYYY-MM-DD_HH_MM_SS'. Other folders and files are ignored.
+    checkpoint : Optional[DeletionCheckpoint]
+        Checkpoint of the upload folders that are already done, these are skipped.
+
+    Returns
+    -------
+    List[str]
+        The sorted names of the upload folders left to clean.
+    """
+    upload_folders = []
+    with os.scandir(input_structured_folder) as entries:
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            try:
+                datetime.strptime(entry.name, UPLOAD_DATE_FORMAT)
+            except ValueError:
+                continue
+            if checkpoint is not None and checkpoint.is_done(entry.name):
+                continue
+            with os.scandir(entry.path) as folder:
+                if next(folder, None) is not None:
+                    upload_folders.append(entry.name)
+    return sorted(upload_folders)
+
+
+def group_processed_images_by_upload_folder(
+    image_filenames: Iterable[str],
+    output_folder: Optional[str] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Groups the images marked processed in the database by the folder in
+    input_structured they were uploaded to, so they can be deleted without listing
+    the output folder.
+
+    Parameters
+    ----------
+    image_filenames : Iterable[str]
+        The image_filename of the images in the database, the path relative to
+        input_structured, see to_image_filename. Ordered, so the images of a folder
+        are next to each other.
+    output_folder : Optional[str]
+        If given, an image is only returned if its blurred version exists in this
+        folder. The existence checks of a group are run concurrently.
+    max_workers : int
+        Number of existence checks run at the same time.
+
+    Returns
+    -------
+    Iterator[Tuple[str, List[str]]]
+        Tuples of the upload folder and the paths of the images in it, relative to
+        input_structured.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for upload_folder, image_paths in groupby(
+            image_filenames, key=lambda name: split_image_filename(name)[0]
+        ):
+            image_paths = list(image_paths)
+            if output_folder is not None:
+                exists = executor.map(
+                    os.path.exists,
+                    [os.path.join(output_folder, path) for path in image_paths],
+                )
+                n_images = len(image_paths)
+                image_paths = [
+                    path for path, found in zip(image_paths, exists) if found
+                ]
+                if len(image_paths) < n_images:
+                    logger.warning(
+                        f"{upload_folder}: {n_images - len(image_paths)} images marked "
+                        f"processed have no blurred output, they are not deleted."
+                    )
+            yield upload_folder, image_paths
+
+
+def delete_images(
+    image_groups: Iterable[Tuple[str, List[str]]],
+    input_structured_folder: str,
+    checkpoint: Optional[DeletionCheckpoint] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> DeletionSummary:
+    """
+    Deletes images from input_structured in parallel batches, one group at a time.
+    Images that no longer exist are counted but not treated as errors, so deleting
+    the same images again is harmless.
+
+    Parameters
+    ----------
+    image_groups : Iterable[Tuple[str, List[str]]]
+        Tuples of a group name, e.g. a folder, and the paths of the images to
+        delete, relative to input_structured_folder. A group is marked done in the
+        checkpoint once all of its images have been handled without failures,
+        unless none of them existed.
+    input_structured_folder : str
+        Path of the mounted folder containing the images to delete.
+    checkpoint : Optional[DeletionCheckpoint]
+        Checkpoint of the groups that are already done, these are skipped.
+    batch_size : int
+        Number of images submitted to the workers at once.
+    max_workers : int
+        Number of images deleted at the same time.
+
+    Returns
+    -------
+    DeletionSummary
+        Counts of deleted, missing and failed images and skipped groups.
+    """
+    summary = DeletionSummary()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for group, image_paths in image_groups:
+            if checkpoint is not None and checkpoint.is_done(group):
+                summary.n_skipped_folders += 1
+                continue
+            n_failed_before, n_missing_before = summary.n_failed, summary.n_missing
+            for start in range(0, len(image_paths), batch_size):
+                batch = [
+                    os.path.join(input_structured_folder, image_path)
+                    for image_path in image_paths[start : start + batch_size]
+                ]
+                for status in executor.map(_delete_file, batch):
+                    if status == DeletionStatus.DELETED:
+                        summary.n_deleted += 1
+                    elif status == DeletionStatus.MISSING:
+                        summary.n_missing += 1
+                    else:
+                        summary.n_failed += 1
+            logger.info(f"{group}: {len(image_paths)} images handled")
+            if image_paths and summary.n_missing - n_missing_before == len(image_paths):
+                # Most likely the paths do not resolve in input_structured, so the
+                # group is not marked done and is tried again by the next run.
+                logger.warning(
+                    f"{group}: none of the {len(image_paths)} images exist in "
+                    f"{input_structured_folder}, the group is not marked done."
+                )
+                summary.n_unresolved_folders += 1
+                continue
+            if checkpoint is not None and summary.n_failed == n_failed_before:
+                checkpoint.mark_done(group)
+    return summary
+
+
+def _delete_file(path: str) -> DeletionStatus:
+    try:
+        os.remove(path)
+        return DeletionStatus.DELETED
+    except FileNotFoundError:
+        return DeletionStatus.MISSING
+    except OSError as e:
+        logger.error(f"Could not delete {path}: {e}")
+        return DeletionStatus.FAILED
@@ -0,0 +1,145 @@
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Copies between blob mounts are I/O bound, the workers mostly wait on the network.
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_DELAY = 1.0
+
+
+class CopyStatus(Enum):
+    COPIED = "copied"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+
+@dataclass
+class CopySummary:
+    n_copied: int = 0
+    n_skipped: int = 0
+    n_failed: int = 0
+    bytes_copied: int = 0
+    elapsed: float = 0.0
+    failed_files: List[str] = field(default_factory=list)
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes_copied / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.n_copied} files copied, {self.n_skipped} skipped, "
+            f"{self.n_failed} failed, {self.bytes_copied / 1e6:.1f} MB in "
+            f"{self.elapsed:.1f}s ({self.bytes_per_second / 1e6:.1f} MB/s)"
+        )
+
+
+def copy_files(
+    relative_paths: Iterable[str],
+    source_folder: str,
+    destination_folder: str,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    retry_delay: float = DEFAULT_RETRY_DELAY,
+) -> CopySummary:
+    """
+    Copies files from the source folder to the destination folder concurrently,
+    keeping their relative paths.
+
+    Files that already exist in the destination with the same size are skipped:
+    uploaded images are never modified, so they are the same image. Copies that
+    fail with an I/O error are retried with exponential backoff, a missing source
+    file is not retried. Failures do not stop the other copies, they are listed in
+    the returned summary.
+
+    Parameters
+    ----------
+    relative_paths : Iterable[str]
+        Paths of the files to copy, relative to source_folder.
+    source_folder : str
+        Root folder to copy from.
+    destination_folder : str
+        Root folder to copy to.
+    max_workers : int
+        Maximum number of files copied at the same time.
+    max_retries : int
+        How many times a failed copy is retried.
+    retry_delay : float
+        Seconds to wait before the first retry, doubled on every next retry.
+
+    Returns
+    -------
+    CopySummary
+        The number of copied, skipped and failed files and the copy throughput.
+    """
+    relative_paths = list(dict.fromkeys(path.lstrip("/") for path in relative_paths))
+    summary = CopySummary()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(
+            lambda relative_path: _copy_file(
+                relative_path,
+                source_folder,
+                destination_folder,
+                max_retries,
+                retry_delay,
+            ),
+            relative_paths,
+        )
+        for relative_path, (status, n_bytes) in zip(relative_paths, results):
+            if status == CopyStatus.COPIED:
+                summary.n_copied += 1
+                summary.bytes_copied += n_bytes
+            elif status == CopyStatus.SKIPPED:
+                summary.n_skipped += 1
+            else:
+                summary.n_failed += 1
+                summary.failed_files.append(relative_path)
+    summary.elapsed = time.perf_counter() - start
+    return summary
+
+
+def _copy_file(
+    relative_path: str,
+    source_folder: str,
+    destination_folder: str,
+    max_retries: int,
+    retry_delay: float,
+) -> Tuple[CopyStatus, int]:
+    source_path = os.path.join(source_folder, relative_path)
+    destination_path = os.path.join(destination_folder, relative_path)
+    for attempt in range(max_retries + 1):
+        try:
+            source_size = os.path.getsize(source_path)
+            if (
+                os.path.isfile(destination_path)
+                and os.path.getsize(destination_path) == source_size
+            ):
+                return CopyStatus.SKIPPED, 0
+            os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+            shutil.copyfile(source_path, destination_path)
+            return CopyStatus.COPIED, source_size
+        except FileNotFoundError as e:
+            if not os.path.exists(source_path):
+                logger.error(f"Could not copy {relative_path}: {e}")
+                return CopyStatus.FAILED, 0
+            error = e
+        except OSError as e:
+            error = e
+        if attempt < max_retries:
+            logger.warning(
+                f"Copying {relative_path} failed (attempt {attempt + 1}): {error}"
+            )
+            time.sleep(retry_delay * 2**attempt)
+    logger.error(
+        f"Could not copy {relative_path} after {max_retries + 1} attempts: {error}"
+    )
+    return CopyStatus.FAILED, 0
@@ -0,0 +1,63 @@
+from typing import Iterator, List, Optional
+
+from cvtoolkit.database.baas_tables import ImageProcessingStatus
+from cvtoolkit.database.database_handler import DBConfigSQLAlchemy
+from sqlalchemy import or_
+
+from blurring_as_a_service.pre_inference_pipeline.source.image_paths import (
+    to_image_filename,
+)
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def iter_processed_images(
+    db_connector: DBConfigSQLAlchemy,
+    customer_name: str,
+    upload_folders: Optional[List[str]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[str]:
+    """
+    Streams the images of a customer that have been marked processed in
+    ImageProcessingStatus, ordered by filename.
+
+    Parameters
+    ----------
+    db_connector : DBConfigSQLAlchemy
+        A configuration object for connecting to the database, with an open connection.
+    customer_name : str
+        The customer whose images to return.
+    upload_folders : Optional[List[str]]
+        If given, only images uploaded to these folders of input_structured are
+        returned, so an empty list returns no images.
+    chunk_size : int
+        Number of rows fetched from the database at once.
+
+    Returns
+    -------
+    Iterator[str]
+        The image filenames, the path of the image relative to input_structured,
+        see to_image_filename.
+    """
+    if upload_folders is not None and not upload_folders:
+        return
+    with db_connector.managed_session() as session:
+        query = session.query(ImageProcessingStatus.image_filename).filter(
+            ImageProcessingStatus.image_customer_name == customer_name,
+            ImageProcessingStatus.processing_status == "processed",
+        )
+        if upload_folders is not None:
+            query = query.filter(
+                or_(
+                    *[
+                        ImageProcessingStatus.image_filename.startswith(
+                            to_image_filename(upload_folder, ""), autoescape=True
+                        )
+                        for upload_folder in upload_folders
+                    ]
+                )
+            )
+        # An image split in more than one workload is processed more than once.
+        query = query.distinct().order_by(ImageProcessingStatus.image_filename)
+        for row in query.yield_per(chunk_size):
+            yield row.image_filename
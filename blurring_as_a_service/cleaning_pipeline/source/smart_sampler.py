@@ -3,12 +3,11 @@ import logging
 import os
 import random
 import sys
-from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from sqlalchemy import func
+from sqlalchemy import func, or_
 from sqlalchemy.exc import SQLAlchemyError
 
 sys.path.append("../../..")
@@ -22,7 +21,13 @@ sys.path.append(yolov5_path)
 
 from cvtoolkit.database.baas_tables import DetectionInformation  # noqa: E402
 from cvtoolkit.database.database_handler import DBConfigSQLAlchemy  # noqa: E402
-from cvtoolkit.helpers.file_helpers import copy_file  # noqa: E402
+
+from blurring_as_a_service.cleaning_pipeline.source.bulk_copier import (  # noqa: E402
+    copy_files,
+)
+from blurring_as_a_service.pre_inference_pipeline.source.image_paths import (  # noqa: E402
+    to_image_filename,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -87,89 +92,105 @@ class SmartSampler:
         logger.info(f"Sampling {n_images_to_sample} images for quality check.. \n")
 
         quality_check_images = SmartSampler._get_n_random_images_per_date(
-            grouped_images_by_date, n_images_to_sample
+            grouped_images_by_date,
+            n_images_to_sample,
+            seed=self.sampling_parameters.get("seed"),
         )
 
         logger.info(f"Quality check images: {quality_check_images} \n")
 
-        for key, values in quality_check_images.items():
-            for value in values:
-                copy_file(
-                    "/" + key + "/" + value,
-                    str(self.input_structured_folder),
-                    str(self.customer_quality_check_folder),
-                )
+        copy_summary = copy_files(
+            [
+                f"{key}/{value}"
+                for key, values in quality_check_images.items()
+                for value in values
+            ],
+            str(self.input_structured_folder),
+            str(self.customer_quality_check_folder),
+        )
+        logger.info(f"Copied quality check images: {copy_summary}")
 
     def sample_images_for_retraining(
-        self, date: str, grouped_images: List[str]
+        self, grouped_images_by_date: Dict[str, List[str]]
     ) -> None:
         """
         Samples images for retraining purposes from the structured input folder. The function first collects images
-        from the database that are above a specified confidence score threshold. It then categorizes these images into
-        bins based on detection counts and samples a specific ratio of images from each bin for every date. The sampled
-        images are then copied to the customer retraining folder.
+        from the database that are above a specified confidence score threshold, for all dates at once. It then
+        categorizes the images of every date into bins based on detection counts and samples a specific ratio of
+        images from each bin for every date. The sampled images are then copied to the customer retraining folder.
 
         Parameters
         ----------
-        date: str
-            Date (in 'YYYY-MM-DD_HH_MM_SS' string format)
-        grouped_images : Dict[str, List[str]]
-            Lists of image filenames.
-            These filenames are used to query the database and collect detection data for the corresponding images.
+        grouped_images_by_date : Dict[str, List[str]]
+            A dictionary where keys are dates (in 'YYYY-MM-DD_HH_MM_SS' string format) and values are lists of
+            image file names from those dates. Only images in these lists are sampled.
 
         Returns
         -------
         None
         """
 
-        df_images = self._collect_images_above_threshold_from_db(date, grouped_images)
+        df_images = self._collect_images_above_threshold_from_db(grouped_images_by_date)
         logger.info(df_images.head())
 
         if df_images.empty:
             logger.warning("The dataframe containing the images is empty.")
             return None
 
-        df_images, bin_counts = SmartSampler._categorize_images_into_bins(df_images)
-
-        for bin_label, images in bin_counts.items():
-            logger.info(
-                f"Number of images with detections in bin {bin_label}: {len(images)}"
+        binned_images = []
+        for upload_date, df_date in df_images.groupby("image_upload_date", sort=False):
+            df_date, bin_counts = SmartSampler._categorize_images_into_bins(
+                df_date.copy()
             )
+            for bin_label, images in bin_counts.items():
+                logger.info(
+                    f"Number of images with detections on date {upload_date} in bin {bin_label}: {len(images)}"
+                )
+            binned_images.append(df_date)
+        df_images = pd.concat(binned_images)
 
         ratio = self.sampling_parameters["sampling_ratio"]
         percentage_ratio = ratio / 100
         sampled_images_df = SmartSampler._sample_images_equally_from_bins(
-            df_images, percentage_ratio
+            df_images, percentage_ratio, seed=self.sampling_parameters.get("seed")
         )
 
-        for _, row in sampled_images_df.iterrows():
-            formatted_upload_date = row["image_upload_date"]
-            image_filename = row["image_filename"]
-            copy_file(
-                f"/{formatted_upload_date}/{image_filename}",
-                str(self.input_structured_folder),
-                str(self.customer_retraining_folder),
-            )
-        logger.info(f"Sampled for retraining: {sampled_images_df.count()} images")
+        copy_summary = copy_files(
+            sampled_images_df["image_upload_date"].astype(str)
+            + "/"
+            + sampled_images_df["image_filename"].astype(str),
+            str(self.input_structured_folder),
+            str(self.customer_retraining_folder),
+        )
+        logger.info(f"Sampled for retraining: {len(sampled_images_df)} images")
+        logger.info(f"Copied retraining images: {copy_summary}")
 
     def _collect_images_above_threshold_from_db(
-        self, date: str, grouped_images: List[str]
+        self, grouped_images_by_date: Dict[str, List[str]]
     ) -> pd.DataFrame:
         """
         Collects images with detections above a specified confidence score threshold from the database.
 
+        A single aggregated query over one connection fetches the detection counts of all dates. It filters on
+        the upload folders only, instead of sending every filename in an `IN (...)` clause, which is slow to plan and
+        exceeds the parameter limit for large days. The result is restricted to the images found in the folders
+        with a join on the client side. The image_filename in the database is the path relative to
+        input_structured, see to_image_filename, and its image_upload_date is the time the workload was split,
+        so the folders are matched on the filenames rather than on the upload dates.
+
         Parameters
         ----------
-        date: str
-            Date (in 'YYYY-MM-DD_HH_MM_SS' string format)
-        grouped_images : Dict[str, List[str]]
-            Lists of image filenames.
+        grouped_images_by_date : Dict[str, List[str]]
+            A dictionary where keys are dates (in 'YYYY-MM-DD_HH_MM_SS' string format) and values are lists of
+            image file names from those dates.
 
         Returns
         -------
         pd.DataFrame
             A DataFrame containing detailed information about each image detection,
-            including image name, upload date, customer name, and count of detections.
+            including image name, upload date, and count of detections.
+            The 'image_upload_date' column holds the upload folder and 'image_filename' the path inside it, as in
+            grouped_images_by_date. Empty if the data could not be collected.
 
         Raises
         ------
@@ -197,42 +218,44 @@ class SmartSampler:
             db_config.create_connection()
 
             conf_score_threshold = self.sampling_parameters["conf_score_threshold"]
+            logger.info(f"Upload folders: {list(grouped_images_by_date)} \n")
+            if not grouped_images_by_date:
+                return pd.DataFrame()
 
             with db_config.managed_session() as session:
-                logger.info(f"Upload Date: {date} \n")
-                upload_date_datetime = datetime.strptime(date, "%Y-%m-%d_%H_%M_%S")
-
                 query = (
                     session.query(
-                        DetectionInformation.image_upload_date,
                         DetectionInformation.image_filename,
                         func.count(DetectionInformation.id).label("count"),
                     )
                     .filter(
                         DetectionInformation.image_customer_name == self.customer_name,
-                        DetectionInformation.image_upload_date == upload_date_datetime,
-                        DetectionInformation.image_filename.in_(grouped_images),
+                        or_(
+                            *[
+                                DetectionInformation.image_filename.startswith(
+                                    to_image_filename(date, ""), autoescape=True
+                                )
+                                for date in grouped_images_by_date
+                            ]
+                        ),
                         DetectionInformation.conf_score > conf_score_threshold,
                     )
                     .group_by(
                         DetectionInformation.image_customer_name,
-                        DetectionInformation.image_upload_date,
                         DetectionInformation.image_filename,
                     )
                     .statement
                 )
-                results = pd.read_sql_query(sql=query, con=db_config.engine)
+                results = pd.read_sql_query(sql=query, con=session.connection())
 
-                logger.info(f"Count results DB: {results.shape[0]} \n")
+            logger.info(f"Count results DB: {results.shape[0]} \n")
 
-                if not results.empty:
-                    results["image_upload_date"] = pd.to_datetime(
-                        results["image_upload_date"]
-                    )
-                    results["image_upload_date"] = results[
-                        "image_upload_date"
-                    ].dt.strftime("%Y-%m-%d_%H_%M_%S")
-                return results
+            if not results.empty:
+                results = SmartSampler._restrict_to_images_in_folders(
+                    results, grouped_images_by_date
+                )
+                logger.info(f"Images found in input_structured: {results.shape[0]} \n")
+            return results
 
         except SQLAlchemyError as e:
             logger.error(f"Database operation failed: {e}")
@@ -240,10 +263,54 @@ class SmartSampler:
             logger.error(f"Configuration error: {e}")
         except Exception as e:
             logger.error(f"An unexpected error occurred: {e}")
+        return pd.DataFrame()
+
+    @staticmethod
+    def _restrict_to_images_in_folders(
+        results: pd.DataFrame, grouped_images_by_date: Dict[str, List[str]]
+    ) -> pd.DataFrame:
+        """
+        Keeps the database results of the images found in the folders and splits their image_filename, the path
+        relative to input_structured, into the 'image_upload_date' folder and the 'image_filename' inside it.
+        """
+        images_in_folders = SmartSampler._images_by_date_to_dataframe(
+            grouped_images_by_date
+        )
+        images_in_folders["db_image_filename"] = [
+            to_image_filename(date, image_filename)
+            for date, image_filename in zip(
+                images_in_folders["image_upload_date"],
+                images_in_folders["image_filename"],
+            )
+        ]
+        return images_in_folders.merge(
+            results.rename(columns={"image_filename": "db_image_filename"}),
+            on="db_image_filename",
+            how="inner",
+        ).drop(columns="db_image_filename")
+
+    @staticmethod
+    def _images_by_date_to_dataframe(
+        grouped_images_by_date: Dict[str, List[str]],
+    ) -> pd.DataFrame:
+        """
+        Converts images grouped by date into a DataFrame with the columns
+        'image_upload_date' and 'image_filename'.
+        """
+        return pd.DataFrame(
+            [
+                (date, image_filename)
+                for date, image_filenames in grouped_images_by_date.items()
+                for image_filename in image_filenames
+            ],
+            columns=["image_upload_date", "image_filename"],
+        ).drop_duplicates()
 
     @staticmethod
     def _get_n_random_images_per_date(
-        grouped_images_by_date: Dict[str, List[str]], n_images_to_sample: int
+        grouped_images_by_date: Dict[str, List[str]],
+        n_images_to_sample: int,
+        seed: Optional[int] = None,
     ) -> Dict[str, List[str]]:
         """
         Randomly samples a specified number of images for each date.
@@ -254,6 +321,8 @@ class SmartSampler:
             A dictionary where keys are dates and values are lists of image file names from those dates.
         n_images_to_sample : int
             The number of images to randomly sample from each date's list.
+        seed : Optional[int]
+            Seed of the random sampling, for reproducible samples.
 
         Returns
         -------
@@ -262,10 +331,11 @@ class SmartSampler:
         """
 
         random_result = {}
+        rng = random.Random(seed)  # nosec B311
 
         for key, values in grouped_images_by_date.items():
             if len(values) >= n_images_to_sample:
-                random_values = random.sample(values, n_images_to_sample)
+                random_values = rng.sample(values, n_images_to_sample)
             else:
                 random_values = values
             random_result[key] = random_values
@@ -298,6 +368,14 @@ class SmartSampler:
         logger.info(f"Maximum number of detections for an image: {max_count}")
 
         detection_range = max_count - min_count
+        if detection_range == 0:
+            # All images fall into one bin, pd.cut needs distinct bin edges.
+            bin_labels = SmartSampler._create_bin_labels([min_count, max_count + 1])
+            df["bin_label"] = pd.Categorical(
+                bin_labels * len(df), categories=bin_labels
+            )
+            return df, {bin_labels[0]: df}
+
         bin_size = SmartSampler._determine_bin_size(detection_range)
 
         # Calculate the bin edges
@@ -319,11 +397,17 @@ class SmartSampler:
 
     @staticmethod
     def _sample_images_equally_from_bins(
-        df: pd.DataFrame, percentage_ratio: float
+        df: pd.DataFrame, percentage_ratio: float, seed: Optional[int] = None
     ) -> pd.DataFrame:
         """
         Samples a percentage of images equally from each bin for each date.
 
+        The quota of every (date, bin) group is computed at once: the images to sample
+        on a date are divided equally over its bins, the remainder goes to the bins
+        that appear first, and no bin gives more images than it has. All groups are
+        then sampled in a single pass by shuffling the DataFrame once and keeping the
+        first `quota` rows of each group.
+
         Parameters
         ----------
         df : pd.DataFrame
@@ -331,56 +415,46 @@ class SmartSampler:
             'image_upload_date', 'image_filename', 'bin_label'.
         percentage_ratio : float
             The ratio of total images to sample from each date.
+        seed : Optional[int]
+            Seed of the random sampling, for reproducible samples.
 
         Returns
         -------
         pd.DataFrame
             A DataFrame of sampled images.
         """
+        if "bin_label" not in df.columns:
+            logger.error("bin_label column not found in DataFrame.")
+            return df.iloc[0:0]
+
+        group_keys = ["image_upload_date", "bin_label"]
+        bin_sizes = df.groupby(group_keys, observed=True, sort=False).size()
+        bins_per_date = bin_sizes.groupby(level=0, sort=False)
+        images_per_date = bins_per_date.transform("sum")
+        n_bins = bins_per_date.transform("size")
+        bin_rank = bins_per_date.cumcount()
+
+        # Ensure at least one image is sampled from every date
+        images_to_sample = np.maximum(
+            (images_per_date * percentage_ratio).astype(int), 1
+        )
+        quota = images_to_sample // n_bins + (bin_rank < images_to_sample % n_bins)
+        quota = np.minimum(quota, bin_sizes).rename("quota")
 
-        sampled_images_df = pd.DataFrame()
-
-        unique_dates = df["image_upload_date"].unique()
-        logger.info(f"Unique dates: {unique_dates}")
-
-        for upload_date in unique_dates:
-            df_date = df[df["image_upload_date"] == upload_date]
-            total_images = len(df_date)
-            logger.info(f"Total images on date {upload_date}: {total_images}")
-
-            total_images_to_sample = int(total_images * percentage_ratio)
-
-            # Ensure at least one image is sampled if total_images_to_sample > 0
-            total_images_to_sample = (
-                max(total_images_to_sample, 1) if total_images > 0 else 0
-            )
-
+        date_totals = images_per_date.groupby(level=0, sort=False).first()
+        date_samples = images_to_sample.groupby(level=0, sort=False).first()
+        for upload_date, total_images in date_totals.items():
             logger.info(
-                f"Total images to sample on date {upload_date}: {total_images_to_sample}"
+                f"Total images on date {upload_date}: {total_images}, "
+                f"images to sample: {date_samples[upload_date]}"
             )
 
-            if "bin_label" not in df_date.columns:
-                logger.error(
-                    "bin_label column not found in DataFrame for date: "
-                    + str(upload_date)
-                )
-            else:
-                bin_labels = df_date["bin_label"].unique()
-                logger.debug(f"Bin labels for date {upload_date}: {bin_labels}")
-
-                images_per_bin = total_images_to_sample // len(bin_labels)
-                remainder = total_images_to_sample % len(bin_labels)
-                logger.info(f"Images per bin: {images_per_bin}, Remainder: {remainder}")
-
-                sampled_images_df = SmartSampler._calculate_n_of_images_to_sample(
-                    sampled_images_df, df_date, bin_labels, images_per_bin, remainder
-                )
-
-                logger.debug(
-                    f"Sampled images for date {upload_date}: {sampled_images_df.head()}"
-                )
-
-        return sampled_images_df
+        shuffled_df = df.sample(frac=1, random_state=seed)
+        position_in_group = shuffled_df.groupby(
+            group_keys, observed=True, sort=False
+        ).cumcount()
+        group_quota = shuffled_df.join(quota, on=group_keys)["quota"]
+        return shuffled_df[position_in_group < group_quota]
 
     @staticmethod
     def _determine_bin_size(detection_range: int) -> int:
@@ -429,70 +503,3 @@ class SmartSampler:
             f"{int(bins[i])}-{int(bins[i + 1]) - 1}" for i in range(len(bins) - 1)
         ]
         return bin_labels
-
-    @staticmethod
-    def _calculate_n_of_images_to_sample(
-        sampled_images_df, df_date, bin_labels, images_per_bin, remainder
-    ):
-        """
-        Calculates the number of images to sample from each bin, considering the base number of images per bin and the remainder.
-
-        This method iterates over each bin and determines the number of images to sample from that bin.
-        The calculation is based on a base number of images per bin (`images_per_bin`) and a remainder
-        that accounts for any extra images to be distributed evenly across the bins.
-
-        Parameters
-        ----------
-        sampled_images_df : pd.DataFrame
-            An empty DataFrame to which sampled images are appended.
-        df_date : pd.DataFrame
-            A DataFrame filtered for a specific date, containing image data including 'bin_label'.
-        bin_labels : list
-            A list of unique bin labels indicating different categories or bins.
-        images_per_bin : int
-            The base number of images to sample from each bin, calculated as the total
-            number of images to be sampled divided by the number of bins.
-        remainder : int
-            The number of extra images that need to be distributed evenly across the bins.
-
-        Returns
-        -------
-        pd.DataFrame
-            A DataFrame of sampled images, concatenated from each bin.
-
-        Notes
-        -----
-        - For each bin, the method first calculates `num_to_sample` which is the minimum of `images_per_bin + 1`
-        (if there is a remainder) and the total number of images in that bin.
-        - If a remainder exists, it is decreased by 1 after allocating an extra image to a bin,
-        ensuring even distribution of the extra images across bins.
-        - The method samples `num_to_sample` images from each bin and appends them to the resulting DataFrame.
-
-        Example
-        -------
-        # Assuming a DataFrame 'df_date' for a specific date with 'bin_label' column
-        # and an array 'bin_labels' containing unique bin labels, e.g., ['[0-9]', '[10-19]', '[20-29]']
-        df_date = pd.DataFrame({
-            'image_filename': ['image1.jpg', 'image2.jpg', 'image3.jpg', 'image4.jpg', 'image5.jpg'],
-            'bin_label': ['[0-9]', '[0-9]', '[10-19]', '[10-19]', '[20-29]']
-        })
-        bin_labels = ['[0-9]', '[10-19]', '[20-29]']
-        images_per_bin = 1  # base number of images per bin
-        remainder = 2  # extra images to distribute
-
-        sampled_images_df = SmartSampler._calculate_n_of_images_to_sample(df_date, bin_labels, images_per_bin, remainder)
-        print(sampled_images_df)
-        """
-        for bin_label in bin_labels:
-            df_bin = df_date[df_date["bin_label"] == bin_label]
-
-            # Adjust the number of images to sample from this bin
-            num_to_sample = min(
-                images_per_bin + (1 if remainder > 0 else 0), len(df_bin)
-            )
-            remainder -= 1 if remainder > 0 else 0
-
-            sampled_from_bin = df_bin.sample(n=num_to_sample)
-            sampled_images_df = sampled_images_df.append(sampled_from_bin)
-
-        return sampled_images_df
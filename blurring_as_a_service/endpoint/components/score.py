@@ -4,6 +4,7 @@ import json
 import logging
 import os
 import sys
+from typing import Optional
 
 import cv2
 import numpy as np
@@ -26,6 +27,20 @@ sys.path.append(
 )
 from aml_interface.azure_logging import AzureLoggingConfigurer  # noqa: E402
 
+from blurring_as_a_service.endpoint.source.image_encoding import (  # noqa: E402
+    DEFAULT_PREVIEW_QUALITY,
+    downscale_image,
+    encode_jpeg,
+)
+from blurring_as_a_service.endpoint.source.model_pool import (  # noqa: E402
+    Deadline,
+    ModelPool,
+    ModelPoolSaturatedError,
+    RequestDeadlineExceededError,
+)
+from blurring_as_a_service.endpoint.source.response_cache import (  # noqa: E402
+    ResponseCache,
+)
 from blurring_as_a_service.settings.settings import (  # noqa: E402
     BlurringAsAServiceSettings,
 )
@@ -35,15 +50,22 @@ azureLoggingConfigurer = AzureLoggingConfigurer(settings["logging"])
 azureLoggingConfigurer.setup_baas_logging()
 logger = logging.getLogger("api_endpoint")
 
+# "image" returns the blurred image, "detections" only the boxes, classes and scores.
+RESPONSE_TYPES = ("image", "detections")
+
+model_pool = None
+response_cache = None
+
 
 def init():
     """
     This function is called when the container is initialized/started, typically after create/update of the deployment.
     You can write the logic here to perform init operations like caching the model in memory
     """
-    global model
+    global model_pool
     global settings
     global logger
+    global response_cache
 
     logger.info("Init started")
     try:
@@ -59,10 +81,24 @@ def init():
         if settings is None:
             raise RuntimeError("Configuration settings could not be loaded.")
 
-        logger.info(f"Loading model from: {model_path}")
-        model = YOLO(
-            model=model_path,
-            task="detect",
+        endpoint_settings = settings["api_endpoint"]
+        logger.info(
+            f"Loading {endpoint_settings['model_replicas']} model replica(s) "
+            f"from: {model_path}"
+        )
+        model_pool = ModelPool(
+            model_factory=lambda: YOLO(model=model_path, task="detect"),
+            n_replicas=endpoint_settings["model_replicas"],
+            max_queued_requests=endpoint_settings["max_queued_requests"],
+        )
+        response_cache = ResponseCache(
+            max_bytes=endpoint_settings["cache_max_bytes"],
+            ttl_seconds=endpoint_settings["cache_ttl_seconds"],
+            store_images=endpoint_settings["cache_blurred_images"],
+        )
+        logger.info(
+            f"Response cache enabled: {response_cache.enabled}, "
+            f"budget: {response_cache.max_bytes} bytes"
         )
         logger.info("Init complete")
     except FileNotFoundError as e:
@@ -86,14 +122,23 @@ def run(raw_data):
         raw_data (str): The raw request data in JSON format. The JSON contains:
             - "data" field containing the image encoded in base64.
             - "user_id" field containing the email of who is using the API.
+            - optional "response_type" field, one of RESPONSE_TYPES (default
+              "image"). With "detections" the image is not blurred and encoded,
+              only the detections and metadata are returned.
+            - optional "preview_max_size" field. If set, a "preview_image" is
+              returned, downscaled so its largest side is at most this many pixels.
+              Blurring is always done at full resolution.
+            - optional "preview_quality" field, JPEG quality (1-100) of the preview.
+            - optional "include_full_image" field. If true, the full resolution
+              "annotated_image" is returned together with the preview.
     Returns:
         tuple: A tuple containing the response (str) and HTTP status code (int).
     """
-    global model
+    global model_pool
     global settings
     global logger
 
-    if model is None:
+    if model_pool is None:
         logger.error(
             "Model is not initialized. This should not happen if init succeeded."
         )
@@ -111,6 +156,32 @@ def run(raw_data):
         )
         return error_response, 503
 
+    try:
+        with model_pool.admit():
+            deadline = Deadline(settings["api_endpoint"]["request_deadline_seconds"])
+            return _run(raw_data, deadline)
+    except ModelPoolSaturatedError as e:
+        logger.warning(f"Request rejected, service is saturated: {e}")
+        error_response = json.dumps(
+            {"error": "Service is at capacity, retry later.", "details": str(e)}
+        )
+        return error_response, 503
+
+
+def _run(raw_data, deadline):
+    """
+    Processes one admitted request, see run() for the request format.
+    Parameters:
+        raw_data (str): The raw request data in JSON format.
+        deadline (Deadline): The deadline of the request.
+    Returns:
+        tuple: A tuple containing the response (str) and HTTP status code (int).
+    """
+    global model_pool
+    global settings
+    global logger
+    global response_cache
+
     try:
         data = json.loads(raw_data)
     except json.JSONDecodeError as e:
@@ -124,6 +195,48 @@ def run(raw_data):
         user_id = data.get("user_id", "unknown")
         logger.info(f"Request received from user: {user_id}")
 
+        response_type = data.get("response_type", "image")
+        if response_type not in RESPONSE_TYPES:
+            logger.warning(f"Invalid response_type requested: {response_type}")
+            error_response = json.dumps(
+                {
+                    "error": "Invalid 'response_type' field.",
+                    "details": f"Expected one of {list(RESPONSE_TYPES)}.",
+                }
+            )
+            return error_response, 400
+
+        preview_max_size = data.get("preview_max_size")
+        preview_quality = data.get("preview_quality", DEFAULT_PREVIEW_QUALITY)
+        include_full_image = bool(data.get("include_full_image", False))
+        # bool is a subclass of int, but true is not a size of 1 pixel.
+        if preview_max_size is not None and (
+            not isinstance(preview_max_size, int)
+            or isinstance(preview_max_size, bool)
+            or preview_max_size <= 0
+        ):
+            logger.warning(f"Invalid preview_max_size requested: {preview_max_size}")
+            error_response = json.dumps(
+                {
+                    "error": "Invalid 'preview_max_size' field.",
+                    "details": "Expected a positive integer.",
+                }
+            )
+            return error_response, 400
+        if (
+            not isinstance(preview_quality, int)
+            or isinstance(preview_quality, bool)
+            or not 1 <= preview_quality <= 100
+        ):
+            logger.warning(f"Invalid preview_quality requested: {preview_quality}")
+            error_response = json.dumps(
+                {
+                    "error": "Invalid 'preview_quality' field.",
+                    "details": "Expected an integer between 1 and 100.",
+                }
+            )
+            return error_response, 400
+
         image_data = data.get("data")
         if image_data is None:
             logger.warning(
@@ -141,6 +254,21 @@ def run(raw_data):
             )
             return error_response, 400
 
+        cache_key = ResponseCache.make_key(image_bytes)
+        cached_result = response_cache.get(cache_key)
+        if cached_result is not None:
+            metadata = cached_result.detections["metadata"]
+            if response_type == "detections":
+                logger.info(
+                    f"Cached detections returned for user: {user_id}. Metadata: {metadata}"
+                )
+                return _build_detections_response(cached_result.detections), 200
+            if cached_result.encoded_image is not None and preview_max_size is None:
+                logger.info(
+                    f"Cached result returned for user: {user_id}. Metadata: {metadata}"
+                )
+                return _build_response(cached_result.encoded_image, metadata), 200
+
         try:
             pil_image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
             image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
@@ -163,80 +291,76 @@ def run(raw_data):
             )
             return error_response, 422
 
-        try:
-            results = model(image)
-            if not results or not results[0]:
-                logger.error("Model inference returned empty results.")
+        if cached_result is not None:
+            logger.info("Cached detections found, skipping model inference.")
+            detections = cached_result.detections
+        else:
+            try:
+                with model_pool.replica(deadline) as model:
+                    results = model(image)
+                if not results or not results[0]:
+                    logger.error("Model inference returned empty results.")
+                    error_response = json.dumps(
+                        {"error": "Model inference failed to produce results."}
+                    )
+                    return error_response, 500
+                result = results[0].cpu()
+            except RequestDeadlineExceededError:
+                raise
+            except RuntimeError as e:
+                logger.error(
+                    f"Runtime error during model inference: {e}", exc_info=True
+                )
                 error_response = json.dumps(
-                    {"error": "Model inference failed to produce results."}
+                    {"error": "Model inference failed.", "details": str(e)}
                 )
                 return error_response, 500
-            result = results[0].cpu()
-        except RuntimeError as e:
-            logger.error(f"Runtime error during model inference: {e}", exc_info=True)
-            error_response = json.dumps(
-                {"error": "Model inference failed.", "details": str(e)}
-            )
-            return error_response, 500
-        except Exception as e:
-            logger.error(f"Unexpected error during model inference: {e}", exc_info=True)
-            error_response = json.dumps(
-                {
-                    "error": "An unexpected error occurred during model processing.",
-                    "details": str(e),
-                }
-            )
-            return error_response, 500
+            except Exception as e:
+                logger.error(
+                    f"Unexpected error during model inference: {e}", exc_info=True
+                )
+                error_response = json.dumps(
+                    {
+                        "error": "An unexpected error occurred during model processing.",
+                        "details": str(e),
+                    }
+                )
+                return error_response, 500
+            detections = _collect_detections(result)
 
-        inference_settings = settings["inference_pipeline"]
-        target_classes = inference_settings["target_classes"]
-        sensitive_classes = inference_settings["sensitive_classes"]
-        inference_params = {
-            "imgsz": inference_settings["model_params"].get("img_size", 640),
-            "save": inference_settings["model_params"].get("save_img_flag", False),
-            "save_txt": inference_settings["model_params"].get("save_txt_flag", False),
-            "save_conf": inference_settings["model_params"].get(
-                "save_conf_flag", False
-            ),
-            "conf": inference_settings["model_params"].get("conf", 0.25),
-            "project": "inference",
-        }
-        target_classes_conf = (
-            inference_settings["target_classes_conf"]
-            if inference_settings["target_classes_conf"]
-            else inference_params["conf"]
-        )
-        sensitive_classes_conf = (
-            inference_settings["sensitive_classes_conf"]
-            if inference_settings["sensitive_classes_conf"]
-            else inference_params["conf"]
-        )
-        model_result = ModelResult(
-            model_result=result,
-            target_classes=target_classes,
-            sensitive_classes=sensitive_classes,
-            target_classes_conf=target_classes_conf,
-            sensitive_classes_conf=sensitive_classes_conf,
-            save_image=False,
-            save_labels=False,
-            save_all_images=False,
-        )
-        output_image = OutputImage(result.orig_img.copy())
-        model_result.calculate_bounding_boxes()
+        if response_type == "detections":
+            response_cache.put(cache_key, detections)
+            logger.info(
+                f"Detections returned for user: {user_id}. Metadata: {detections['metadata']}"
+            )
+            return _build_detections_response(detections), 200
 
-        if len(model_result.sensitive_bounding_boxes):
-            output_image.blur_inside_boxes(boxes=model_result.sensitive_bounding_boxes)
+        deadline.check("blurring")
+        output_image = OutputImage(image)
+        if len(detections["sensitive_boxes"]):
+            output_image.blur_inside_boxes(
+                boxes=np.array(detections["sensitive_boxes"])
+            )
         else:
             logger.info("No sensitive classes detected, skipping blurring.")
 
+        encode_full_image = preview_max_size is None or include_full_image
         try:
-            success, encoded_image = cv2.imencode(".jpg", output_image.image)
-            if not success:
-                logger.error("Image encoding to JPG failed.")
-                error_response = json.dumps(
-                    {"error": "Failed to encode processed image."}
+            encoded_image = (
+                encode_jpeg(output_image.image) if encode_full_image else None
+            )
+            encoded_preview = (
+                encode_jpeg(
+                    downscale_image(output_image.image, preview_max_size),
+                    quality=preview_quality,
                 )
-                return error_response, 500
+                if preview_max_size is not None
+                else None
+            )
+        except ValueError as e:
+            logger.error(str(e))
+            error_response = json.dumps({"error": "Failed to encode processed image."})
+            return error_response, 500
         except cv2.error as e:
             logger.error(f"OpenCV error during image encoding: {e}", exc_info=True)
             error_response = json.dumps(
@@ -256,17 +380,20 @@ def run(raw_data):
             )
             return error_response, 500
 
-        annotated_image_b64 = base64.b64encode(encoded_image).decode("utf-8")
-        metadata = {
-            "persons_count": int((model_result.boxes.cls == 0).sum()),
-            "licence_plates_count": int((model_result.boxes.cls == 1).sum()),
-        }
+        # Do not replace a cached full resolution image when only a preview was made.
+        if encoded_image is not None or cached_result is None:
+            response_cache.put(cache_key, detections, encoded_image)
+
+        metadata = detections["metadata"]
         logger.info(f"Processing successful for user: {user_id}. Metadata: {metadata}")
 
-        response_payload = json.dumps(
-            {"annotated_image": annotated_image_b64, "metadata": metadata}
+        return _build_response(encoded_image, metadata, encoded_preview), 200
+    except RequestDeadlineExceededError as e:
+        logger.warning(f"Request aborted: {e}")
+        error_response = json.dumps(
+            {"error": "Request deadline exceeded.", "details": str(e)}
         )
-        return response_payload, 200
+        return error_response, 504
     except cv2.error as e:
         logger.error(f"An OpenCV error occurred: {e}", exc_info=True)
         error_response = json.dumps(
@@ -284,3 +411,80 @@ def run(raw_data):
             }
         )
         return error_response, 500
+
+
+def _collect_detections(result):
+    """
+    Filters the raw model result with the inference settings and collects the
+    detections in a JSON-serialisable dict, so they can be cached and returned.
+
+    Parameters:
+        result (Results): The YOLO result of the image, moved to the CPU.
+    Returns:
+        dict: The boxes (xyxy, pixels), classes and scores of all detections, the
+            boxes of the sensitive classes to blur and the metadata counts.
+    """
+    inference_settings = settings["inference_pipeline"]
+    conf = inference_settings["model_params"].get("conf", 0.25)
+    target_classes_conf = (
+        inference_settings["target_classes_conf"]
+        if inference_settings["target_classes_conf"]
+        else conf
+    )
+    sensitive_classes_conf = (
+        inference_settings["sensitive_classes_conf"]
+        if inference_settings["sensitive_classes_conf"]
+        else conf
+    )
+    model_result = ModelResult(
+        model_result=result,
+        target_classes=inference_settings["target_classes"],
+        sensitive_classes=inference_settings["sensitive_classes"],
+        target_classes_conf=target_classes_conf,
+        sensitive_classes_conf=sensitive_classes_conf,
+        save_image=False,
+        save_labels=False,
+        save_all_images=False,
+    )
+    model_result.calculate_bounding_boxes()
+
+    boxes = model_result.boxes
+    return {
+        "boxes": np.asarray(boxes.xyxy).round(2).tolist(),
+        "classes": np.asarray(boxes.cls).astype(int).tolist(),
+        "scores": np.asarray(boxes.conf).round(4).tolist(),
+        "sensitive_boxes": np.asarray(model_result.sensitive_bounding_boxes)
+        .reshape(-1, 4)
+        .tolist(),
+        "metadata": {
+            "persons_count": int((boxes.cls == 0).sum()),
+            "licence_plates_count": int((boxes.cls == 1).sum()),
+        },
+    }
+
+
+def _build_response(
+    encoded_image: Optional[bytes],
+    metadata: dict,
+    encoded_preview: Optional[bytes] = None,
+) -> str:
+    response = {}
+    if encoded_image is not None:
+        response["annotated_image"] = base64.b64encode(encoded_image).decode("utf-8")
+    if encoded_preview is not None:
+        response["preview_image"] = base64.b64encode(encoded_preview).decode("utf-8")
+    response["metadata"] = metadata
+    return json.dumps(response)
+
+
+def _build_detections_response(detections: dict) -> str:
+    return json.dumps(
+        {
+            "detections": {
+                "boxes": detections["boxes"],
+                "classes": detections["classes"],
+                "scores": detections["scores"],
+            },
+            "metadata": detections["metadata"],
+        }
+    )
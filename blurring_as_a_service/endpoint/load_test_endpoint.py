@@ -0,0 +1,451 @@
+"""
+Local load test for the scoring endpoint.
+
+Drives score.init() / score.run() either in-process or over HTTP and reports
+throughput, latency percentiles and how much the memory high-water mark grew during
+the run. Every request sends a unique image by default, so the response cache of the
+endpoint is never hit and the latencies measure inference; pass --allow-cache-hits to
+reuse images. The payload of a request is only built by the worker that sends it. In
+HTTP mode a local stand-in server wrapping score.run() is started, unless --url points
+to an already running server
+(e.g. `azmlinfsrv --entry_script blurring_as_a_service/endpoint/components/score.py`).
+
+The synthetic images are smooth multi-scale noise, which JPEG compresses to about the
+size of a real panorama, but they are not real panoramas: pass --images with real
+images for representative numbers. The summary states which images were used.
+
+Example
+-------
+AZUREML_MODEL_DIR=models python -m blurring_as_a_service.endpoint.load_test_endpoint \
+    --concurrency 4 --requests 200 --image-sizes 2000x1000,8000x4000 \
+    --request-mix image:0.5,detections:0.3,preview:0.2
+"""
+
+import argparse
+import base64
+import json
+import random
+import resource
+import struct
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+REQUEST_TYPES = {
+    "image": {},
+    "detections": {"response_type": "detections"},
+    "preview": {"preview_max_size": 1280},
+}
+# (downscale factor, amplitude) of the noise layers of the synthetic images.
+SYNTHETIC_IMAGE_SCALES = (512, 40), (128, 40), (32, 15), (8, 15)
+JPEG_SOI_MARKER = b"\xff\xd8"
+JPEG_COM_MARKER = b"\xff\xfe"
+
+
+@dataclass
+class RequestResult:
+    request_type: str
+    status_code: int  # 0 if no response was received, see error
+    latency: float
+    error: Optional[str] = None
+
+
+def parse_image_sizes(image_sizes: str) -> List[Tuple[int, int]]:
+    """
+    Parses a comma separated list of WIDTHxHEIGHT image sizes.
+    """
+    sizes = []
+    for size in image_sizes.split(","):
+        width, height = size.lower().split("x")
+        sizes.append((int(width), int(height)))
+    return sizes
+
+
+def parse_request_mix(request_mix: str) -> Dict[str, float]:
+    """
+    Parses a comma separated list of REQUEST_TYPE:WEIGHT pairs into normalised weights.
+    """
+    weights = {}
+    for item in request_mix.split(","):
+        request_type, weight = item.split(":")
+        if request_type not in REQUEST_TYPES:
+            raise ValueError(
+                f"Unknown request type {request_type}, "
+                f"expected one of {list(REQUEST_TYPES)}."
+            )
+        weights[request_type] = float(weight)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("The request mix weights must sum to a positive number.")
+    return {request_type: w / total for request_type, w in weights.items()}
+
+
+def create_synthetic_images(
+    image_sizes: List[Tuple[int, int]], seed: int = 0
+) -> List[bytes]:
+    """
+    Creates one JPEG encoded image per size, the sum of smoothly interpolated noise
+    at a few scales. Unlike white noise, which is a worst case for the JPEG encoder,
+    these compress to about the size of natural images of the same resolution.
+    """
+    rng = np.random.default_rng(seed)
+    images = []
+    for width, height in image_sizes:
+        image = np.full((height, width, 3), 128, dtype=np.float32)
+        for scale, amplitude in SYNTHETIC_IMAGE_SCALES:
+            noise = rng.normal(
+                size=(max(height // scale, 2), max(width // scale, 2), 3)
+            ).astype(np.float32)
+            image += amplitude * cv2.resize(
+                noise, (width, height), interpolation=cv2.INTER_CUBIC
+            )
+        image = np.clip(image, 0, 255).astype(np.uint8)
+        success, encoded_image = cv2.imencode(".jpg", image)
+        if not success:
+            raise ValueError(f"Could not encode synthetic image of {width}x{height}.")
+        images.append(encoded_image.tobytes())
+    return images
+
+
+def load_images(image_paths: List[str]) -> List[bytes]:
+    images = []
+    for image_path in image_paths:
+        with open(image_path, "rb") as f:
+            images.append(f.read())
+    return images
+
+
+def make_image_unique(image: bytes, request_index: int) -> bytes:
+    """
+    Returns a copy of the image whose bytes, and so its cache key, differ for every
+    request index, without changing the pixels. JPEG images get a comment segment
+    after the start marker, other formats get the tag appended after their end.
+    """
+    tag = f"load test request {request_index}".encode("utf-8")
+    if image.startswith(JPEG_SOI_MARKER):
+        comment = JPEG_COM_MARKER + struct.pack(">H", len(tag) + 2) + tag
+        return JPEG_SOI_MARKER + comment + image[len(JPEG_SOI_MARKER) :]
+    return image + tag
+
+
+@dataclass(frozen=True)
+class PlannedRequest:
+    request_type: str
+    image_index: int
+    request_index: int
+
+
+def plan_requests(
+    request_mix: Dict[str, float],
+    n_requests: int,
+    n_images: int,
+    seed: int = 0,
+    first_request_index: int = 0,
+) -> List[PlannedRequest]:
+    """
+    Draws the request type and image of every request at random. Only the indices
+    are kept, the payloads are built when the requests are sent, see PayloadBuilder.
+    first_request_index keeps the requests of different calls, e.g. warmup and
+    measured requests, distinct.
+    """
+    rng = random.Random(seed)  # nosec B311
+    request_types = rng.choices(
+        list(request_mix), weights=list(request_mix.values()), k=n_requests
+    )
+    return [
+        PlannedRequest(request_type, rng.randrange(n_images), request_index)
+        for request_index, request_type in enumerate(request_types, first_request_index)
+    ]
+
+
+class PayloadBuilder:
+    """
+    Builds the JSON payload of a planned request.
+
+    Parameters
+    ----------
+    images : List[bytes]
+        The encoded images the requests pick from.
+    unique_images : bool
+        Whether every request sends different image bytes, see make_image_unique,
+        so the endpoint's response cache cannot serve it. Otherwise the base64
+        encoding of every image is computed once and shared by its requests.
+    """
+
+    def __init__(self, images: List[bytes], unique_images: bool = True):
+        self.images = images
+        self.unique_images = unique_images
+        self._images_b64 = (
+            None
+            if unique_images
+            else [base64.b64encode(image).decode("utf-8") for image in images]
+        )
+
+    def __call__(self, request: PlannedRequest) -> str:
+        if self.unique_images:
+            image_b64 = base64.b64encode(
+                make_image_unique(
+                    self.images[request.image_index], request.request_index
+                )
+            ).decode("utf-8")
+        else:
+            image_b64 = self._images_b64[request.image_index]
+        return json.dumps(
+            {
+                "data": image_b64,
+                "user_id": "load_test",
+                **REQUEST_TYPES[request.request_type],
+            }
+        )
+
+
+def repeated_image_ratio(
+    requests: List[PlannedRequest], unique_images: bool = True
+) -> float:
+    """
+    Fraction of the requests whose image was already sent by an earlier request,
+    i.e. the requests that can be served from the endpoint's response cache.
+    """
+    if unique_images or not requests:
+        return 0.0
+    n_distinct = len({request.image_index for request in requests})
+    return round((len(requests) - n_distinct) / len(requests), 3)
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux.
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def summarise_results(
+    results: List[RequestResult], elapsed: float, baseline_max_rss_mb: float = 0.0
+) -> Dict:
+    """
+    Computes throughput, latency percentiles (in milliseconds) and status code counts,
+    in total and per request type, and how much the memory high-water mark of this
+    process grew since baseline_max_rss_mb was measured. Against a remote --url the
+    process only runs the load test itself.
+    """
+
+    def _latency_stats(latencies: List[float]) -> Dict[str, float]:
+        p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+        return {
+            "p50_ms": round(float(p50), 1),
+            "p95_ms": round(float(p95), 1),
+            "p99_ms": round(float(p99), 1),
+        }
+
+    latencies_per_type = defaultdict(list)
+    for result in results:
+        latencies_per_type[result.request_type].append(result.latency)
+
+    summary = {
+        "requests": len(results),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "status_codes": dict(Counter(result.status_code for result in results)),
+        "errors": dict(Counter(r.error for r in results if r.error is not None)),
+        **(_latency_stats([r.latency for r in results]) if results else {}),
+        "per_request_type": {
+            request_type: {"requests": len(latencies), **_latency_stats(latencies)}
+            for request_type, latencies in latencies_per_type.items()
+        },
+        "max_rss_increase_mb": round(max_rss_mb() - baseline_max_rss_mb, 1),
+    }
+    return summary
+
+
+def run_load_test(
+    send_request: Callable[[str], int],
+    requests: List[PlannedRequest],
+    concurrency: int,
+    build_payload: Callable[[PlannedRequest], str],
+) -> Dict:
+    """
+    Sends the requests from concurrency threads. Every thread builds the payload of
+    its request just before sending it, outside the measured latency, so at most
+    concurrency payloads are in memory at once.
+    """
+
+    def _timed_request(request: PlannedRequest) -> RequestResult:
+        start = time.perf_counter()
+        try:
+            payload = build_payload(request)
+            start = time.perf_counter()
+            status_code = send_request(payload)
+        except Exception as e:
+            # A connection error or timeout fails this request, not the whole run.
+            return RequestResult(
+                request.request_type, 0, time.perf_counter() - start, type(e).__name__
+            )
+        return RequestResult(
+            request.request_type, status_code, time.perf_counter() - start
+        )
+
+    baseline_max_rss_mb = max_rss_mb()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(_timed_request, requests))
+    return summarise_results(results, time.perf_counter() - start, baseline_max_rss_mb)
+
+
+def in_process_sender(score) -> Callable[[str], int]:
+    def _send(payload: str) -> int:
+        _, status_code = score.run(payload)
+        return status_code
+
+    return _send
+
+
+def http_sender(url: str) -> Callable[[str], int]:
+    if not url.startswith(("http://", "https://")):
+        raise ValueError(f"Disallowed URL scheme: {url}. Only http/https are allowed.")
+
+    def _send(payload: str) -> int:
+        request = urllib.request.Request(
+            url, payload.encode("utf-8"), {"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request) as response:  # nosec B310
+                response.read()
+                return response.getcode()
+        except urllib.error.HTTPError as error:
+            error.read()
+            return error.code
+
+    return _send
+
+
+def start_stand_in_server(score, port: int) -> ThreadingHTTPServer:
+    """
+    Starts a local HTTP server that mimics the scoring route of the AzureML inference
+    server: the request body is passed to score.run() and its response is returned
+    as a JSON list, with the status code returned by score.run().
+    """
+
+    class ScoreHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            response, status_code = score.run(body.decode("utf-8"))
+            encoded_response = json.dumps([response, status_code]).encode("utf-8")
+            self.send_response(status_code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(encoded_response)))
+            self.end_headers()
+            self.wfile.write(encoded_response)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), ScoreHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(opt):
+    if opt.images:
+        images = load_images(opt.images)
+    else:
+        images = create_synthetic_images(parse_image_sizes(opt.image_sizes), opt.seed)
+    request_mix = parse_request_mix(opt.request_mix)
+
+    server = None
+    score = None
+    if opt.mode == "in-process" or not opt.url:
+        # Importing score loads config.yml and sets up logging, so only do it when
+        # the endpoint runs in this process.
+        from blurring_as_a_service.endpoint.components import score
+
+        score.init()
+
+    if opt.mode == "in-process":
+        send_request = in_process_sender(score)
+    else:
+        url = opt.url
+        if not url:
+            server = start_stand_in_server(score, opt.port)
+            url = f"http://127.0.0.1:{opt.port}/score"
+        send_request = http_sender(url)
+
+    build_payload = PayloadBuilder(images, unique_images=not opt.allow_cache_hits)
+    if opt.warmup:
+        warmup_requests = plan_requests(
+            request_mix,
+            opt.warmup,
+            len(images),
+            opt.seed + 1,
+            first_request_index=opt.requests,
+        )
+        run_load_test(send_request, warmup_requests, opt.concurrency, build_payload)
+
+    requests = plan_requests(request_mix, opt.requests, len(images), opt.seed)
+    summary = run_load_test(send_request, requests, opt.concurrency, build_payload)
+    summary["repeated_image_ratio"] = repeated_image_ratio(
+        requests, build_payload.unique_images
+    )
+    summary["images"] = (
+        "files" if opt.images else "synthetic, not representative of real panoramas"
+    )
+    print(json.dumps(summary, indent=4))
+
+    if opt.output:
+        with open(opt.output, "w") as f:
+            json.dump(summary, f, indent=4)
+    if server:
+        server.shutdown()
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--mode",
+        choices=["in-process", "http"],
+        default="in-process",
+        help="call score.run() directly or over HTTP",
+    )
+    parser.add_argument(
+        "--url",
+        default="",
+        help="scoring URL of a running server, a local stand-in is started if empty",
+    )
+    parser.add_argument("--port", type=int, default=5001, help="port of the stand-in")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=2, help="requests not measured")
+    parser.add_argument(
+        "--image-sizes",
+        default="8000x4000",
+        help="comma separated WIDTHxHEIGHT sizes of the synthetic images",
+    )
+    parser.add_argument(
+        "--images", nargs="*", help="image files to send instead of synthetic images"
+    )
+    parser.add_argument(
+        "--request-mix",
+        default="image:1",
+        help=f"comma separated TYPE:WEIGHT pairs, types: {list(REQUEST_TYPES)}",
+    )
+    parser.add_argument(
+        "--allow-cache-hits",
+        action="store_true",
+        help="reuse the same images across requests, so the response cache can "
+        "serve them; the share of repeated images is reported",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="", help="optional JSON file for results")
+    opt = parser.parse_args()
+    return opt
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    main(opt)
@@ -0,0 +1,60 @@
+from typing import Optional
+
+import cv2
+import numpy.typing as npt
+
+DEFAULT_PREVIEW_QUALITY = 75
+
+
+def downscale_image(image: npt.NDArray, max_size: int) -> npt.NDArray:
+    """
+    Downscales an image so that its largest dimension is at most max_size pixels,
+    keeping the aspect ratio. Images that are already small enough are returned
+    unchanged.
+
+    Parameters
+    ----------
+    image : npt.NDArray
+        The image to downscale, in (height, width, channels) layout.
+    max_size : int
+        Maximum width or height of the returned image.
+
+    Returns
+    -------
+    npt.NDArray
+        The downscaled image.
+    """
+    height, width = image.shape[:2]
+    scale = max_size / max(height, width)
+    if scale >= 1:
+        return image
+    new_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image, new_size, interpolation=cv2.INTER_AREA)
+
+
+def encode_jpeg(image: npt.NDArray, quality: Optional[int] = None) -> bytes:
+    """
+    Encodes an image as JPEG.
+
+    Parameters
+    ----------
+    image : npt.NDArray
+        The BGR image to encode.
+    quality : Optional[int]
+        JPEG quality between 1 and 100. If omitted, the OpenCV default is used.
+
+    Returns
+    -------
+    bytes
+        The encoded image.
+
+    Raises
+    ------
+    ValueError
+        If OpenCV fails to encode the image.
+    """
+    params = [] if quality is None else [cv2.IMWRITE_JPEG_QUALITY, quality]
+    success, encoded_image = cv2.imencode(".jpg", image, params)
+    if not success:
+        raise ValueError("Image encoding to JPG failed.")
+    return encoded_image.tobytes()
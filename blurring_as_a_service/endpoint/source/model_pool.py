@@ -0,0 +1,123 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+
+class ModelPoolSaturatedError(Exception):
+    """Raised when a request arrives while the admission queue is full."""
+
+
+class RequestDeadlineExceededError(Exception):
+    """Raised when a request runs past its deadline."""
+
+
+class Deadline:
+    """
+    Deadline of a single request, started when the object is created.
+
+    Parameters
+    ----------
+    seconds : float
+        Time budget of the request. A value of 0 means no deadline.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self._expires_at = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> Optional[float]:
+        """
+        Remaining time in seconds, or None when there is no deadline.
+        """
+        if self._expires_at is None:
+            return None
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self._expires_at is not None and time.monotonic() >= self._expires_at
+
+    def check(self, stage: str) -> None:
+        if self.expired():
+            raise RequestDeadlineExceededError(
+                f"Request deadline of {self.seconds}s exceeded before {stage}."
+            )
+
+
+class ModelPool:
+    """
+    Holds a fixed number of model replicas and controls how many requests are
+    processed at the same time.
+
+    Every request first has to be admitted. At most `n_replicas + max_queued_requests`
+    requests are admitted at once, further requests are rejected immediately so the
+    caller can answer with a 503 instead of piling up work. An admitted request then
+    waits for a free replica, each replica is used by one thread at a time.
+
+    Parameters
+    ----------
+    model_factory : Callable[[], Any]
+        Function that loads one model replica.
+    n_replicas : int
+        Number of replicas to load, i.e. the number of concurrent inferences.
+    max_queued_requests : int
+        Number of admitted requests that may wait for a free replica.
+    """
+
+    def __init__(
+        self,
+        model_factory: Callable[[], Any],
+        n_replicas: int = 1,
+        max_queued_requests: int = 4,
+    ):
+        if n_replicas < 1:
+            raise ValueError("At least one model replica is required.")
+        self.n_replicas = n_replicas
+        self.max_queued_requests = max_queued_requests
+        self._replicas: queue.Queue = queue.Queue()
+        for _ in range(n_replicas):
+            self._replicas.put(model_factory())
+        self._admission = threading.BoundedSemaphore(n_replicas + max_queued_requests)
+
+    @contextmanager
+    def admit(self) -> Iterator[None]:
+        """
+        Admits a request for the duration of the context.
+
+        Raises
+        ------
+        ModelPoolSaturatedError
+            If the maximum number of requests is already being processed.
+        """
+        if not self._admission.acquire(blocking=False):
+            raise ModelPoolSaturatedError(
+                f"{self.n_replicas + self.max_queued_requests} requests are already "
+                f"being processed."
+            )
+        try:
+            yield
+        finally:
+            self._admission.release()
+
+    @contextmanager
+    def replica(self, deadline: Deadline) -> Iterator[Any]:
+        """
+        Waits for a free model replica and lends it for the duration of the context.
+
+        Raises
+        ------
+        RequestDeadlineExceededError
+            If no replica becomes available before the deadline.
+        """
+        try:
+            model = self._replicas.get(timeout=deadline.remaining())
+        except queue.Empty:
+            raise RequestDeadlineExceededError(
+                f"Request deadline of {deadline.seconds}s exceeded while waiting "
+                f"for a model replica."
+            )
+        try:
+            yield model
+        finally:
+            self._replicas.put(model)
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedResult:
+    """
+    Result of a previous endpoint invocation for one image.
+
+    Attributes
+    ----------
+    detections : Dict
+        JSON-serialisable detections of the image (boxes, classes, scores, sensitive
+        boxes and metadata counts).
+    encoded_image : Optional[bytes]
+        The blurred image encoded as JPEG, only present when the cache is configured
+        to store images.
+    created_at : float
+        Monotonic time at which the entry was stored.
+    size_bytes : int
+        Approximate memory footprint of the entry, used for the byte budget.
+    """
+
+    detections: Dict
+    encoded_image: Optional[bytes] = None
+    created_at: float = field(default_factory=time.monotonic)
+    size_bytes: int = field(init=False)
+
+    def __post_init__(self):
+        detections_size = len(json.dumps(self.detections))
+        image_size = len(self.encoded_image) if self.encoded_image is not None else 0
+        self.size_bytes = detections_size + image_size
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of endpoint results keyed on the content hash of the
+    submitted image. Entries are evicted when they are older than `ttl_seconds` or
+    when the total size of the stored entries exceeds `max_bytes`.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Byte budget of the cache. A value of 0 disables caching.
+    ttl_seconds : float
+        Time to live of an entry in seconds. A value of 0 means entries never expire.
+    store_images : bool
+        Whether to also store the encoded blurred image, so that identical requests
+        are answered without decoding, blurring and encoding the image again.
+    log_every : int
+        Log the hit/miss counters every `log_every` lookups.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl_seconds: float = 3600,
+        store_images: bool = False,
+        log_every: int = 100,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.store_images = store_images
+        self.log_every = log_every
+        self._entries: OrderedDict[str, CachedResult] = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(image_bytes: bytes) -> str:
+        """
+        Computes the cache key of an image from its raw (base64 decoded) bytes.
+        """
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        """
+        Returns the cached result for `key`, or None if it is absent or expired.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_expired(entry):
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            lookups = self.hits + self.misses
+        if self.log_every and lookups % self.log_every == 0:
+            logger.info(f"Response cache statistics: {self.stats()}")
+        return entry
+
+    def put(
+        self, key: str, detections: Dict, encoded_image: Optional[bytes] = None
+    ) -> None:
+        """
+        Stores the result for `key`. The encoded image is only kept when the cache
+        is configured to store images. Entries larger than the byte budget are not
+        stored.
+        """
+        if not self.enabled:
+            return
+        entry = CachedResult(
+            detections=detections,
+            encoded_image=encoded_image if self.store_images else None,
+            created_at=time.monotonic(),
+        )
+        entry_size = entry.size_bytes
+        if entry_size > self.max_bytes:
+            logger.debug(
+                f"Result of {entry_size} bytes exceeds the cache budget, not cached."
+            )
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._current_bytes += entry_size
+            self._evict()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_bytes": self._current_bytes,
+            }
+
+    def _is_expired(self, entry: CachedResult) -> bool:
+        return bool(self.ttl_seconds) and (
+            time.monotonic() - entry.created_at > self.ttl_seconds
+        )
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._current_bytes -= entry.size_bytes
+
+    def _evict(self) -> None:
+        # Expired entries go first, then least recently used ones until within budget.
+        for key in [k for k, e in self._entries.items() if self._is_expired(e)]:
+            self._remove(key)
+            self.evictions += 1
+        while self._current_bytes > self.max_bytes:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
@@ -3,6 +3,7 @@ from azure.ai.ml.entities import (
     CodeConfiguration,
     ManagedOnlineDeployment,
     ManagedOnlineEndpoint,
+    OnlineRequestSettings,
 )
 
 from blurring_as_a_service.settings.settings import BlurringAsAServiceSettings
@@ -22,6 +23,12 @@ def main():
     ml_client = aml_interface.ml_client
     endpoint_name = settings["api_endpoint"]["endpoint_name"]
     deployment_color = settings["api_endpoint"]["deployment_color"]
+    # Let more requests reach score.py than it admits, so that bursts are rejected
+    # quickly with a 503 instead of waiting in the queue of the inference server.
+    max_concurrent_requests = 2 * (
+        settings["api_endpoint"]["model_replicas"]
+        + settings["api_endpoint"]["max_queued_requests"]
+    )
 
     endpoint = ManagedOnlineEndpoint(
         name=endpoint_name,
@@ -41,6 +48,9 @@ def main():
         ),
         instance_type=settings["api_endpoint"]["instance_type"],
         instance_count=1,
+        request_settings=OnlineRequestSettings(
+            max_concurrent_requests_per_instance=max_concurrent_requests
+        ),
         egress_public_network_access="disabled",
     )
     ml_client.online_deployments.begin_create_or_update(deployment).result()
@@ -80,6 +80,8 @@ def main():
                 if annotated_image_b64:
                     with open("annotated_image.jpg", "wb") as f:
                         f.write(base64.b64decode(annotated_image_b64))
+            if "detections" in response_dict:
+                print("Detections: ", response_dict["detections"])
             if "metadata" in response_dict:
                 print("Metadata: ", response_dict["metadata"])
     except Exception as error:
@@ -45,6 +45,9 @@ from blurring_as_a_service.inference_pipeline.source.baas_inference import (  #
 from blurring_as_a_service.inference_pipeline.source.db_utils import (  # noqa: E402
     create_db_connector,
 )
+from blurring_as_a_service.pre_inference_pipeline.source.image_paths import (  # noqa: E402
+    split_image_filename,
+)
 
 aml_experiment_settings = settings["aml_experiment_details"]
 run_id = Run.get_context().id
@@ -203,8 +206,7 @@ def create_dict_folders_and_frames_to_blur(
     folders_and_frames = defaultdict(list)
     for line in src:
         if line not in processed_images:
-            parent_folder = line.split("/")[0]
-            relative_path = line.split("/", 1)[1]
+            parent_folder, relative_path = split_image_filename(line)
             folders_and_frames[f"{input_structured_folder}/{parent_folder}"].append(
                 relative_path
             )
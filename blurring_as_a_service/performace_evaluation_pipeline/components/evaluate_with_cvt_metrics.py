@@ -74,6 +74,7 @@ def evaluate_with_cvt_metrics(
         dt_yolo_labels,
         markdown_output_path=f"{metrics_results}/tba_results.md",
         image_area=metrics_metadata["image_area"],
+        max_workers=os.cpu_count() or 1,
     )
 
     # ======== False Negative Rate metric ========= #
@@ -0,0 +1,245 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from blurring_as_a_service.performace_evaluation_pipeline.metrics.metrics_utils import (
+    boxes_to_pixel_coordinates,
+    count_mask_statistics,
+)
+
+
+class AnalyticTotalBlurredArea:
+    """
+    Computes the same per pixel statistics as cvtoolkit's TotalBlurredArea, but
+    from the box coordinates instead of from binary masks. A pixel is blurred if it
+    lies inside at least one box, so the pixel counts are areas of unions of
+    rectangles, computed exactly with coordinate compression. No mask of the image
+    size is ever allocated, the cost only depends on the number of boxes.
+
+    Boxes are converted to pixels exactly like generate_binary_mask does, so the
+    counts are identical to those of the mask based computation. Counts of compact
+    masks, see MaskFormat, can be accumulated with update_statistics_based_on_masks.
+    """
+
+    def __init__(self):
+        self.tp = 0
+        self.fp = 0
+        self.tn = 0
+        self.fn = 0
+
+    def update_statistics_based_on_boxes(
+        self,
+        true_boxes: npt.NDArray,
+        predicted_boxes: npt.NDArray,
+        image_width: int = 8000,
+        image_height: int = 4000,
+    ) -> None:
+        """
+        Adds the pixel counts of one image.
+
+        Parameters
+        ----------
+        true_boxes
+            Ground truth boxes with normalised (x_center, y_center, width, height).
+        predicted_boxes
+            Predicted boxes with normalised (x_center, y_center, width, height).
+        image_width
+        image_height
+        """
+        self._add(
+            *count_pixel_statistics(
+                true_boxes, predicted_boxes, image_width, image_height
+            )
+        )
+
+    def update_statistics_based_on_coverage(
+        self, true_boxes: npt.NDArray, predicted_coverage: "PredictionCoverage"
+    ) -> None:
+        """
+        Adds the pixel counts of one image, reusing the prediction coverage computed
+        for another subset of its ground truth boxes.
+        """
+        self._add(*predicted_coverage.count_pixel_statistics(true_boxes))
+
+    def update_statistics_based_on_masks(
+        self,
+        true_mask: npt.NDArray,
+        predicted_mask: npt.NDArray,
+        mask_width: Optional[int] = None,
+    ) -> None:
+        """
+        Adds the pixel counts of one image from masks created by
+        generate_binary_mask, in any MaskFormat.
+
+        Parameters
+        ----------
+        true_mask
+        predicted_mask
+        mask_width
+            Width of the masks in pixels, required for packed masks.
+        """
+        self._add(*count_mask_statistics(true_mask, predicted_mask, mask_width))
+
+    def merge(self, other: "AnalyticTotalBlurredArea") -> "AnalyticTotalBlurredArea":
+        """
+        Adds the counts of another instance, e.g. one that evaluated a different
+        shard of the images in another process. The counts are integers, so the
+        merged statistics do not depend on how the images were sharded.
+        """
+        self._add(other.tp, other.fp, other.tn, other.fn)
+        return self
+
+    def _add(self, tp: int, fp: int, tn: int, fn: int) -> None:
+        self.tp += tp
+        self.fp += fp
+        self.tn += tn
+        self.fn += fn
+
+    def get_statistics(self) -> Dict[str, Optional[float]]:
+        precision = (
+            round(self.tp / (self.tp + self.fp), 3) if self.tp + self.fp > 0 else None
+        )
+        recall = (
+            round(self.tp / (self.tp + self.fn), 3) if self.tp + self.fn > 0 else None
+        )
+        f1_score = (
+            round(2 * precision * recall / (precision + recall), 3)
+            if precision and recall
+            else None
+        )
+        return {
+            "true_positives": self.tp,
+            "false_positives": self.fp,
+            "true_negatives": self.tn,
+            "false_negatives": self.fn,
+            "precision": precision,
+            "recall": recall,
+            "f1_score": f1_score,
+        }
+
+
+class PredictionCoverage:
+    """
+    The pixels covered by the predictions of one image, computed once so every
+    subset of its ground truth boxes, e.g. per class and size, can be compared
+    against them without converting the predictions again.
+
+    Parameters
+    ----------
+    predicted_boxes
+        Predicted boxes with normalised (x_center, y_center, width, height).
+    image_width
+    image_height
+    """
+
+    def __init__(
+        self,
+        predicted_boxes: npt.NDArray,
+        image_width: int = 8000,
+        image_height: int = 4000,
+    ):
+        self.image_width = image_width
+        self.image_height = image_height
+        self.rectangles = _pixel_rectangles(predicted_boxes, image_width, image_height)
+        self.area = rectangle_union_area(self.rectangles)
+
+    def count_pixel_statistics(
+        self, true_boxes: npt.NDArray
+    ) -> Tuple[int, int, int, int]:
+        """
+        Counts the true positive, false positive, true negative and false negative
+        pixels of the ground truth boxes against the predictions.
+
+        Returns
+        -------
+        Tuple of (tp, fp, tn, fn)
+        """
+        true_rectangles = _pixel_rectangles(
+            true_boxes, self.image_width, self.image_height
+        )
+        true_area = rectangle_union_area(true_rectangles)
+        union_area = rectangle_union_area(
+            np.concatenate([true_rectangles, self.rectangles])
+        )
+
+        tp = true_area + self.area - union_area
+        fp = self.area - tp
+        fn = true_area - tp
+        tn = self.image_width * self.image_height - union_area
+        return tp, fp, tn, fn
+
+
+def count_pixel_statistics(
+    true_boxes: npt.NDArray,
+    predicted_boxes: npt.NDArray,
+    image_width: int = 8000,
+    image_height: int = 4000,
+) -> Tuple[int, int, int, int]:
+    """
+    Counts the true positive, false positive, true negative and false negative
+    pixels of one image.
+
+    Returns
+    -------
+    Tuple of (tp, fp, tn, fn)
+    """
+    return PredictionCoverage(
+        predicted_boxes, image_width, image_height
+    ).count_pixel_statistics(true_boxes)
+
+
+def rectangle_union_area(rectangles: npt.NDArray) -> int:
+    """
+    Area of the union of axis aligned rectangles (x_min, y_min, x_max, y_max) with
+    integer coordinates, covering [x_min, x_max) x [y_min, y_max).
+
+    The distinct x and y edges split the plane into a grid of cells that are either
+    fully covered or not covered at all. Coverage is counted with a 2D difference
+    array, so the cost is O(n^2) in the number of rectangles.
+    """
+    if len(rectangles) == 0:
+        return 0
+    x_min, y_min, x_max, y_max = rectangles.T
+    xs = np.unique(np.concatenate([x_min, x_max]))
+    ys = np.unique(np.concatenate([y_min, y_max]))
+    x0, x1 = np.searchsorted(xs, x_min), np.searchsorted(xs, x_max)
+    y0, y1 = np.searchsorted(ys, y_min), np.searchsorted(ys, y_max)
+
+    coverage = np.zeros((len(ys), len(xs)), dtype=np.int32)
+    np.add.at(coverage, (y0, x0), 1)
+    np.add.at(coverage, (y0, x1), -1)
+    np.add.at(coverage, (y1, x0), -1)
+    np.add.at(coverage, (y1, x1), 1)
+    covered = coverage.cumsum(axis=0).cumsum(axis=1)[:-1, :-1] > 0
+
+    cell_areas = np.outer(np.diff(ys), np.diff(xs))
+    return int(cell_areas[covered].sum())
+
+
+def _pixel_rectangles(
+    bounding_boxes: npt.NDArray, image_width: int, image_height: int
+) -> npt.NDArray:
+    """
+    Converts normalised boxes to the pixel rectangles that generate_binary_mask
+    fills, following numpy's slicing rules for negative and out of range indices.
+    Empty rectangles are dropped.
+    """
+    if len(bounding_boxes) == 0:
+        return np.zeros((0, 4), dtype=np.int64)
+    x_min, y_min, x_max, y_max = boxes_to_pixel_coordinates(
+        bounding_boxes, image_width, image_height
+    )
+    x_min, x_max = _slice_bounds(x_min, image_width), _slice_bounds(x_max, image_width)
+    y_min = _slice_bounds(y_min, image_height)
+    y_max = _slice_bounds(y_max, image_height)
+    rectangles = np.stack([x_min, y_min, x_max, y_max], axis=1).astype(np.int64)
+    is_empty = (rectangles[:, 2] <= rectangles[:, 0]) | (
+        rectangles[:, 3] <= rectangles[:, 1]
+    )
+    return rectangles[~is_empty]
+
+
+def _slice_bounds(indices: npt.NDArray, length: int) -> npt.NDArray:
+    """Resolves slice bounds like numpy does: negative from the end, then clipped."""
+    return np.clip(np.where(indices < 0, indices + length, indices), 0, length)
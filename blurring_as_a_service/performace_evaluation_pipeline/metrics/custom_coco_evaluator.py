@@ -4,6 +4,7 @@ import copy
 import datetime
 import time
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 from pycocotools import mask as maskUtils
@@ -35,7 +36,8 @@ class CustomCOCOeval:
     # Note: multiple areaRngs [Ax2] and maxDets [Mx1] can be specified.
     #
     # evaluate(): evaluates detections on every image and every category and
-    # concats the results into the "evalImgs" with fields:
+    # concats the results into the "evalImgs" with fields (stored column wise in
+    # an EvalImgs, indexing it returns a dict per image and category):
     #  dtIds      - [1xD] id for each of the D detections (dt)
     #  gtIds      - [1xG] id for each of the G ground truths (gt)
     #  dtMatches  - [TxD] matching gt id at each IoU or 0
@@ -80,6 +82,7 @@ class CustomCOCOeval:
         self._paramsEval = {}  # parameters for evaluation
         self.stats = []  # result summarization
         self.ious = {}  # ious between all gts and dts
+        self._iouCache = None  # ious of a previous evaluate, see _getCachedIous
         if cocoGt is not None:
             self.params.imgIds = sorted(cocoGt.getImgIds())
             self.params.catIds = sorted(cocoGt.getCatIds())
@@ -128,9 +131,12 @@ class CustomCOCOeval:
         self.evalImgs = defaultdict(list)  # per-image per-category evaluation results
         self.eval = {}  # accumulated evaluation results
 
-    def evaluate(self):
+    def evaluate(self, max_workers=1):
         """
-        Run per image evaluation on given images and store results (a list of dict) in self.evalImgs
+        Run per image evaluation on given images and store results (an EvalImgs) in self.evalImgs
+        The ious of a previous evaluate are reused when only the area ranges, the image ids or
+        the maxDets (up to the previous largest) changed, so parameter sweeps only redo the matching.
+        :param max_workers: number of processes evaluating the images, 1 evaluates them in this process
         :return: None
         """
         tic = time.time()
@@ -155,27 +161,134 @@ class CustomCOCOeval:
         # loop through images, area range, max detection number
         catIds = p.catIds if p.useCats else [-1]
 
+        cachedIous = self._getCachedIous(catIds)
+        if max_workers > 1:
+            self.ious, self.evalImgs = self._evaluateParallel(
+                catIds, max_workers, cachedIous
+            )
+        else:
+            self.ious, self.evalImgs = self._evaluateImages(
+                p.imgIds, catIds, cachedIous
+            )
+        self._setCachedIous(catIds)
+        self._paramsEval = copy.deepcopy(self.params)
+        toc = time.time()
+        print("DONE (t={:0.2f}s).".format(toc - tic))
+
+    def _iouCacheKey(self, catIds):
+        # the ious only depend on the annotations and on how they are grouped, with
+        # useCats=0 the annotations of all of p.catIds are pooled under catId -1.
+        # The COCO objects themselves are kept, not their id, which is reused once
+        # an object replaced by a new one is freed.
+        p = self.params
+        return (
+            self.cocoGt,
+            self.cocoDt,
+            p.iouType,
+            p.useCats,
+            tuple(catIds),
+            tuple(p.catIds),
+        )
+
+    def _iouCacheKeyMatches(self, key, catIds):
+        current = self._iouCacheKey(catIds)
+        return key[0] is current[0] and key[1] is current[1] and key[2:] == current[2:]
+
+    def _getCachedIous(self, catIds):
+        """
+        Ious of the previous evaluate that are valid for the current params. The ious
+        of an image are computed for its detections sorted by score and cut to
+        maxDets[-1], so a smaller maxDets[-1] only keeps their first rows.
+        Note that changes made to cocoGt or cocoDt in place are not detected.
+        :return: dict of (imgId, catId) to ious, empty if nothing can be reused
+        """
+        maxDet = self.params.maxDets[-1]
+        if self._iouCache is None:
+            return {}
+        key, cachedMaxDet, ious = self._iouCache
+        if not self._iouCacheKeyMatches(key, catIds) or cachedMaxDet < maxDet:
+            return {}
+        if cachedMaxDet == maxDet:
+            return ious
+        return {k: v[:maxDet] if len(v) else v for k, v in ious.items()}
+
+    def _setCachedIous(self, catIds):
+        key, maxDet = self._iouCacheKey(catIds), self.params.maxDets[-1]
+        # keep ious computed for more detections, they are cut when reused
+        if (
+            self._iouCache is not None
+            and self._iouCacheKeyMatches(self._iouCache[0], catIds)
+            and self._iouCache[1] > maxDet
+        ):
+            return
+        self._iouCache = (key, maxDet, self.ious)
+
+    def _evaluateImages(self, imgIds, catIds, cachedIous=None):
+        """
+        Compute the ious, except the cached ones, and evaluate the given images
+        :return: ious dict and EvalImgs ordered by category, area range and image
+        """
+        cachedIous = cachedIous or {}
+        p = self.params
         if p.iouType == "segm" or p.iouType == "bbox":
             computeIoU = self.computeIoU
         elif p.iouType == "keypoints":
             computeIoU = self.computeOks
         self.ious = {
-            (imgId, catId): computeIoU(imgId, catId)
-            for imgId in p.imgIds
+            (imgId, catId): (
+                cachedIous[imgId, catId]
+                if (imgId, catId) in cachedIous
+                else computeIoU(imgId, catId)
+            )
+            for imgId in imgIds
             for catId in catIds
         }
 
         evaluateImg = self.evaluateImg
         maxDet = p.maxDets[-1]
-        self.evalImgs = [
-            evaluateImg(imgId, catId, areaRng, maxDet)
-            for catId in catIds
-            for areaRng in p.areaRng
-            for imgId in p.imgIds
+        evalImgs = EvalImgs.fromList(
+            (
+                evaluateImg(imgId, catId, areaRng, maxDet)
+                for catId in catIds
+                for areaRng in p.areaRng
+                for imgId in imgIds
+            ),
+            len(p.iouThrs),
+        )
+        return self.ious, evalImgs
+
+    def _evaluateParallel(self, catIds, max_workers, cachedIous=None):
+        """
+        Evaluate contiguous shards of the images in a process pool. The params, gts and dts
+        are sent once to every worker, the results are put back in the order of evalImgs.
+        :return: ious dict and EvalImgs ordered by category, area range and image
+        """
+        p = self.params
+        nShards = min(len(p.imgIds), max_workers * SHARDS_PER_WORKER)
+        shardSize = -(-len(p.imgIds) // nShards) if nShards else 1
+        shards = [
+            p.imgIds[i : i + shardSize] for i in range(0, len(p.imgIds), shardSize)
         ]
-        self._paramsEval = copy.deepcopy(self.params)
-        toc = time.time()
-        print("DONE (t={:0.2f}s).".format(toc - tic))
+        ious = {}
+        # results[k][a] holds the evalImgs of category k and area range a per shard
+        results = [[[] for _ in p.areaRng] for _ in catIds]
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_initEvaluationWorker,
+            initargs=(p, self._gts, self._dts, cachedIous or {}),
+        ) as executor:
+            for shardIous, shardEvalImgs in executor.map(
+                _evaluateShard, shards, [catIds] * len(shards)
+            ):
+                ious.update(shardIous)
+                for k, perArea in enumerate(shardEvalImgs):
+                    for a, evalImgs in enumerate(perArea):
+                        results[k][a].extend(evalImgs)
+        evalImgs = EvalImgs.concatenate(
+            [e for perArea in results for evalImgs in perArea for e in evalImgs],
+            len(p.iouThrs),
+        )
+        return ious, evalImgs
 
     def computeIoU(self, imgId, catId):
         p = self.params
@@ -291,35 +404,20 @@ class CustomCOCOeval:
         T = len(p.iouThrs)
         G = len(gt)
         D = len(dt)
-        gtm = np.zeros((T, G))
-        dtm = np.zeros((T, D))
         gtIg = np.array([g["_ignore"] for g in gt])
-        dtIg = np.zeros((T, D))
         if not len(ious) == 0:
-            for tind, t in enumerate(p.iouThrs):
-                for dind, d in enumerate(dt):
-                    # information about best match so far (m=-1 -> unmatched)
-                    iou = min([t, 1 - 1e-10])
-                    m = -1
-                    for gind, g in enumerate(gt):
-                        # if this gt already matched, and not a crowd, continue
-                        if gtm[tind, gind] > 0 and not iscrowd[gind]:
-                            continue
-                        # if dt matched to reg gt, and on ignore gt, stop
-                        if m > -1 and gtIg[m] == 0 and gtIg[gind] == 1:
-                            break
-                        # continue to next gt unless better match made
-                        if ious[dind, gind] < iou:
-                            continue
-                        # if match successful and best so far, store appropriately
-                        iou = ious[dind, gind]
-                        m = gind
-                    # if match made store id of match for both dt and gt
-                    if m == -1:
-                        continue
-                    dtIg[tind, dind] = gtIg[m]
-                    dtm[tind, dind] = gt[m]["id"]
-                    gtm[tind, m] = d["id"]
+            dtm, gtm, dtIg = greedyMatch(
+                ious,
+                p.iouThrs,
+                gtIg,
+                np.array(iscrowd, dtype=bool),
+                np.array([g["id"] for g in gt]),
+                np.array([d["id"] for d in dt]),
+            )
+        else:
+            gtm = np.zeros((T, G))
+            dtm = np.zeros((T, D))
+            dtIg = np.zeros((T, D))
         # set unmatched detections outside of area range to ignore
         a = np.array([d["area"] < aRng[0] or d["area"] > aRng[1] for d in dt]).reshape(
             (1, len(dt))
@@ -340,15 +438,19 @@ class CustomCOCOeval:
             "dtIgnore": dtIg,
         }
 
-    def accumulate(self, p=None):
+    def accumulate(self, p=None, scoreThr=None):
         """
         Accumulate per image evaluation results and store the result in self.eval
         :param p: input params for evaluation
+        :param scoreThr: only count detections with at least this score, either one threshold
+            or a dict of category id to threshold. Matching processes detections by decreasing
+            score, so this gives the same result as evaluating without the other detections,
+            and one evaluate() can be accumulated at any number of thresholds.
         :return: None
         """
         print("Accumulating evaluation results...")
         tic = time.time()
-        if not self.evalImgs:
+        if not isinstance(self.evalImgs, EvalImgs) or not self.evalImgs:
             print("Please run evaluate() first")
         # allows input customized parameters
         if p is None:
@@ -382,32 +484,35 @@ class CustomCOCOeval:
         I0 = len(_pe.imgIds)
         A0 = len(_pe.areaRng)
         # retrieve E at each category, area range, and max number of detections
+        E = self.evalImgs
         for k, k0 in enumerate(k_list):
             Nk = k0 * A0 * I0
+            threshold = (
+                scoreThr.get(p.catIds[k0]) if isinstance(scoreThr, dict) else scoreThr
+            )
             for a, a0 in enumerate(a_list):
                 Na = a0 * I0
+                eInds = Nk + Na + np.array(i_list, dtype=np.int64)
+                eInds = eInds[E.valid[eInds]]
+                if len(eInds) == 0:
+                    continue
+                gtIg = E.gtIgnore[E.gtPositions(eInds)]
+                npig = np.count_nonzero(gtIg == 0)
+                if npig == 0:
+                    continue
                 for m, maxDet in enumerate(m_list):
-                    E = [self.evalImgs[Nk + Na + i] for i in i_list]
-                    E = [e for e in E if e is not None]
-                    if len(E) == 0:
-                        continue
-                    dtScores = np.concatenate([e["dtScores"][0:maxDet] for e in E])
+                    dtPositions = E.dtPositions(eInds, maxDet)
+                    if threshold is not None:
+                        dtPositions = dtPositions[E.dtScores[dtPositions] >= threshold]
+                    dtScores = E.dtScores[dtPositions]
 
                     # different sorting method generates slightly different results.
                     # mergesort is used to be consistent as Matlab implementation.
                     inds = np.argsort(-dtScores, kind="mergesort")
                     dtScoresSorted = dtScores[inds]
 
-                    dtm = np.concatenate(
-                        [e["dtMatches"][:, 0:maxDet] for e in E], axis=1
-                    )[:, inds]
-                    dtIg = np.concatenate(
-                        [e["dtIgnore"][:, 0:maxDet] for e in E], axis=1
-                    )[:, inds]
-                    gtIg = np.concatenate([e["gtIgnore"] for e in E])
-                    npig = np.count_nonzero(gtIg == 0)
-                    if npig == 0:
-                        continue
+                    dtm = E.dtMatches[:, dtPositions[inds]]
+                    dtIg = E.dtIgnore[:, dtPositions[inds]]
                     tps = np.logical_and(dtm, np.logical_not(dtIg))
                     fps = np.logical_and(np.logical_not(dtm), np.logical_not(dtIg))
 
@@ -449,6 +554,7 @@ class CustomCOCOeval:
                         scores[t, :, k, a, m] = np.array(ss)
         self.eval = {
             "params": p,
+            "scoreThr": scoreThr,
             "counts": [T, R, K, A, M],
             "date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "precision": precision,
@@ -559,6 +665,290 @@ class CustomCOCOeval:
         self.summarize()
 
 
+class EvalImgs:
+    """
+    Columnar storage of the per-image, per-category evaluation results of evaluate().
+    Instead of one dict per element, the detections and ground truths of all elements are
+    stored in flat arrays, and element n owns dt columns dtOffsets[n]:dtOffsets[n+1] and
+    gt columns gtOffsets[n]:gtOffsets[n+1]. Elements without gts and dts (None in
+    pycocotools) have valid[n] == False. Indexing returns the pycocotools dict.
+    """
+
+    def __init__(
+        self,
+        valid,
+        imageIds,
+        categoryIds,
+        aRngs,
+        maxDets,
+        dtOffsets,
+        gtOffsets,
+        dtIds,
+        dtScores,
+        dtMatches,
+        dtIgnore,
+        gtIds,
+        gtMatches,
+        gtIgnore,
+    ):
+        self.valid = valid  # [N] False for elements without gts and dts
+        self.imageIds = imageIds  # [N]
+        self.categoryIds = categoryIds  # [N]
+        self.aRngs = aRngs  # [Nx2]
+        self.maxDets = maxDets  # [N]
+        self.dtOffsets = dtOffsets  # [N+1]
+        self.gtOffsets = gtOffsets  # [N+1]
+        self.dtIds = dtIds  # [D]
+        self.dtScores = dtScores  # [D]
+        self.dtMatches = dtMatches  # [TxD]
+        self.dtIgnore = dtIgnore  # [TxD]
+        self.gtIds = gtIds  # [G]
+        self.gtMatches = gtMatches  # [TxG]
+        self.gtIgnore = gtIgnore  # [G]
+
+    @classmethod
+    def fromList(cls, evalImgs, T):
+        """
+        Build the columns from evaluateImg results, consuming them one at a time
+        :param evalImgs: iterable of evaluateImg dicts or None
+        :param T: number of IoU thresholds
+        """
+        valid, imageIds, categoryIds, aRngs, maxDets = [], [], [], [], []
+        dtLengths, gtLengths = [0], [0]
+        dtIds, dtScores, dtMatches, dtIgnore = [], [], [], []
+        gtIds, gtMatches, gtIgnore = [], [], []
+        for e in evalImgs:
+            valid.append(e is not None)
+            if e is None:
+                imageIds.append(-1)
+                categoryIds.append(-1)
+                aRngs.append([0, 0])
+                maxDets.append(0)
+                dtLengths.append(0)
+                gtLengths.append(0)
+                continue
+            imageIds.append(e["image_id"])
+            categoryIds.append(e["category_id"])
+            aRngs.append(e["aRng"])
+            maxDets.append(e["maxDet"])
+            dtLengths.append(len(e["dtIds"]))
+            gtLengths.append(len(e["gtIds"]))
+            dtIds.extend(e["dtIds"])
+            dtScores.extend(e["dtScores"])
+            dtMatches.append(e["dtMatches"])
+            dtIgnore.append(e["dtIgnore"])
+            gtIds.extend(e["gtIds"])
+            gtMatches.append(e["gtMatches"])
+            gtIgnore.append(e["gtIgnore"])
+        return cls(
+            valid=np.array(valid, dtype=bool),
+            imageIds=np.array(imageIds),
+            categoryIds=np.array(categoryIds),
+            aRngs=np.array(aRngs, dtype=float).reshape(-1, 2),
+            maxDets=np.array(maxDets, dtype=np.int64),
+            dtOffsets=np.cumsum(dtLengths, dtype=np.int64),
+            gtOffsets=np.cumsum(gtLengths, dtype=np.int64),
+            dtIds=np.array(dtIds, dtype=np.int64),
+            dtScores=np.array(dtScores, dtype=float),
+            dtMatches=np.concatenate([np.zeros((T, 0))] + dtMatches, axis=1),
+            dtIgnore=np.concatenate(
+                [np.zeros((T, 0), dtype=bool)] + dtIgnore, axis=1
+            ).astype(bool),
+            gtIds=np.array(gtIds, dtype=np.int64),
+            gtMatches=np.concatenate([np.zeros((T, 0))] + gtMatches, axis=1),
+            gtIgnore=np.concatenate([np.zeros(0, dtype=np.int64)] + gtIgnore).astype(
+                np.int64
+            ),
+        )
+
+    @classmethod
+    def concatenate(cls, parts, T):
+        """
+        Concatenate EvalImgs, e.g. the results of different shards of the images
+        :param parts: list of EvalImgs
+        :param T: number of IoU thresholds
+        """
+        if not parts:
+            return cls.fromList([], T)
+
+        def offsets(name):
+            lengths = [np.diff(getattr(e, name)) for e in parts]
+            return np.concatenate([[0], np.cumsum(np.concatenate(lengths))]).astype(
+                np.int64
+            )
+
+        def concat(name, axis=0):
+            return np.concatenate([getattr(e, name) for e in parts], axis=axis)
+
+        return cls(
+            valid=concat("valid"),
+            imageIds=concat("imageIds"),
+            categoryIds=concat("categoryIds"),
+            aRngs=concat("aRngs"),
+            maxDets=concat("maxDets"),
+            dtOffsets=offsets("dtOffsets"),
+            gtOffsets=offsets("gtOffsets"),
+            dtIds=concat("dtIds"),
+            dtScores=concat("dtScores"),
+            dtMatches=concat("dtMatches", axis=1),
+            dtIgnore=concat("dtIgnore", axis=1),
+            gtIds=concat("gtIds"),
+            gtMatches=concat("gtMatches", axis=1),
+            gtIgnore=concat("gtIgnore"),
+        )
+
+    def subset(self, inds):
+        """
+        Copy of the elements inds
+        :param inds: [n] element indices
+        """
+        dt = self.dtPositions(inds)
+        gt = self.gtPositions(inds)
+        return EvalImgs(
+            valid=self.valid[inds],
+            imageIds=self.imageIds[inds],
+            categoryIds=self.categoryIds[inds],
+            aRngs=self.aRngs[inds],
+            maxDets=self.maxDets[inds],
+            dtOffsets=_runOffsets(self.dtOffsets, inds),
+            gtOffsets=_runOffsets(self.gtOffsets, inds),
+            dtIds=self.dtIds[dt],
+            dtScores=self.dtScores[dt],
+            dtMatches=self.dtMatches[:, dt],
+            dtIgnore=self.dtIgnore[:, dt],
+            gtIds=self.gtIds[gt],
+            gtMatches=self.gtMatches[:, gt],
+            gtIgnore=self.gtIgnore[gt],
+        )
+
+    def dtPositions(self, inds, maxDet=None):
+        """
+        Columns of the detections of elements inds, at most the first maxDet of each
+        """
+        return _runPositions(self.dtOffsets, inds, maxDet)
+
+    def gtPositions(self, inds):
+        """
+        Columns of the ground truths of elements inds
+        """
+        return _runPositions(self.gtOffsets, inds)
+
+    def __len__(self):
+        return len(self.valid)
+
+    def __getitem__(self, n):
+        if not self.valid[n]:
+            return None
+        dt = slice(self.dtOffsets[n], self.dtOffsets[n + 1])
+        gt = slice(self.gtOffsets[n], self.gtOffsets[n + 1])
+        return {
+            "image_id": self.imageIds[n].item(),
+            "category_id": self.categoryIds[n].item(),
+            "aRng": self.aRngs[n].tolist(),
+            "maxDet": self.maxDets[n].item(),
+            "dtIds": self.dtIds[dt].tolist(),
+            "gtIds": self.gtIds[gt].tolist(),
+            "dtMatches": self.dtMatches[:, dt],
+            "gtMatches": self.gtMatches[:, gt],
+            "dtScores": self.dtScores[dt].tolist(),
+            "gtIgnore": self.gtIgnore[gt],
+            "dtIgnore": self.dtIgnore[:, dt],
+        }
+
+    def __iter__(self):
+        return (self[n] for n in range(len(self)))
+
+
+def _runPositions(offsets, inds, limit=None):
+    """
+    Concatenated positions offsets[i]:offsets[i+1] of the runs inds, cut to limit
+    """
+    inds = np.asarray(inds, dtype=np.int64)
+    starts = offsets[inds]
+    lengths = offsets[inds + 1] - starts
+    if limit is not None:
+        lengths = np.minimum(lengths, limit)
+    runStarts = np.cumsum(lengths) - lengths
+    return np.repeat(starts - runStarts, lengths) + np.arange(lengths.sum())
+
+
+def _runOffsets(offsets, inds):
+    inds = np.asarray(inds, dtype=np.int64)
+    lengths = offsets[inds + 1] - offsets[inds]
+    return np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+
+
+# Shards per worker, smaller shards balance the load when images differ in size
+SHARDS_PER_WORKER = 4
+# Evaluator of the current worker process and the ious it reuses, see _initEvaluationWorker
+_workerEval = None
+_workerCachedIous = None
+
+
+def _initEvaluationWorker(params, gts, dts, cachedIous):
+    global _workerEval, _workerCachedIous
+    _workerEval = CustomCOCOeval(iouType=params.iouType)
+    _workerEval.params = params
+    _workerEval._gts = gts
+    _workerEval._dts = dts
+    _workerCachedIous = cachedIous
+
+
+def _evaluateShard(imgIds, catIds):
+    """
+    Evaluate a shard of the images in a worker process
+    :return: ious dict and the EvalImgs of the shard as [K][A] lists of one EvalImgs
+    """
+    ious, evalImgs = _workerEval._evaluateImages(imgIds, catIds, _workerCachedIous)
+    I, A = len(imgIds), len(_workerEval.params.areaRng)
+    perArea = [
+        [evalImgs.subset(np.arange(n * I, (n + 1) * I))] for n in range(len(catIds) * A)
+    ]
+    return ious, [perArea[k * A : (k + 1) * A] for k in range(len(catIds))]
+
+
+def greedyMatch(ious, iouThrs, gtIg, iscrowd, gtIds, dtIds):
+    """
+    COCO greedy matching of detections to ground truths at all IoU thresholds at once.
+    Detections, sorted by score, are matched one at a time to the unmatched (or crowd)
+    gt with the highest IoU above the threshold, the last one on ties. Ignored gts,
+    which are sorted last, are only matched when no regular gt can be matched.
+    This gives exactly the same result as looping over thresholds and gts.
+    :param ious: [DxG] ious between the sorted detections and ground truths
+    :param iouThrs: [T] IoU thresholds
+    :param gtIg: [G] ignore flag for each gt
+    :param iscrowd: [G] crowd flag for each gt
+    :param gtIds: [G] id of each gt
+    :param dtIds: [D] id of each dt
+    :return: dtMatches [TxD], gtMatches [TxG] and dtIgnore [TxD]
+    """
+    D, G = ious.shape
+    T = len(iouThrs)
+    gtm = np.zeros((T, G))
+    dtm = np.zeros((T, D))
+    dtIg = np.zeros((T, D))
+    thresholds = np.minimum(iouThrs, 1 - 1e-10)[:, None]
+    isRegular = gtIg == 0
+    tinds = np.arange(T)
+    for dind in range(D):
+        dIous = ious[dind]
+        # gts above the threshold, that are not matched yet or are crowd
+        candidates = (dIous >= thresholds) & ((gtm <= 0) | iscrowd)
+        regular = candidates & isRegular
+        candidates = np.where(regular.any(axis=1, keepdims=True), regular, candidates)
+        matched = candidates.any(axis=1)
+        if not matched.any():
+            continue
+        # last gt with the highest iou among the candidates
+        candidateIous = np.where(candidates, dIous, -np.inf)[:, ::-1]
+        m = G - 1 - np.argmax(candidateIous, axis=1)
+        t, m = tinds[matched], m[matched]
+        dtIg[t, dind] = gtIg[m]
+        dtm[t, dind] = gtIds[m]
+        gtm[t, m] = dtIds[dind]
+    return dtm, gtm, dtIg
+
+
 class Params:
     """
     Params for coco evaluation api
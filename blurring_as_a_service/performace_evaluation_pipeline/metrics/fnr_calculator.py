@@ -1,9 +1,8 @@
 import itertools
 import json
-from os import listdir
-from os.path import isfile, join
 from typing import List
 
+import numpy as np
 from cvtoolkit.converters.bias_category_mapper import (
     BiasCategoryMapper,
     SensitiveCategories,
@@ -12,6 +11,17 @@ from cvtoolkit.converters.bias_category_mapper import (
 from blurring_as_a_service.performace_evaluation_pipeline.metrics.metrics_utils import (
     ImageSize,
 )
+from blurring_as_a_service.performace_evaluation_pipeline.metrics.tagged_validation import (
+    TaggedValidation,
+    get_all_filenames_in_dir,
+    load_tagged_validation,
+)
+
+# Edges of the ImageSize buckets, a box of area a is in bucket i if
+# SIZE_BIN_EDGES[i] <= a < SIZE_BIN_EDGES[i + 1].
+SIZE_BIN_EDGES = np.array([ImageSize.small[0]] + [size[1] for size in ImageSize])
+# Order of the statistics along the last two axes of the count arrays.
+DETECTION_RESULTS = ["true_positives", "false_negatives"]
 
 
 class FalseNegativeRateCalculator:
@@ -28,7 +38,13 @@ class FalseNegativeRateCalculator:
 
     """
 
-    def __init__(self, tagged_validation_folder, coco_file_with_categories, image_area):
+    def __init__(
+        self,
+        tagged_validation_folder,
+        coco_file_with_categories,
+        image_area,
+        cache_path=None,
+    ):
         """
         Parameters
         ----------
@@ -38,14 +54,20 @@ class FalseNegativeRateCalculator:
             File containing the categories.
         image_area
             Number of pixels in image.
+        cache_path
+            Optional .npz file caching the parsed tagged validation files, so they
+            are only parsed again when they change.
         """
 
         self.image_area = image_area
         self._get_and_prepare_categories(coco_file_with_categories)
+        tagged_validation = load_tagged_validation(
+            tagged_validation_folder, cache_path=cache_path
+        )
         self._calculate_true_positives_and_false_negatives_per_category(
-            tagged_validation_folder
+            tagged_validation
         )
-        self._get_gt_boxes_and_predicted_boxes_per_category(tagged_validation_folder)
+        self._get_gt_boxes_and_predicted_boxes_per_category(tagged_validation)
 
     def calculate_and_store_metrics(self, markdown_output_path):
         """
@@ -114,49 +136,28 @@ class FalseNegativeRateCalculator:
         -------
         A list where each element is a category value and its metrics, included the false negative rate.
         """
-        sensitive_category_options = list(
-            {v[category_name] for k, v in self._statistics_per_category.items()}
+        category_ids = list(self._statistics_per_category)
+        sensitive_category_options, option_index = np.unique(
+            [self._statistics_per_category[i][category_name] for i in category_ids],
+            return_inverse=True,
         )
-
-        metrics_for_all_sensitive_category_options = {
-            metrics_for_sensitive_category_option: {
-                "true_positives": 0,
-                "true_positives_small": 0,
-                "true_positives_medium": 0,
-                "true_positives_large": 0,
-                "false_negatives": 0,
-                "false_negatives_small": 0,
-                "false_negatives_medium": 0,
-                "false_negatives_large": 0,
-            }
-            for metrics_for_sensitive_category_option in sensitive_category_options
-        }
-        for value in self._statistics_per_category.values():
-            metrics_for_sensitive_category = metrics_for_all_sensitive_category_options[
-                value[category_name]
-            ]
-            metrics_for_sensitive_category["true_positives"] += value["true_positives"]
-            metrics_for_sensitive_category["false_negatives"] += value[
-                "false_negatives"
-            ]
-            metrics_for_sensitive_category["true_positives_small"] += value[
-                "true_positives_small"
-            ]
-            metrics_for_sensitive_category["true_positives_medium"] += value[
-                "true_positives_medium"
-            ]
-            metrics_for_sensitive_category["true_positives_large"] += value[
-                "true_positives_large"
-            ]
-            metrics_for_sensitive_category["false_negatives_small"] += value[
-                "false_negatives_small"
-            ]
-            metrics_for_sensitive_category["false_negatives_medium"] += value[
-                "false_negatives_medium"
-            ]
-            metrics_for_sensitive_category["false_negatives_large"] += value[
-                "false_negatives_large"
-            ]
+        # Counts per option, detection result and size.
+        counts_per_option = np.zeros(
+            (len(sensitive_category_options), len(DETECTION_RESULTS), len(ImageSize)),
+            dtype=np.int64,
+        )
+        np.add.at(counts_per_option, option_index, self._counts[category_ids])
+
+        metrics_for_all_sensitive_category_options = {}
+        for option, counts in zip(sensitive_category_options, counts_per_option):
+            metrics = {}
+            for result_index, detection_result in enumerate(DETECTION_RESULTS):
+                metrics[detection_result] = int(counts[result_index].sum())
+                for size_index, size in enumerate(ImageSize):
+                    metrics[f"{detection_result}_{size.name}"] = int(
+                        counts[result_index, size_index]
+                    )
+            metrics_for_all_sensitive_category_options[str(option)] = metrics
 
         result = []
         for name, values in metrics_for_all_sensitive_category_options.items():
@@ -220,102 +221,87 @@ class FalseNegativeRateCalculator:
         return result
 
     def _calculate_true_positives_and_false_negatives_per_category(
-        self, tagged_validation_folder: str
+        self, tagged_validation: TaggedValidation
     ):
         """
-        For each category of each file in tagged_validation_folder it calculates the true positives and the false negatives.
+        Counts the true positives and the false negatives of each category and size,
+        with one bincount over all ground truth boxes.
 
         Parameters
         ----------
-        tagged_validation_folder
-            Path to the folder containing all the tagged validation values.
+        tagged_validation
+            The tagged validation results of all images.
         Raises
         ------
-        Exception in case the len of GT_boxes, GT_labels and TP_labels are not matching.
+        KeyError in case a ground truth label is not one of the categories.
+        ValueError in case the area of a ground truth box is outside of ImageSize.
 
         """
-
-        def _classify_bbox_area(bbox_area, image_size, image_area):
-            for s in image_size:
-                if s[0] <= bbox_area < s[1]:
-                    return s
-
-        for tagged_validation_file in self.get_all_filenames_in_dir(
-            tagged_validation_folder
-        ):
-            with open(f"{tagged_validation_folder}/{tagged_validation_file}") as f:
-                tagged_validation_content = json.load(f)
-                if any(
-                    len(tagged_validation_content[key])
-                    != len(tagged_validation_content["GT_labels"])
-                    for key in ["GT_boxes", "TP_labels"]
-                ):
-                    raise Exception(
-                        f"{tagged_validation_file} not well formed, "
-                        f"the len of GT_boxes, GT_labels and TP_labels is not matching."
-                    )
-
-                for i, (gt_box, gt_label) in enumerate(
-                    zip(
-                        tagged_validation_content["GT_boxes"],
-                        tagged_validation_content["GT_labels"],
-                    )
-                ):
-                    category_stats = self._statistics_per_category[gt_label]
-                    category_stats["area"] = gt_box[2] * gt_box[3] * self.image_area
-                    size = _classify_bbox_area(
-                        category_stats["area"], ImageSize, self.image_area
+        labels = tagged_validation.gt_labels
+        unknown_labels = np.setdiff1d(labels, list(self._statistics_per_category))
+        if len(unknown_labels):
+            raise KeyError(f"Unknown ground truth labels {unknown_labels.tolist()}")
+
+        areas = (
+            tagged_validation.gt_boxes[:, 2]
+            * tagged_validation.gt_boxes[:, 3]
+            * self.image_area
+        )
+        size_index = np.digitize(areas, SIZE_BIN_EDGES) - 1
+        if np.any((size_index < 0) | (size_index >= len(ImageSize))):
+            raise ValueError(
+                f"Box areas must be in [{SIZE_BIN_EDGES[0]}, {SIZE_BIN_EDGES[-1]}), "
+                f"check the image_area."
+            )
+        result_index = (~tagged_validation.tp_labels).astype(np.int64)
+
+        n_categories = max(self._statistics_per_category) + 1
+        n_buckets = len(DETECTION_RESULTS) * len(ImageSize)
+        self._counts = np.bincount(
+            labels * n_buckets + result_index * len(ImageSize) + size_index,
+            minlength=n_categories * n_buckets,
+        ).reshape(n_categories, len(DETECTION_RESULTS), len(ImageSize))
+
+        # Area of the last box of each category, as returned by get_areas.
+        reversed_labels = labels[::-1]
+        last_labels, last_index = np.unique(reversed_labels, return_index=True)
+        last_areas = areas[::-1][last_index]
+        for label, area in zip(last_labels.tolist(), last_areas.tolist()):
+            self._statistics_per_category[label]["area"] = area
+
+        for category_id, category_stats in self._statistics_per_category.items():
+            counts = self._counts[category_id]
+            for result_index, detection_result in enumerate(DETECTION_RESULTS):
+                category_stats[detection_result] = int(counts[result_index].sum())
+                for size_index, size in enumerate(ImageSize):
+                    category_stats[f"{detection_result}_{size.name}"] = int(
+                        counts[result_index, size_index]
                     )
 
-                    if tagged_validation_content["TP_labels"][i]:
-                        category_stats["true_positives"] += 1
-                        category_stats[f"true_positives_{size.name}"] += 1
-                    else:
-                        category_stats["false_negatives"] += 1
-                        category_stats[f"false_negatives_{size.name}"] += 1
-
     def _get_gt_boxes_and_predicted_boxes_per_category(
-        self, tagged_validation_folder: str
+        self, tagged_validation: TaggedValidation
     ):
         """
-        For each category of each file in tagged_validation_folder it gathers the ground truth boxes and all
-         predicted boxes. This will be later used in computing the total blurred area per category.
+        For each category it gathers the ground truth boxes and all predicted boxes of their images.
+        This will be later used in computing the total blurred area per category.
         Args:
-            tagged_validation_folder: Path to the folder containing all the tagged validation values.
+            tagged_validation: The tagged validation results of all images.
 
         Returns:
 
         """
-        for tagged_validation_file in self.get_all_filenames_in_dir(
-            tagged_validation_folder
+        pred_boxes_per_file = [
+            tagged_validation.get_pred_boxes(i).tolist()
+            for i in range(len(tagged_validation.filenames))
+        ]
+        for gt_box, gt_label, file_index in zip(
+            tagged_validation.gt_boxes.tolist(),
+            tagged_validation.gt_labels.tolist(),
+            tagged_validation.file_index.tolist(),
         ):
-            with open(f"{tagged_validation_folder}/{tagged_validation_file}") as f:
-                tagged_validation_content = json.load(f)
-                if any(
-                    len(tagged_validation_content[key])
-                    != len(tagged_validation_content["GT_labels"])
-                    for key in ["GT_boxes", "TP_labels"]
-                ):
-                    raise Exception(
-                        f"{tagged_validation_file} not well formed, "
-                        f"the len of GT_boxes, GT_labels and TP_labels is not matching."
-                    )
-
-                for i, (gt_box, gt_label) in enumerate(
-                    zip(
-                        tagged_validation_content["GT_boxes"],
-                        tagged_validation_content["GT_labels"],
-                    )
-                ):
-                    category_stats = self._statistics_per_category[gt_label]
-                    category_stats["gt_boxes"].append(
-                        [tagged_validation_content["GT_boxes"][i]]
-                    )
-                    category_stats["pred_boxes"].append(
-                        tagged_validation_content["Pred_boxes"]
-                        if "Pred_boxes" in tagged_validation_content
-                        else []
-                    )
+            category_stats = self._statistics_per_category[gt_label]
+            category_stats["gt_boxes"].append([gt_box])
+            category_stats["pred_boxes"].append(pred_boxes_per_file[file_index])
 
     def _get_and_prepare_categories(self, coco_file_with_categories):
         """
@@ -391,7 +377,7 @@ class FalseNegativeRateCalculator:
 
     @staticmethod
     def get_all_filenames_in_dir(directory_path: str) -> List[str]:
-        return [f for f in listdir(directory_path) if isfile(join(directory_path, f))]
+        return get_all_filenames_in_dir(directory_path)
 
     @staticmethod
     def _calculate_false_negative_rate(false_negatives, true_positives):
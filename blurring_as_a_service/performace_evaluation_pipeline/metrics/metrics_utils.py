@@ -19,6 +19,21 @@ class ImageSize(Enum):
         return self.value[index]
 
 
+class MaskFormat(Enum):
+    """
+    Memory layout of binary masks. float64 uses 8 bytes per pixel, bool 1 byte and
+    packed 1 bit, with each row packed into uint8 with np.packbits.
+    """
+
+    float64 = "float64"
+    bool = "bool"
+    packed = "packed"
+
+
+# Number of set bits of every uint8 value, to count pixels in packed masks.
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
 class TargetClass(Enum):
     person = 0
     license_plate = 1
@@ -57,8 +72,50 @@ def parse_labels(
     return classes, bounding_boxes
 
 
-def generate_binary_mask(
+def boxes_to_pixel_coordinates(
     bounding_boxes, image_width=8000, image_height=4000, consider_upper_half=False
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Converts normalised (x_center, y_center, width, height) boxes to the pixel
+    coordinates used to fill masks, truncated to integers.
+
+    Parameters
+    ----------
+    bounding_boxes: array of bounding box coordinates with shape (n_boxes, 4)
+    image_width
+    image_height
+    consider_upper_half: only look at the upper half of the bounding boxes
+
+    Returns
+    -------
+    x_min, y_min, x_max, y_max arrays, the boxes cover [y_min:y_max, x_min:x_max]
+    """
+    bounding_boxes = np.asarray(bounding_boxes, dtype=float).reshape(-1, 4)
+    y_min = ((bounding_boxes[:, 1] - bounding_boxes[:, 3] / 2) * image_height).astype(
+        int
+    )
+    x_min = ((bounding_boxes[:, 0] - bounding_boxes[:, 2] / 2) * image_width).astype(
+        int
+    )
+    x_max = ((bounding_boxes[:, 0] + bounding_boxes[:, 2] / 2) * image_width).astype(
+        int
+    )
+    if consider_upper_half:
+        y_max = (bounding_boxes[:, 1] * image_height).astype(int)
+    else:
+        y_max = (
+            (bounding_boxes[:, 1] + bounding_boxes[:, 3] / 2) * image_height
+        ).astype(int)
+    return x_min, y_min, x_max, y_max
+
+
+def generate_binary_mask(
+    bounding_boxes,
+    image_width=8000,
+    image_height=4000,
+    consider_upper_half=False,
+    mask_format: MaskFormat = MaskFormat.float64,
+    scale: float = 1.0,
 ):
     """
     Creates binary mask where all points inside the bounding boxes are 1, 0 otherwise.
@@ -69,37 +126,69 @@ def generate_binary_mask(
     image_width
     image_height
     consider_upper_half: only look at the upper half of the bounding boxes
+    mask_format: float64 (default), bool or packed, see MaskFormat
+    scale: creates the mask at a lower evaluation resolution, e.g. 0.25 for a mask
+        of (image_height / 4, image_width / 4). Pixel counts scale accordingly.
 
     Returns
     -------
 
     """
-
-    mask = np.zeros((image_height, image_width))
+    mask_format = MaskFormat(mask_format)
+    mask_width = max(1, round(image_width * scale))
+    mask_height = max(1, round(image_height * scale))
+    dtype = np.float64 if mask_format == MaskFormat.float64 else bool
+    mask = np.zeros((mask_height, mask_width), dtype=dtype)
 
     if len(bounding_boxes):
-        bounding_boxes = np.array(bounding_boxes)
-        y_min = (
-            (bounding_boxes[:, 1] - bounding_boxes[:, 3] / 2) * image_height
-        ).astype(int)
-        x_min = (
-            (bounding_boxes[:, 0] - bounding_boxes[:, 2] / 2) * image_width
-        ).astype(int)
-        x_max = (
-            (bounding_boxes[:, 0] + bounding_boxes[:, 2] / 2) * image_width
-        ).astype(int)
-        if consider_upper_half:
-            y_max = (bounding_boxes[:, 1] * image_height).astype(int)
-        else:
-            y_max = (
-                (bounding_boxes[:, 1] + bounding_boxes[:, 3] / 2) * image_height
-            ).astype(int)
+        x_min, y_min, x_max, y_max = boxes_to_pixel_coordinates(
+            bounding_boxes, mask_width, mask_height, consider_upper_half
+        )
         for i in range(len(x_min)):
             mask[y_min[i] : y_max[i], x_min[i] : x_max[i]] = 1
 
+    if mask_format == MaskFormat.packed:
+        return np.packbits(mask, axis=1)
     return mask
 
 
+def count_mask_statistics(
+    true_mask: np.ndarray, predicted_mask: np.ndarray, mask_width: int = None
+) -> Tuple[int, int, int, int]:
+    """
+    Counts the true positive, false positive, true negative and false negative pixels
+    of two masks created by generate_binary_mask with the same format and scale.
+
+    Parameters
+    ----------
+    true_mask
+    predicted_mask
+    mask_width: width of the masks in pixels, required for packed masks since their
+        rows are padded to a multiple of 8 pixels.
+
+    Returns
+    -------
+    Tuple of (tp, fp, tn, fn)
+    """
+    if true_mask.dtype == np.uint8:
+        if mask_width is None:
+            raise ValueError("mask_width is required to count packed masks.")
+        n_pixels = true_mask.shape[0] * mask_width
+        true_area = int(_POPCOUNT[true_mask].sum(dtype=np.int64))
+        predicted_area = int(_POPCOUNT[predicted_mask].sum(dtype=np.int64))
+        tp = int(_POPCOUNT[true_mask & predicted_mask].sum(dtype=np.int64))
+    else:
+        true_mask, predicted_mask = true_mask.astype(bool), predicted_mask.astype(bool)
+        n_pixels = true_mask.size
+        true_area = int(np.count_nonzero(true_mask))
+        predicted_area = int(np.count_nonzero(predicted_mask))
+        tp = int(np.count_nonzero(true_mask & predicted_mask))
+    fp = predicted_area - tp
+    fn = true_area - tp
+    tn = n_pixels - tp - fp - fn
+    return tp, fp, tn, fn
+
+
 def generate_mask(
     bounding_boxes, image: ImageType, consider_upper_half=False
 ) -> ImageType:
@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from os import listdir
+from os.path import isfile, join
+from typing import List, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, it only makes parsing faster.
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Reading many small files is I/O bound, especially on mounted blob storage.
+DEFAULT_MAX_WORKERS = 16
+
+
+@dataclass
+class TaggedValidation:
+    """
+    The tagged validation results of all images in a folder, stored column wise:
+    row i of gt_boxes, gt_labels, tp_labels and file_index describes the i-th
+    ground truth box. The predicted boxes of file j are
+    pred_boxes[pred_offsets[j] : pred_offsets[j + 1]].
+    """
+
+    filenames: List[str]
+    gt_boxes: npt.NDArray  # (n_boxes, 4) normalised (x_center, y_center, w, h)
+    gt_labels: npt.NDArray  # (n_boxes,) int
+    tp_labels: npt.NDArray  # (n_boxes,) bool
+    file_index: npt.NDArray  # (n_boxes,) int
+    pred_boxes: npt.NDArray  # (n_predictions, n_coordinates)
+    pred_offsets: npt.NDArray  # (n_files + 1,) int
+
+    def __len__(self) -> int:
+        return len(self.gt_labels)
+
+    def get_pred_boxes(self, file_index: int) -> npt.NDArray:
+        return self.pred_boxes[
+            self.pred_offsets[file_index] : self.pred_offsets[file_index + 1]
+        ]
+
+    def save(self, cache_path: str, fingerprint: npt.NDArray) -> None:
+        """
+        Stores all columns in one .npz file, together with the fingerprint of the
+        folder they were read from.
+        """
+        columns = {field.name: getattr(self, field.name) for field in fields(self)}
+        columns["filenames"] = np.asarray(self.filenames, dtype=str)
+        tmp_path = _tmp(cache_path)
+        np.savez(tmp_path, fingerprint=fingerprint, **columns)
+        os.replace(tmp_path, cache_path)
+
+    @classmethod
+    def load(
+        cls, cache_path: str, fingerprint: npt.NDArray
+    ) -> Optional["TaggedValidation"]:
+        """
+        Loads a cache written by save, or returns None if it does not exist or the
+        folder changed since it was written.
+        """
+        if not isfile(cache_path):
+            return None
+        with np.load(cache_path) as cache:
+            if not np.array_equal(cache["fingerprint"], fingerprint):
+                return None
+            columns = {field.name: cache[field.name] for field in fields(cls)}
+        columns["filenames"] = columns["filenames"].tolist()
+        return cls(**columns)
+
+
+def load_tagged_validation(
+    tagged_validation_folder: str,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    cache_path: Optional[str] = None,
+) -> TaggedValidation:
+    """
+    Reads every tagged validation file in a folder once into a TaggedValidation.
+    The files are read concurrently, with orjson if it is installed.
+
+    The content of the tagged-validation for one image is:
+        - GT_boxes: List[List[float]] ground truth boxes
+        - GT_labels: List[int] ground truth labels
+        - TP_labels: List[boolean/int(binary)], True/1 if GT_labels[i] was detected
+        - Pred_boxes (optional): List[List[float]] all predicted boxes
+
+    Parameters
+    ----------
+    tagged_validation_folder
+        Path to the folder containing all the tagged validation files.
+    max_workers
+        Number of files read at the same time.
+    cache_path
+        Optional .npz file where the result is stored. It is reused as long as the
+        names, sizes and modification times of the files did not change, so
+        metrics can be computed again without parsing the files again.
+
+    Raises
+    ------
+    Exception in case the len of GT_boxes, GT_labels and TP_labels are not matching.
+    """
+    filenames = sorted(get_all_filenames_in_dir(tagged_validation_folder))
+    fingerprint = None
+    if cache_path is not None:
+        # The cache may be stored in the folder itself.
+        cache_files = {os.path.abspath(cache_path), os.path.abspath(_tmp(cache_path))}
+        filenames = [
+            file
+            for file in filenames
+            if os.path.abspath(join(tagged_validation_folder, file)) not in cache_files
+        ]
+        fingerprint = _fingerprint(tagged_validation_folder, filenames)
+        tagged_validation = TaggedValidation.load(cache_path, fingerprint)
+        if tagged_validation is not None:
+            logger.info(f"Loaded {len(filenames)} tagged files from {cache_path}")
+            return tagged_validation
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        contents = list(
+            executor.map(
+                _read_json,
+                [join(tagged_validation_folder, file) for file in filenames],
+            )
+        )
+
+    gt_boxes, gt_labels, tp_labels, file_index, pred_boxes = [], [], [], [], []
+    for i, (tagged_validation_file, tagged_validation_content) in enumerate(
+        zip(filenames, contents)
+    ):
+        if any(
+            len(tagged_validation_content[key])
+            != len(tagged_validation_content["GT_labels"])
+            for key in ["GT_boxes", "TP_labels"]
+        ):
+            raise Exception(
+                f"{tagged_validation_file} not well formed, "
+                f"the len of GT_boxes, GT_labels and TP_labels is not matching."
+            )
+        gt_boxes.extend(tagged_validation_content["GT_boxes"])
+        gt_labels.extend(tagged_validation_content["GT_labels"])
+        tp_labels.extend(tagged_validation_content["TP_labels"])
+        file_index.extend([i] * len(tagged_validation_content["GT_labels"]))
+        pred_boxes.append(tagged_validation_content.get("Pred_boxes", []))
+
+    tagged_validation = TaggedValidation(
+        filenames=filenames,
+        gt_boxes=np.asarray(gt_boxes, dtype=np.float64).reshape(-1, 4),
+        gt_labels=np.asarray(gt_labels, dtype=np.int64),
+        tp_labels=np.asarray(tp_labels, dtype=bool),
+        file_index=np.asarray(file_index, dtype=np.int64),
+        pred_boxes=_concatenate_boxes(pred_boxes),
+        pred_offsets=np.concatenate(
+            [[0], np.cumsum([len(boxes) for boxes in pred_boxes])]
+        ).astype(np.int64),
+    )
+    if cache_path is not None:
+        tagged_validation.save(cache_path, fingerprint)
+        logger.info(f"Cached {len(filenames)} tagged files in {cache_path}")
+    return tagged_validation
+
+
+def get_all_filenames_in_dir(directory_path: str) -> List[str]:
+    return [f for f in listdir(directory_path) if isfile(join(directory_path, f))]
+
+
+def _tmp(cache_path: str) -> str:
+    return f"{cache_path}.tmp.npz"
+
+
+def _read_json(path: str) -> dict:
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    with open(path) as f:
+        return json.load(f)
+
+
+def _fingerprint(folder: str, filenames: List[str]) -> npt.NDArray:
+    """Names, sizes and modification times of the files, as one string array."""
+    stats = [os.stat(join(folder, file)) for file in filenames]
+    return np.asarray(
+        [
+            f"{file}:{stat.st_size}:{stat.st_mtime_ns}"
+            for file, stat in zip(filenames, stats)
+        ],
+        dtype=str,
+    )
+
+
+def _concatenate_boxes(boxes_per_file: List[list]) -> npt.NDArray:
+    arrays = [
+        np.asarray(boxes, dtype=np.float64) for boxes in boxes_per_file if len(boxes)
+    ]
+    if not arrays:
+        return np.zeros((0, 4), dtype=np.float64)
+    return np.concatenate(arrays)
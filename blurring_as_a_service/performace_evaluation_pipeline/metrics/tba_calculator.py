@@ -1,6 +1,9 @@
+import copy
 import logging
 import sys
-from typing import Dict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Tuple
 
 import numpy.typing as npt
 from tqdm import tqdm
@@ -10,17 +13,35 @@ sys.path.append("../../..")
 from cvtoolkit.datasets.yolo_labels_dataset import YoloLabelsDataset  # noqa: E402
 from cvtoolkit.metrics.total_blurred_area import TotalBlurredArea  # noqa: E402
 
+from blurring_as_a_service.performace_evaluation_pipeline.metrics.analytic_total_blurred_area import (  # noqa: E402
+    AnalyticTotalBlurredArea,
+    PredictionCoverage,
+)
 from blurring_as_a_service.performace_evaluation_pipeline.metrics.metrics_utils import (  # noqa: E402
     ImageSize,
+    MaskFormat,
     TargetClass,
     generate_binary_mask,
 )
 
 logger = logging.getLogger(__name__)
 
+# Shards per worker, smaller shards balance the load when image sizes vary.
+SHARDS_PER_WORKER = 4
+
+# Predicted boxes of an image and its ground truth boxes per bucket.
+ImageBoxes = Tuple[npt.NDArray, Dict[str, npt.NDArray]]
+
 
 def get_total_blurred_area_statistics(
-    true_labels: Dict[str, npt.NDArray], predicted_labels: Dict[str, npt.NDArray]
+    true_labels: Dict[str, npt.NDArray],
+    predicted_labels: Dict[str, npt.NDArray],
+    use_masks: bool = False,
+    mask_format: MaskFormat = MaskFormat.float64,
+    mask_scale: float = 1.0,
+    image_width: int = 8000,
+    image_height: int = 4000,
+    max_workers: int = 1,
 ):
     """
     Calculates per pixel statistics (tp, tn, fp, fn, precision, recall, f1 score)
@@ -32,16 +53,62 @@ def get_total_blurred_area_statistics(
     ----------
     true_labels
     predicted_labels
+    use_masks: compute the statistics from full size binary masks instead of
+        analytically from the box coordinates. Both give the same results, the
+        analytic computation is much faster and does not allocate any masks.
+    mask_format: format of the masks when use_masks is set. float64 uses
+        cvtoolkit's TotalBlurredArea, bool and packed masks take 8 and 64 times
+        less memory and are counted with bitwise operations.
+    mask_scale: evaluation resolution of the masks relative to the image size
+        when use_masks is set. Below 1 the pixel counts are approximate and in
+        pixels of the downscaled masks.
+    image_width
+    image_height
+    max_workers: number of processes evaluating the images when use_masks is not
+        set, 1 evaluates them in the current process.
 
     Returns
     -------
 
     """
+    if not use_masks:
+        images = [
+            (predicted_labels[image_id][:, 1:5], {"all": true_labels[image_id][:, 1:5]})
+            for image_id in true_labels
+        ]
+        return _evaluate_images(
+            images, ["all"], image_width, image_height, max_workers
+        )["all"].get_statistics()
+
+    mask_format = MaskFormat(mask_format)
+    if mask_format != MaskFormat.float64 or mask_scale != 1.0:
+        compact_total_blurred_area = AnalyticTotalBlurredArea()
+        mask_width = max(1, round(image_width * mask_scale))
+        for image_id in tqdm(true_labels.keys(), total=len(true_labels)):
+            true_mask, predicted_mask = (
+                generate_binary_mask(
+                    labels[image_id][:, 1:5],
+                    image_width,
+                    image_height,
+                    mask_format=mask_format,
+                    scale=mask_scale,
+                )
+                for labels in (true_labels, predicted_labels)
+            )
+            compact_total_blurred_area.update_statistics_based_on_masks(
+                true_mask, predicted_mask, mask_width
+            )
+        return compact_total_blurred_area.get_statistics()
+
     total_blurred_area = TotalBlurredArea()
 
     for image_id in tqdm(true_labels.keys(), total=len(true_labels)):
-        tba_true_mask = generate_binary_mask(true_labels[image_id][:, 1:5])
-        tba_pred_mask = generate_binary_mask(predicted_labels[image_id][:, 1:5])
+        tba_true_mask = generate_binary_mask(
+            true_labels[image_id][:, 1:5], image_width, image_height
+        )
+        tba_pred_mask = generate_binary_mask(
+            predicted_labels[image_id][:, 1:5], image_width, image_height
+        )
 
         total_blurred_area.update_statistics_based_on_masks(
             true_mask=tba_true_mask, predicted_mask=tba_pred_mask
@@ -53,40 +120,125 @@ def get_total_blurred_area_statistics(
 
 
 def collect_tba_results_per_class_and_size(
-    true_path: str, pred_path: str, image_area: int
+    true_path: str, pred_path: str, image_area: int, max_workers: int = 1
 ):
     """
 
     Computes a dict with statistics (tn, tp, fp, fn, precision, recall, f1) for each target class and size.
 
+    The ground truth and predictions are read from disk once, and all images are
+    evaluated in a single pass: the coverage of the predictions of an image is
+    computed once and compared against the ground truth of every class and size.
+
     Parameters
     ----------
     true_path
     pred_path
     image_area
+    max_workers: number of processes evaluating the images
 
     Returns:
     -------
 
     """
-    predicted_dataset = YoloLabelsDataset(folder_path=pred_path, image_area=image_area)
-    results = {}
+    predicted_labels = YoloLabelsDataset(
+        folder_path=pred_path, image_area=image_area
+    ).get_labels()
+    true_dataset = YoloLabelsDataset(folder_path=true_path, image_area=image_area)
 
+    true_labels_per_bucket = {}
     for target_class in TargetClass:
         for size in ImageSize:
-            true_target_class_size = (  # i.e. true_person_small
-                YoloLabelsDataset(folder_path=true_path, image_area=image_area)
+            true_labels_per_bucket[f"{target_class.name}_{size.name}"] = (
+                # Filters are applied to a copy, so the files are only parsed once.
+                copy.deepcopy(true_dataset)
                 .filter_by_class(class_to_keep=target_class.value)
                 .filter_by_size(size_to_keep=size.value)
                 .get_filtered_labels()
             )
-            results[
-                f"{target_class.name}_{size.name}"
-            ] = get_total_blurred_area_statistics(
-                true_target_class_size, predicted_dataset.get_labels()
-            )
 
-    return results
+    image_ids = dict.fromkeys(
+        image_id
+        for true_labels in true_labels_per_bucket.values()
+        for image_id in true_labels
+    )
+    images = [
+        (
+            predicted_labels[image_id][:, 1:5],
+            {
+                bucket: true_labels[image_id][:, 1:5]
+                for bucket, true_labels in true_labels_per_bucket.items()
+                if image_id in true_labels
+            },
+        )
+        for image_id in image_ids
+    ]
+    statistics_per_bucket = _evaluate_images(
+        images, list(true_labels_per_bucket), max_workers=max_workers
+    )
+
+    return {
+        bucket: statistics.get_statistics()
+        for bucket, statistics in statistics_per_bucket.items()
+    }
+
+
+def _evaluate_images(
+    images: List[ImageBoxes],
+    buckets: List[str],
+    image_width: int = 8000,
+    image_height: int = 4000,
+    max_workers: int = 1,
+) -> Dict[str, AnalyticTotalBlurredArea]:
+    """
+    Accumulates the pixel counts of every bucket over all images. With more than
+    one worker, the images are split in contiguous shards that are evaluated in a
+    process pool, and the partial counts are merged in shard order.
+    """
+    if max_workers <= 1:
+        return _evaluate_shard(
+            tqdm(images, total=len(images)), buckets, image_width, image_height
+        )
+
+    n_shards = min(len(images), max_workers * SHARDS_PER_WORKER)
+    shard_size = -(-len(images) // n_shards) if n_shards else 1
+    shards = [
+        images[start : start + shard_size]
+        for start in range(0, len(images), shard_size)
+    ]
+    statistics_per_bucket = {bucket: AnalyticTotalBlurredArea() for bucket in buckets}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        partial_statistics = executor.map(
+            partial(
+                _evaluate_shard,
+                buckets=buckets,
+                image_width=image_width,
+                image_height=image_height,
+            ),
+            shards,
+        )
+        for shard_statistics in tqdm(partial_statistics, total=len(shards)):
+            for bucket, statistics in shard_statistics.items():
+                statistics_per_bucket[bucket].merge(statistics)
+    return statistics_per_bucket
+
+
+def _evaluate_shard(
+    images: List[ImageBoxes],
+    buckets: List[str],
+    image_width: int = 8000,
+    image_height: int = 4000,
+) -> Dict[str, AnalyticTotalBlurredArea]:
+    statistics_per_bucket = {bucket: AnalyticTotalBlurredArea() for bucket in buckets}
+    for predicted_boxes, true_boxes_per_bucket in images:
+        predicted_coverage = PredictionCoverage(
+            predicted_boxes, image_width, image_height
+        )
+        for bucket, true_boxes in true_boxes_per_bucket.items():
+            statistics_per_bucket[bucket].update_statistics_based_on_coverage(
+                true_boxes, predicted_coverage
+            )
+    return statistics_per_bucket
 
 
 def store_tba_results(
@@ -131,8 +283,9 @@ def collect_and_store_tba_results_per_class_and_size(
     predictions_path: str,
     markdown_output_path: str,
     image_area: int,
+    max_workers: int = 1,
 ):
     results: Dict[str, Dict[str, float]] = collect_tba_results_per_class_and_size(
-        ground_truth_path, predictions_path, image_area
+        ground_truth_path, predictions_path, image_area, max_workers
     )
     store_tba_results(results, markdown_output_path)
@@ -1,5 +1,6 @@
 import json
 import logging
+import os
 
 from pycocotools.coco import COCO
 
@@ -61,6 +62,6 @@ def coco_evaluation(
 
     image_names = [image["id"] for image in data["images"]]
     evaluation.params.imgIds = image_names  # image IDs to evaluate
-    evaluation.evaluate()
+    evaluation.evaluate(max_workers=os.cpu_count() or 1)
     evaluation.accumulate()
     evaluation.summarize()
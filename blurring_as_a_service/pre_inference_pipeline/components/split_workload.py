@@ -42,6 +42,7 @@ def split_workload(
     number_of_batches: int,
     exclude_file: str,
     results_folder: Output(type=AssetTypes.URI_FOLDER),  # type: ignore # noqa: F821
+    quarantine_corrupted_images: bool = False,
 ):
     WorkloadSplitter.create_batches(
         data_folder=data_folder,
@@ -50,4 +51,5 @@ def split_workload(
         exclude_file=exclude_file,
         output_folder=results_folder,
         execution_time=execution_time,
+        quarantine_corrupted_images=quarantine_corrupted_images,
     )
@@ -4,6 +4,12 @@ from typing import List, Tuple
 
 IMG_FORMATS = "bmp", "dng", "jpeg", "jpg", "mpo", "png", "tif", "tiff", "webp", "pfm"
 
+# The image_filename stored in ImageProcessingStatus and DetectionInformation is the
+# path of the image relative to input_structured: the folder the images were
+# uploaded to, followed by the path inside that folder. The image_upload_date
+# stored with it is the time the workload was split, not the name of the folder.
+IMAGE_FILENAME_SEPARATOR = "/"
+
 
 def get_image_paths(input_container: str) -> List[Tuple[str, str]]:
     """
@@ -27,3 +33,32 @@ def get_image_paths(input_container: str) -> List[Tuple[str, str]]:
         if os.path.splitext(file_path)[1].lstrip(".").lower() in IMG_FORMATS
     ]
     return image_paths
+
+
+def to_image_filename(upload_folder: str, relative_path: str) -> str:
+    """
+    Builds the image_filename stored in the database for an image of input_structured.
+
+    Parameters
+    ----------
+    upload_folder : str
+        The folder in input_structured the image was uploaded to.
+    relative_path : str
+        The path of the image relative to upload_folder.
+
+    Returns
+    -------
+    str
+        The path of the image relative to input_structured.
+    """
+    return f"{upload_folder}{IMAGE_FILENAME_SEPARATOR}{relative_path}"
+
+
+def split_image_filename(image_filename: str) -> Tuple[str, str]:
+    """
+    Splits an image_filename stored in the database into the folder in
+    input_structured the image was uploaded to and the path inside that folder,
+    the inverse of to_image_filename.
+    """
+    upload_folder, _, relative_path = image_filename.partition(IMAGE_FILENAME_SEPARATOR)
+    return upload_folder, relative_path
@@ -2,13 +2,25 @@ import csv
 import logging
 import math
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
 
 logger = logging.getLogger(__name__)
 
+from blurring_as_a_service.check_corrupted_images.source.jpeg_validation import (  # noqa: E402
+    ValidationCode,
+    validate_jpeg,
+)
 from blurring_as_a_service.pre_inference_pipeline.source.image_paths import (  # noqa: E402
     get_image_paths,
+    to_image_filename,
 )
 
+# The cheap check reads four bytes per image, so it is dominated by blob mount latency.
+CHECK_IMAGES_MAX_WORKERS = 32
+# Only these formats are checked, images in the other formats of IMG_FORMATS pass.
+JPEG_FORMATS = "jpeg", "jpg"
+
 
 class WorkloadSplitter:
     @staticmethod
@@ -19,6 +31,7 @@ class WorkloadSplitter:
         exclude_file: str,
         output_folder: str,
         execution_time: str,
+        quarantine_corrupted_images: bool = False,
     ) -> None:
         """
         Starting from a data folder, iterates over all subfolders and equally groups all jpg files into number_of_batches
@@ -49,6 +62,11 @@ class WorkloadSplitter:
             Where to store the output files.
         execution_time: str
             Datetime containing when the job was executed. Used to prefix the files name.
+        quarantine_corrupted_images: bool
+            Whether to check the size and the JPEG start and end markers of every JPEG
+            image while splitting, images in other formats are not checked. Empty and
+            corrupted images are not added to any batch, they are listed with their
+            validation code in output_folder/{execution_time}_quarantine.csv instead.
         """
         image_paths = get_image_paths(data_folder)
 
@@ -70,6 +88,13 @@ class WorkloadSplitter:
 
                 logger.info(f"Number of input files remaining: {len(image_paths)}")
 
+        if quarantine_corrupted_images:
+            image_paths = WorkloadSplitter._quarantine_corrupted_images(
+                image_paths,
+                datastore_input_path,
+                os.path.join(output_folder, f"{execution_time}_quarantine.csv"),
+            )
+
         if number_of_batches > len(image_paths):
             number_of_batches = (
                 math.ceil(len(image_paths) / 50) if len(image_paths) > 50 else 1
@@ -91,6 +116,59 @@ class WorkloadSplitter:
                 for j in range(start_index, end_index):
                     image_path = image_paths[j][1]
                     batch_file.write(
-                        os.path.join(datastore_input_path, image_path) + "\n"
+                        to_image_filename(datastore_input_path, image_path) + "\n"
                     )
             logger.info(f"Batch {i} written to {batch_file_path}")
+
+    @staticmethod
+    def _quarantine_corrupted_images(
+        image_paths: List[Tuple[str, str]],
+        datastore_input_path: str,
+        quarantine_file_path: str,
+    ) -> List[Tuple[str, str]]:
+        """
+        Checks all JPEG images concurrently and writes the empty and corrupted ones to
+        the quarantine file. Images in other formats are kept without a check, the
+        JPEG markers do not apply to them. The file has a .csv extension, so it is
+        not picked up as a batch by the inference pipeline.
+
+        Returns
+        -------
+        list of (str, str)
+            The image paths that passed the check, in their original order.
+        """
+        with ThreadPoolExecutor(max_workers=CHECK_IMAGES_MAX_WORKERS) as executor:
+            validation_codes = list(
+                executor.map(
+                    WorkloadSplitter._validate_image,
+                    [image_path[0] for image_path in image_paths],
+                )
+            )
+
+        valid_image_paths = []
+        with open(quarantine_file_path, "w", newline="") as quarantine_file:
+            writer = csv.writer(quarantine_file)
+            writer.writerow(["path", "validation_code"])
+            for image_path, validation_code in zip(image_paths, validation_codes):
+                if validation_code == ValidationCode.VALID:
+                    valid_image_paths.append(image_path)
+                else:
+                    writer.writerow(
+                        [
+                            to_image_filename(datastore_input_path, image_path[1]),
+                            ValidationCode(validation_code).name.lower(),
+                        ]
+                    )
+
+        n_quarantined = len(image_paths) - len(valid_image_paths)
+        logger.info(
+            f"Quarantined {n_quarantined} empty or corrupted images in "
+            f"{quarantine_file_path}"
+        )
+        return valid_image_paths
+
+    @staticmethod
+    def _validate_image(path: str) -> int:
+        if not path.lower().endswith(JPEG_FORMATS):
+            return ValidationCode.VALID
+        return validate_jpeg(path)
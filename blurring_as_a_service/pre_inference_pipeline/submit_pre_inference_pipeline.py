@@ -40,6 +40,9 @@ def pre_inference_pipeline():
         datastore_input_path=settings["pre_inference_pipeline"]["datastore_input_path"],
         number_of_batches=number_of_batches,
         exclude_file=exclude_file,
+        quarantine_corrupted_images=settings["pre_inference_pipeline"]["inputs"][
+            "quarantine_corrupted_images"
+        ],
     )
     split_workload_step.outputs.data_folder = Output(
         type="uri_folder",
@@ -44,6 +44,7 @@ class MetadataPipelineSpec(SettingsSpecModel):
 class PreInferencePipelineInputs(SettingsSpecModel):
     number_of_batches: int
     exclude_list_file: str = ""
+    quarantine_corrupted_images: bool = False
 
 
 class PreInferencePipelineSpec(SettingsSpecModel):
@@ -68,6 +69,13 @@ class SmartSamplingPipelineSpec(SettingsSpecModel):
     quality_check_sample_size: int = 10
     conf_score_threshold: float = 0.0005
     sampling_ratio: float = 0.5
+    seed: int = None
+
+
+class CheckCorruptedImagesSpec(SettingsSpecModel):
+    validation_tier: str = "cheap"
+    incremental: bool = False
+    scan_index_datastore: str = ""
 
 
 class APIEndpointSpec(SettingsSpecModel):
@@ -76,6 +84,12 @@ class APIEndpointSpec(SettingsSpecModel):
     instance_type: str
     model_name: str
     model_version: str
+    cache_max_bytes: int = 0
+    cache_ttl_seconds: float = 3600
+    cache_blurred_images: bool = False
+    model_replicas: int = 1
+    max_queued_requests: int = 4
+    request_deadline_seconds: float = 60
 
 
 class BlurringAsAServiceSettingsSpec(SettingsSpecModel):
@@ -88,5 +102,6 @@ class BlurringAsAServiceSettingsSpec(SettingsSpecModel):
     pre_inference_pipeline: PreInferencePipelineSpec = None
     inference_pipeline: BaaSInferencePipelineSpec = None
     sampling_parameters: SmartSamplingPipelineSpec = None
+    check_corrupted_images: CheckCorruptedImagesSpec = None
     api_endpoint: APIEndpointSpec = None
     logging: LoggingSpec = LoggingSpec()
@@ -20,6 +20,7 @@ def main(opt):
     metrics_calculator = FalseNegativeRateCalculator(
         tagged_validation_folder=opt.labels_tagged,
         coco_file_with_categories=opt.coco_tagged_annotations,
+        cache_path=opt.cache,
     )
     metrics_calculator.calculate_and_store_metrics(
         markdown_output_path=save_dir / "custom_metrics_result.md"
@@ -36,6 +37,11 @@ def parse_opt():
         "--coco-tagged-annotations",
         help="Azure Labelling COCO json file with tagged annotations",
     )
+    parser.add_argument(
+        "--cache",
+        default=None,
+        help=".npz file caching the parsed tagged labels for repeated runs",
+    )
     parser.add_argument("--project", default=ROOT / "runs", help="save to project/name")
     parser.add_argument(
         "--name", default="exp_{fill_in_date_here}", help="save to project/name"
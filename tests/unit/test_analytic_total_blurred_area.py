@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from blurring_as_a_service.performace_evaluation_pipeline.metrics.analytic_total_blurred_area import (
+    AnalyticTotalBlurredArea,
+    PredictionCoverage,
+    count_pixel_statistics,
+    rectangle_union_area,
+)
+from blurring_as_a_service.performace_evaluation_pipeline.metrics.metrics_utils import (
+    generate_binary_mask,
+)
+
+
+def count_pixel_statistics_with_masks(true_boxes, predicted_boxes, width, height):
+    true_mask = generate_binary_mask(true_boxes, width, height).astype(bool)
+    predicted_mask = generate_binary_mask(predicted_boxes, width, height).astype(bool)
+    return (
+        int(np.sum(true_mask & predicted_mask)),
+        int(np.sum(~true_mask & predicted_mask)),
+        int(np.sum(~true_mask & ~predicted_mask)),
+        int(np.sum(true_mask & ~predicted_mask)),
+    )
+
+
+def random_boxes(rng, n_boxes):
+    # Centers slightly outside the image, to cover boxes crossing the borders.
+    centers = rng.uniform(-0.05, 1.05, size=(n_boxes, 2))
+    sizes = rng.uniform(0.0, 0.3, size=(n_boxes, 2))
+    return np.hstack([centers, sizes])
+
+
+def test_rectangle_union_area():
+    assert rectangle_union_area(np.zeros((0, 4))) == 0
+    rectangles = np.array([[0, 0, 10, 10], [5, 5, 15, 15], [20, 0, 21, 1]])
+    assert rectangle_union_area(rectangles) == 100 + 100 - 25 + 1
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_count_pixel_statistics_matches_masks(seed):
+    rng = np.random.default_rng(seed)
+    width, height = 400, 200
+    true_boxes = random_boxes(rng, rng.integers(0, 8))
+    predicted_boxes = random_boxes(rng, rng.integers(0, 8))
+
+    assert count_pixel_statistics(
+        true_boxes, predicted_boxes, width, height
+    ) == count_pixel_statistics_with_masks(true_boxes, predicted_boxes, width, height)
+
+
+def test_get_statistics():
+    total_blurred_area = AnalyticTotalBlurredArea()
+    total_blurred_area.update_statistics_based_on_boxes(
+        np.array([[0.25, 0.5, 0.5, 1.0]]), np.array([[0.5, 0.5, 0.5, 1.0]]), 100, 10
+    )
+
+    statistics = total_blurred_area.get_statistics()
+
+    assert statistics["true_positives"] == 250
+    assert statistics["false_positives"] == 250
+    assert statistics["false_negatives"] == 250
+    assert statistics["true_negatives"] == 250
+    assert statistics["precision"] == statistics["recall"] == 0.5
+    assert statistics["f1_score"] == 0.5
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_prediction_coverage_is_reused_across_true_boxes(seed):
+    rng = np.random.default_rng(seed)
+    width, height = 160, 90
+    predicted_boxes = random_boxes(rng, 6)
+    coverage = PredictionCoverage(predicted_boxes, width, height)
+    accumulated = AnalyticTotalBlurredArea()
+    for _ in range(3):
+        true_boxes = random_boxes(rng, rng.integers(0, 5))
+        assert coverage.count_pixel_statistics(
+            true_boxes
+        ) == count_pixel_statistics_with_masks(
+            true_boxes, predicted_boxes, width, height
+        )
+        accumulated.update_statistics_based_on_coverage(true_boxes, coverage)
+    assert accumulated.tp + accumulated.fp + accumulated.tn + accumulated.fn == (
+        3 * width * height
+    )
+
+
+def test_merge_does_not_depend_on_sharding():
+    rng = np.random.default_rng(0)
+    images = [(random_boxes(rng, 3), random_boxes(rng, 4)) for _ in range(10)]
+    serial = AnalyticTotalBlurredArea()
+    for true_boxes, predicted_boxes in images:
+        serial.update_statistics_based_on_boxes(true_boxes, predicted_boxes, 64, 32)
+
+    merged = AnalyticTotalBlurredArea()
+    for shard in (images[:3], images[3:4], images[4:]):
+        shard_statistics = AnalyticTotalBlurredArea()
+        for true_boxes, predicted_boxes in shard:
+            shard_statistics.update_statistics_based_on_boxes(
+                true_boxes, predicted_boxes, 64, 32
+            )
+        assert merged.merge(shard_statistics) is merged
+    assert merged.get_statistics() == serial.get_statistics()
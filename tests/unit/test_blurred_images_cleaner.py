@@ -0,0 +1,130 @@
+import os
+
+from blurring_as_a_service.cleaning_pipeline.source.blurred_images_cleaner import (
+    CHECKPOINT_FILENAME,
+    DeletionCheckpoint,
+    delete_images,
+    get_pending_upload_folders,
+    group_processed_images_by_upload_folder,
+    iter_blurred_image_paths,
+)
+
+
+def touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"")
+
+
+def test_iter_blurred_image_paths(tmp_path):
+    touch(tmp_path / "2024-01-02" / "b.jpg")
+    touch(tmp_path / "2024-01-01" / "a.jpg")
+    touch(tmp_path / "2024-01-01" / "notes.txt")
+    (tmp_path / "empty").mkdir()
+
+    assert list(iter_blurred_image_paths(str(tmp_path))) == [
+        ("2024-01-01", [os.path.join("2024-01-01", "a.jpg")]),
+        ("2024-01-02", [os.path.join("2024-01-02", "b.jpg")]),
+    ]
+
+
+def test_delete_images(tmp_path):
+    output_folder, input_folder = tmp_path / "output", tmp_path / "input"
+    for day in ["2024-01-01", "2024-01-02"]:
+        for name in ["a.jpg", "b.jpg", "c.jpg"]:
+            touch(output_folder / day / name)
+            touch(input_folder / day / name)
+    os.remove(input_folder / "2024-01-02" / "c.jpg")
+    touch(input_folder / "2024-01-02" / "not_blurred.jpg")
+    checkpoint = DeletionCheckpoint(str(tmp_path / "checkpoint.txt"))
+
+    summary = delete_images(
+        iter_blurred_image_paths(str(output_folder)),
+        str(input_folder),
+        checkpoint=checkpoint,
+        batch_size=2,
+    )
+
+    assert (summary.n_deleted, summary.n_missing, summary.n_failed) == (5, 1, 0)
+    assert os.listdir(input_folder / "2024-01-02") == ["not_blurred.jpg"]
+    assert DeletionCheckpoint(str(tmp_path / "checkpoint.txt")).completed_folders == {
+        "2024-01-01",
+        "2024-01-02",
+    }
+
+
+def test_delete_images_resumes_from_checkpoint(tmp_path):
+    output_folder, input_folder = tmp_path / "output", tmp_path / "input"
+    for day in ["2024-01-01", "2024-01-02"]:
+        touch(output_folder / day / "a.jpg")
+        touch(input_folder / day / "a.jpg")
+    checkpoint = DeletionCheckpoint(str(tmp_path / "checkpoint.txt"))
+    checkpoint.mark_done("2024-01-01")
+
+    summary = delete_images(
+        iter_blurred_image_paths(str(output_folder)),
+        str(input_folder),
+        checkpoint=DeletionCheckpoint(str(tmp_path / "checkpoint.txt")),
+    )
+
+    assert summary.n_skipped_folders == 1
+    assert summary.n_deleted == 1
+    assert (input_folder / "2024-01-01" / "a.jpg").exists()
+
+    checkpoint.clear()
+    assert not (tmp_path / "checkpoint.txt").exists()
+
+
+def test_delete_images_does_not_mark_unresolved_groups_done(tmp_path):
+    input_folder = tmp_path / "input"
+    touch(input_folder / "2024-01-01_00_00_00" / "a.jpg")
+    checkpoint = DeletionCheckpoint(str(tmp_path / "checkpoint.txt"))
+    # image_filename without the upload folder does not resolve in input_structured
+    image_groups = group_processed_images_by_upload_folder(["a.jpg"])
+
+    summary = delete_images(image_groups, str(input_folder), checkpoint=checkpoint)
+
+    assert (summary.n_deleted, summary.n_missing, summary.n_failed) == (0, 1, 0)
+    assert summary.n_unresolved_folders == 1
+    assert checkpoint.completed_folders == set()
+    assert (input_folder / "2024-01-01_00_00_00" / "a.jpg").exists()
+
+
+def test_get_pending_upload_folders(tmp_path):
+    touch(tmp_path / "2024-01-02_00_00_00" / "b.jpg")
+    touch(tmp_path / "2024-01-01_00_00_00" / "sub" / "a.jpg")
+    touch(tmp_path / "2024-01-03_00_00_00" / "c.jpg")
+    (tmp_path / "2024-01-04_00_00_00").mkdir()
+    touch(tmp_path / "inference_queue" / "batch_0.txt")
+    touch(tmp_path / CHECKPOINT_FILENAME)
+    checkpoint = DeletionCheckpoint(str(tmp_path / "checkpoint.txt"))
+    checkpoint.mark_done("2024-01-03_00_00_00")
+
+    assert get_pending_upload_folders(str(tmp_path), checkpoint) == [
+        "2024-01-01_00_00_00",
+        "2024-01-02_00_00_00",
+    ]
+
+
+def test_group_processed_images_by_upload_folder(tmp_path):
+    touch(tmp_path / "2024-01-01_00_00_00" / "a.jpg")
+    image_filenames = [
+        "2024-01-01_00_00_00/a.jpg",
+        "2024-01-01_00_00_00/not_blurred.jpg",
+        "2024-01-02_00_00_00/sub/b.jpg",
+    ]
+
+    assert list(group_processed_images_by_upload_folder(image_filenames)) == [
+        (
+            "2024-01-01_00_00_00",
+            ["2024-01-01_00_00_00/a.jpg", "2024-01-01_00_00_00/not_blurred.jpg"],
+        ),
+        ("2024-01-02_00_00_00", ["2024-01-02_00_00_00/sub/b.jpg"]),
+    ]
+    assert list(
+        group_processed_images_by_upload_folder(
+            image_filenames, output_folder=str(tmp_path)
+        )
+    ) == [
+        ("2024-01-01_00_00_00", ["2024-01-01_00_00_00/a.jpg"]),
+        ("2024-01-02_00_00_00", []),
+    ]
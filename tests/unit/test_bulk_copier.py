@@ -0,0 +1,42 @@
+from unittest import mock
+
+from blurring_as_a_service.cleaning_pipeline.source.bulk_copier import copy_files
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+
+
+def test_copy_files(tmp_path):
+    source, destination = tmp_path / "source", tmp_path / "destination"
+    write(source / "2024-01-01" / "a.jpg", b"a" * 10)
+    write(source / "2024-01-01" / "b.jpg", b"b" * 20)
+    write(destination / "2024-01-01" / "b.jpg", b"b" * 20)
+
+    summary = copy_files(
+        ["2024-01-01/a.jpg", "/2024-01-01/b.jpg", "2024-01-01/missing.jpg"],
+        str(source),
+        str(destination),
+        retry_delay=0,
+    )
+
+    assert (destination / "2024-01-01" / "a.jpg").read_bytes() == b"a" * 10
+    assert (summary.n_copied, summary.n_skipped, summary.n_failed) == (1, 1, 1)
+    assert summary.bytes_copied == 10
+    assert summary.failed_files == ["2024-01-01/missing.jpg"]
+
+
+def test_copy_files_retries_transient_errors(tmp_path):
+    source, destination = tmp_path / "source", tmp_path / "destination"
+    write(source / "a.jpg", b"a")
+    copyfile = mock.Mock(side_effect=[OSError("Transport endpoint"), None])
+
+    with mock.patch(
+        "blurring_as_a_service.cleaning_pipeline.source.bulk_copier.shutil.copyfile",
+        copyfile,
+    ):
+        summary = copy_files(["a.jpg"], str(source), str(destination), retry_delay=0)
+
+    assert copyfile.call_count == 2
+    assert summary.n_copied == 1
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from blurring_as_a_service.performace_evaluation_pipeline.metrics.analytic_total_blurred_area import (
+    AnalyticTotalBlurredArea,
+    count_pixel_statistics,
+)
+from blurring_as_a_service.performace_evaluation_pipeline.metrics.metrics_utils import (
+    MaskFormat,
+    count_mask_statistics,
+    generate_binary_mask,
+)
+
+
+def random_boxes(rng, n_boxes):
+    centers = rng.uniform(-0.05, 1.05, size=(n_boxes, 2))
+    sizes = rng.uniform(0.0, 0.3, size=(n_boxes, 2))
+    return np.hstack([centers, sizes])
+
+
+def test_generate_binary_mask_formats():
+    boxes = np.array([[0.5, 0.5, 0.5, 0.5]])
+    float_mask = generate_binary_mask(boxes, 101, 50)
+    bool_mask = generate_binary_mask(boxes, 101, 50, mask_format="bool")
+    packed_mask = generate_binary_mask(boxes, 101, 50, mask_format=MaskFormat.packed)
+
+    assert float_mask.dtype == np.float64
+    assert bool_mask.dtype == bool
+    assert packed_mask.dtype == np.uint8
+    assert packed_mask.shape == (50, 13)
+    np.testing.assert_array_equal(float_mask.astype(bool), bool_mask)
+    np.testing.assert_array_equal(
+        np.unpackbits(packed_mask, axis=1, count=101).astype(bool), bool_mask
+    )
+
+
+def test_generate_binary_mask_scale():
+    boxes = np.array([[0.5, 0.5, 0.5, 0.5]])
+    mask = generate_binary_mask(boxes, 8000, 4000, mask_format="bool", scale=0.25)
+    assert mask.shape == (1000, 2000)
+    assert mask.sum() == 500 * 1000
+
+
+def test_generate_binary_mask_without_boxes():
+    mask = generate_binary_mask(np.zeros((0, 4)), 16, 8, mask_format="packed")
+    assert mask.shape == (8, 2)
+    assert not mask.any()
+
+
+@pytest.mark.parametrize("mask_format", list(MaskFormat))
+@pytest.mark.parametrize("seed", range(5))
+def test_count_mask_statistics_matches_analytic(mask_format, seed):
+    rng = np.random.default_rng(seed)
+    width, height = 203, 97
+    true_boxes = random_boxes(rng, rng.integers(0, 6))
+    predicted_boxes = random_boxes(rng, rng.integers(0, 6))
+    true_mask = generate_binary_mask(true_boxes, width, height, mask_format=mask_format)
+    predicted_mask = generate_binary_mask(
+        predicted_boxes, width, height, mask_format=mask_format
+    )
+
+    assert count_mask_statistics(
+        true_mask, predicted_mask, width
+    ) == count_pixel_statistics(true_boxes, predicted_boxes, width, height)
+
+
+def test_count_packed_mask_statistics_requires_width():
+    mask = generate_binary_mask(np.zeros((0, 4)), 16, 8, mask_format="packed")
+    with pytest.raises(ValueError):
+        count_mask_statistics(mask, mask)
+
+
+def test_update_statistics_based_on_masks():
+    true_boxes = np.array([[0.25, 0.5, 0.5, 1.0]])
+    predicted_boxes = np.array([[0.5, 0.5, 0.5, 1.0]])
+    from_boxes = AnalyticTotalBlurredArea()
+    from_boxes.update_statistics_based_on_boxes(true_boxes, predicted_boxes, 100, 50)
+    from_masks = AnalyticTotalBlurredArea()
+    from_masks.update_statistics_based_on_masks(
+        generate_binary_mask(true_boxes, 100, 50, mask_format="packed"),
+        generate_binary_mask(predicted_boxes, 100, 50, mask_format="packed"),
+        mask_width=100,
+    )
+    assert from_masks.get_statistics() == from_boxes.get_statistics()
+    assert from_masks.get_statistics()["recall"] == 0.5
@@ -0,0 +1,79 @@
+import cv2
+import numpy as np
+
+from blurring_as_a_service.check_corrupted_images.source.count_corrupted_images_per_folder import (
+    count_corrupted_images_per_folder,
+    iter_corrupted_images_per_folder,
+)
+from blurring_as_a_service.check_corrupted_images.source.jpeg_validation import (
+    ValidationCode,
+    check_jpgs,
+)
+
+VALID_JPEG = b"\xff\xd8" + b"\x00" * 100 + b"\xff\xd9"
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_check_jpgs(tmp_path):
+    assert check_jpgs(write(tmp_path / "valid.jpg", VALID_JPEG)) == 0
+    assert check_jpgs(write(tmp_path / "empty.jpg", b"")) == 1
+    assert check_jpgs(write(tmp_path / "truncated.jpg", VALID_JPEG[:-1])) == 2
+    assert check_jpgs(write(tmp_path / "one_byte.jpg", b"\xd9")) == 2
+
+
+def test_check_jpgs_header(tmp_path):
+    no_header = write(tmp_path / "no_header.jpg", b"\x00\x00" + VALID_JPEG[2:])
+    assert check_jpgs(no_header) == ValidationCode.VALID
+    assert check_jpgs(no_header, check_header=True) == ValidationCode.MISSING_SOI
+
+
+def test_count_corrupted_images_per_folder(tmp_path):
+    write(tmp_path / "day_1" / "a.jpg", VALID_JPEG)
+    write(tmp_path / "day_1" / "b.JPG", VALID_JPEG[:-2])
+    write(tmp_path / "day_1" / "notes.txt", b"")
+    write(tmp_path / "day_2" / "c.jpeg", b"")
+
+    image_counts = count_corrupted_images_per_folder(str(tmp_path))
+
+    assert image_counts[str(tmp_path / "day_1")] == {
+        "total_images": 2,
+        "good_images": 1,
+        "corrupted_images": 1,
+    }
+    assert image_counts[str(tmp_path / "day_2")] == {
+        "total_images": 1,
+        "empty_images": 1,
+    }
+
+
+def test_iter_corrupted_images_per_folder(tmp_path):
+    for day in range(10):
+        for i in range(5):
+            write(tmp_path / f"day_{day}" / f"{i}.jpg", VALID_JPEG)
+        write(tmp_path / f"day_{day}" / "bad.jpg", VALID_JPEG[:-2])
+    (tmp_path / "no_images").mkdir()
+
+    results = dict(iter_corrupted_images_per_folder(str(tmp_path), max_workers=4))
+
+    assert len(results) == 10
+    for counts in results.values():
+        assert counts == {"total_images": 6, "good_images": 5, "corrupted_images": 1}
+
+
+def test_iter_corrupted_images_per_folder_full_tier(tmp_path):
+    success, encoded_image = cv2.imencode(".jpg", np.full((8, 8, 3), 100, np.uint8))
+    write(tmp_path / "day_1" / "a.jpg", encoded_image.tobytes())
+    write(tmp_path / "day_1" / "b.jpg", VALID_JPEG)
+
+    results = dict(iter_corrupted_images_per_folder(str(tmp_path), "full"))
+
+    assert results[str(tmp_path / "day_1")] == {
+        "total_images": 2,
+        "good_images": 1,
+        "corrupted_images": 1,
+    }
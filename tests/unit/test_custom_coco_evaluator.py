@@ -0,0 +1,278 @@
+import numpy as np
+import pytest
+from pycocotools.coco import COCO
+from pycocotools.cocoeval import COCOeval
+
+from blurring_as_a_service.performace_evaluation_pipeline.metrics.custom_coco_evaluator import (
+    CustomCOCOeval,
+    EvalImgs,
+    greedyMatch,
+)
+
+
+def loop_greedy_match(ious, iouThrs, gtIg, iscrowd, gtIds, dtIds):
+    # The matching loop of pycocotools' COCOeval.evaluateImg.
+    T, D, G = len(iouThrs), len(dtIds), len(gtIds)
+    gtm, dtm, dtIg = np.zeros((T, G)), np.zeros((T, D)), np.zeros((T, D))
+    for tind, t in enumerate(iouThrs):
+        for dind in range(D):
+            iou = min([t, 1 - 1e-10])
+            m = -1
+            for gind in range(G):
+                if gtm[tind, gind] > 0 and not iscrowd[gind]:
+                    continue
+                if m > -1 and gtIg[m] == 0 and gtIg[gind] == 1:
+                    break
+                if ious[dind, gind] < iou:
+                    continue
+                iou = ious[dind, gind]
+                m = gind
+            if m == -1:
+                continue
+            dtIg[tind, dind] = gtIg[m]
+            dtm[tind, dind] = gtIds[m]
+            gtm[tind, m] = dtIds[dind]
+    return dtm, gtm, dtIg
+
+
+def random_coco(rng, n_images=12, n_categories=2):
+    images = [{"id": i, "width": 640, "height": 480} for i in range(1, n_images + 1)]
+    annotations, detections = [], []
+    for image in images:
+        for _ in range(rng.integers(0, 6)):
+            x, y = rng.uniform(0, 500), rng.uniform(0, 400)
+            w, h = rng.uniform(5, 140), rng.uniform(5, 80)
+            annotations.append(
+                {
+                    "id": len(annotations) + 1,
+                    "image_id": image["id"],
+                    "category_id": int(rng.integers(1, n_categories + 1)),
+                    "bbox": [x, y, w, h],
+                    "area": w * h,
+                    "iscrowd": int(rng.random() < 0.1),
+                }
+            )
+            for _ in range(rng.integers(0, 3)):
+                jitter = rng.normal(0, 6, size=4)
+                detections.append(
+                    {
+                        "image_id": image["id"],
+                        "category_id": annotations[-1]["category_id"],
+                        "bbox": [x + jitter[0], y + jitter[1], w, h],
+                        "score": float(rng.choice([0.3, 0.5, rng.random()])),
+                    }
+                )
+        for _ in range(rng.integers(0, 3)):
+            detections.append(
+                {
+                    "image_id": image["id"],
+                    "category_id": int(rng.integers(1, n_categories + 1)),
+                    "bbox": [rng.uniform(0, 500), rng.uniform(0, 400), 30, 30],
+                    "score": float(rng.random()),
+                }
+            )
+    categories = [{"id": i} for i in range(1, n_categories + 1)]
+    coco_gt = COCO()
+    coco_gt.dataset = {
+        "images": images,
+        "annotations": annotations,
+        "categories": categories,
+    }
+    coco_gt.createIndex()
+    return coco_gt, coco_gt.loadRes(detections)
+
+
+def run_pycocotools(coco_gt, coco_dt):
+    evaluation = COCOeval(coco_gt, coco_dt, "bbox")
+    evaluation.params.maxDets = CustomCOCOeval().params.maxDets
+    evaluation.evaluate()
+    evaluation.accumulate()
+    return evaluation
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_greedy_match_matches_loop(seed):
+    rng = np.random.default_rng(seed)
+    D, G = rng.integers(1, 8), rng.integers(1, 8)
+    # Rounded ious create ties, which are resolved like the loop does.
+    ious = np.round(rng.random((D, G)), 1)
+    gtIg = np.sort(rng.integers(0, 2, G))
+    iscrowd = rng.random(G) < 0.3
+    gtIds, dtIds = np.arange(1, G + 1), np.arange(1, D + 1)
+    iouThrs = np.linspace(0.5, 0.95, 10)
+
+    for actual, expected in zip(
+        greedyMatch(ious, iouThrs, gtIg, iscrowd, gtIds, dtIds),
+        loop_greedy_match(ious, iouThrs, gtIg, iscrowd, gtIds, dtIds),
+    ):
+        np.testing.assert_array_equal(actual, expected)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_evaluate_matches_pycocotools(seed):
+    coco_gt, coco_dt = random_coco(np.random.default_rng(seed))
+    expected = run_pycocotools(coco_gt, coco_dt)
+
+    evaluation = CustomCOCOeval(coco_gt, coco_dt, "bbox")
+    evaluation.evaluate()
+    evaluation.accumulate()
+
+    assert len(evaluation.evalImgs) == len(expected.evalImgs)
+    for actual, reference in zip(evaluation.evalImgs, expected.evalImgs):
+        if reference is None:
+            assert actual is None
+            continue
+        for key in ["dtIds", "gtIds", "dtScores"]:
+            assert list(actual[key]) == list(reference[key])
+        for key in ["dtMatches", "gtMatches", "gtIgnore", "dtIgnore"]:
+            np.testing.assert_array_equal(actual[key], reference[key])
+    for key in ["precision", "recall", "scores"]:
+        np.testing.assert_array_equal(evaluation.eval[key], expected.eval[key])
+
+
+def test_parallel_evaluate_matches_serial():
+    coco_gt, coco_dt = random_coco(np.random.default_rng(0), n_images=15)
+    serial = CustomCOCOeval(coco_gt, coco_dt, "bbox")
+    serial.evaluate()
+    serial.accumulate()
+    parallel = CustomCOCOeval(coco_gt, coco_dt, "bbox")
+    parallel.evaluate(max_workers=2)
+    parallel.accumulate()
+
+    assert parallel.ious.keys() == serial.ious.keys()
+    assert len(parallel.evalImgs) == len(serial.evalImgs)
+    for actual, expected in zip(parallel.evalImgs, serial.evalImgs):
+        if expected is None:
+            assert actual is None
+            continue
+        assert (actual["image_id"], actual["category_id"], actual["aRng"]) == (
+            expected["image_id"],
+            expected["category_id"],
+            expected["aRng"],
+        )
+        np.testing.assert_array_equal(actual["dtMatches"], expected["dtMatches"])
+    for key in ["precision", "recall", "scores"]:
+        np.testing.assert_array_equal(parallel.eval[key], serial.eval[key])
+
+
+def test_eval_imgs_subset_and_concatenate():
+    coco_gt, coco_dt = random_coco(np.random.default_rng(1))
+    evaluation = CustomCOCOeval(coco_gt, coco_dt, "bbox")
+    evaluation.evaluate()
+    evalImgs = evaluation.evalImgs
+    T = len(evaluation.params.iouThrs)
+    half = len(evalImgs) // 2
+
+    parts = [
+        evalImgs.subset(np.arange(half)),
+        evalImgs.subset(np.arange(half, len(evalImgs))),
+    ]
+    concatenated = EvalImgs.concatenate(parts, T)
+    rebuilt = EvalImgs.fromList(list(evalImgs), T)
+
+    assert len(concatenated) == len(rebuilt) == len(evalImgs)
+    for copy in (concatenated, rebuilt):
+        for actual, expected in zip(copy, evalImgs):
+            if expected is None:
+                assert actual is None
+                continue
+            assert actual["dtIds"] == expected["dtIds"]
+            np.testing.assert_array_equal(actual["dtIgnore"], expected["dtIgnore"])
+            np.testing.assert_array_equal(actual["gtMatches"], expected["gtMatches"])
+    maxDet = 1
+    positions = evalImgs.dtPositions(np.arange(len(evalImgs)), maxDet)
+    assert len(positions) == sum(
+        min(len(e["dtIds"]), maxDet) for e in evalImgs if e is not None
+    )
+
+
+def evaluate_and_accumulate(coco_gt, coco_dt, **params):
+    evaluation = CustomCOCOeval(coco_gt, coco_dt, "bbox")
+    for name, value in params.items():
+        setattr(evaluation.params, name, value)
+    evaluation.evaluate()
+    evaluation.accumulate()
+    return evaluation
+
+
+def test_evaluate_reuses_ious_across_parameter_sweeps(monkeypatch):
+    coco_gt, coco_dt = random_coco(np.random.default_rng(2))
+    evaluation = CustomCOCOeval(coco_gt, coco_dt, "bbox")
+    evaluation.evaluate()
+
+    def fail(imgId, catId):
+        raise AssertionError("ious computed again")
+
+    monkeypatch.setattr(evaluation, "computeIoU", fail)
+    sweep = {"areaRng": [[0, 1e10], [0, 50**2]], "areaRngLbl": ["all", "small"]}
+    sweep["maxDets"] = [1, 2]
+    for name, value in sweep.items():
+        setattr(evaluation.params, name, value)
+    evaluation.evaluate()
+    evaluation.accumulate()
+    monkeypatch.undo()
+
+    expected = evaluate_and_accumulate(coco_gt, coco_dt, **sweep)
+    for key in ["precision", "recall", "scores"]:
+        np.testing.assert_array_equal(evaluation.eval[key], expected.eval[key])
+
+    # more detections than cached need new ious
+    evaluation.params.maxDets = [10, 1000]
+    monkeypatch.setattr(evaluation, "computeIoU", fail)
+    with pytest.raises(AssertionError, match="ious computed again"):
+        evaluation.evaluate()
+
+
+@pytest.mark.parametrize("scoreThr", [0.4, {1: 0.2, 2: 0.6}])
+def test_accumulate_score_threshold_matches_filtered_detections(scoreThr):
+    coco_gt, coco_dt = random_coco(np.random.default_rng(3))
+    evaluation = evaluate_and_accumulate(coco_gt, coco_dt)
+    evaluation.accumulate(scoreThr=scoreThr)
+
+    def threshold(detection):
+        if isinstance(scoreThr, dict):
+            return scoreThr[detection["category_id"]]
+        return scoreThr
+
+    detections = [
+        {key: d[key] for key in ["image_id", "category_id", "bbox", "score"]}
+        for d in coco_dt.dataset["annotations"]
+        if d["score"] >= threshold(d)
+    ]
+    expected = evaluate_and_accumulate(coco_gt, coco_gt.loadRes(detections))
+    for key in ["precision", "recall", "scores"]:
+        np.testing.assert_array_equal(evaluation.eval[key], expected.eval[key])
+
+
+def test_evaluate_does_not_reuse_ious_of_replaced_detections():
+    coco_gt, _ = random_coco(np.random.default_rng(4))
+    detections_per_sweep = [
+        [
+            {key: d[key] for key in ["image_id", "category_id", "bbox", "score"]}
+            for d in random_coco(np.random.default_rng(seed))[1].dataset["annotations"]
+        ]
+        for seed in [4, 5, 6, 7]
+    ]
+    evaluation = CustomCOCOeval(coco_gt, None, "bbox")
+    for detections in detections_per_sweep:
+        # the replaced cocoDt is freed, so the new one can get the same id
+        evaluation.cocoDt = None
+        evaluation.cocoDt = coco_gt.loadRes(detections)
+        evaluation.evaluate()
+        evaluation.accumulate()
+
+        expected = evaluate_and_accumulate(coco_gt, coco_gt.loadRes(detections))
+        for key in ["precision", "recall", "scores"]:
+            np.testing.assert_array_equal(evaluation.eval[key], expected.eval[key])
+
+
+def test_evaluate_does_not_reuse_ious_of_other_pooled_categories():
+    coco_gt, coco_dt = random_coco(np.random.default_rng(7))
+    evaluation = evaluate_and_accumulate(coco_gt, coco_dt, useCats=0)
+    evaluation.params.catIds = [1]
+    evaluation.evaluate()
+    evaluation.accumulate()
+
+    expected = evaluate_and_accumulate(coco_gt, coco_dt, useCats=0, catIds=[1])
+    for key in ["precision", "recall", "scores"]:
+        np.testing.assert_array_equal(evaluation.eval[key], expected.eval[key])
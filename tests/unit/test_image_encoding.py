@@ -0,0 +1,28 @@
+import cv2
+import numpy as np
+
+from blurring_as_a_service.endpoint.source.image_encoding import (
+    downscale_image,
+    encode_jpeg,
+)
+
+
+def test_downscale_image_keeps_aspect_ratio():
+    image = np.zeros((4000, 8000, 3), dtype=np.uint8)
+    preview = downscale_image(image, max_size=1000)
+    assert preview.shape == (500, 1000, 3)
+
+
+def test_downscale_image_does_not_upscale():
+    image = np.zeros((400, 800, 3), dtype=np.uint8)
+    assert downscale_image(image, max_size=1000) is image
+
+
+def test_encode_jpeg_quality():
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 255, size=(200, 300, 3), dtype=np.uint8)
+    low_quality = encode_jpeg(image, quality=10)
+    high_quality = encode_jpeg(image, quality=95)
+    assert len(low_quality) < len(high_quality)
+    decoded = cv2.imdecode(np.frombuffer(low_quality, np.uint8), cv2.IMREAD_COLOR)
+    assert decoded.shape == image.shape
@@ -0,0 +1,98 @@
+import struct
+
+import cv2
+import numpy as np
+import pytest
+
+from blurring_as_a_service.check_corrupted_images.source.jpeg_validation import (
+    MISSING_DATA_MIN_ROWS,
+    ValidationCode,
+    ValidationTier,
+    decode_jpeg,
+    parse_jpeg_markers,
+    validate_jpeg,
+)
+
+
+@pytest.fixture
+def jpeg_bytes():
+    image = np.random.default_rng(0).integers(0, 255, (40, 60, 3), dtype=np.uint8)
+    success, encoded_image = cv2.imencode(".jpg", image)
+    assert success
+    return encoded_image.tobytes()
+
+
+def write(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def sof_offset(content):
+    return content.index(b"\xff\xc0")
+
+
+def test_valid_image_passes_all_tiers(tmp_path, jpeg_bytes):
+    path = write(tmp_path, "valid.jpg", jpeg_bytes)
+    for tier in ValidationTier:
+        assert validate_jpeg(path, tier) == ValidationCode.VALID
+    assert parse_jpeg_markers(path) == (ValidationCode.VALID, (60, 40))
+
+
+def test_cheap_tier_checks_soi(tmp_path, jpeg_bytes):
+    path = write(tmp_path, "no_soi.jpg", b"\x00\x00" + jpeg_bytes[2:])
+    assert validate_jpeg(path, "cheap") == ValidationCode.MISSING_SOI
+
+
+def test_medium_tier_detects_corrupt_header(tmp_path, jpeg_bytes):
+    # Overwrite the marker after the first segment so the segment chain breaks.
+    (app0_length,) = struct.unpack(">H", jpeg_bytes[4:6])
+    corrupt = bytearray(jpeg_bytes)
+    corrupt[4 + app0_length] = 0x00
+    path = write(tmp_path, "corrupt_header.jpg", bytes(corrupt))
+
+    assert validate_jpeg(path, "cheap") == ValidationCode.VALID
+    assert validate_jpeg(path, "medium") == ValidationCode.INVALID_STRUCTURE
+
+
+def test_medium_tier_detects_segment_overrun(tmp_path, jpeg_bytes):
+    corrupt = bytearray(jpeg_bytes)
+    corrupt[4:6] = struct.pack(">H", 0xFFFF)
+    path = write(tmp_path, "overrun.jpg", bytes(corrupt))
+    assert validate_jpeg(path, "medium") == ValidationCode.INVALID_STRUCTURE
+
+
+def test_medium_tier_detects_zero_dimensions(tmp_path, jpeg_bytes):
+    corrupt = bytearray(jpeg_bytes)
+    offset = sof_offset(jpeg_bytes)
+    corrupt[offset + 5 : offset + 7] = b"\x00\x00"
+    path = write(tmp_path, "zero_height.jpg", bytes(corrupt))
+    assert validate_jpeg(path, "medium") == ValidationCode.INVALID_DIMENSIONS
+
+
+@pytest.mark.parametrize("fraction", [0.3, 0.5, 0.7])
+def test_full_tier_detects_truncated_but_terminated(tmp_path, jpeg_bytes, fraction):
+    truncated = jpeg_bytes[: int(len(jpeg_bytes) * fraction)] + b"\xff\xd9"
+    path = write(tmp_path, "truncated.jpg", truncated)
+
+    assert validate_jpeg(path, "medium") == ValidationCode.VALID
+    assert validate_jpeg(path, "full") == ValidationCode.DECODE_FAILED
+
+
+def test_decode_jpeg_checks_dimensions(tmp_path, jpeg_bytes):
+    path = write(tmp_path, "valid.jpg", jpeg_bytes)
+    assert decode_jpeg(path, (60, 40)) == ValidationCode.VALID
+    assert decode_jpeg(path, (40, 60)) == ValidationCode.DECODE_FAILED
+
+
+def test_decode_jpeg_needs_several_grey_rows(tmp_path):
+    # A lossless format, so the decoded pixels are exactly the ones written.
+    image = np.random.default_rng(0).integers(0, 127, (40, 60, 3), dtype=np.uint8)
+    image[-1] = 128
+    path = str(tmp_path / "grey_bottom_row.png")
+    cv2.imwrite(path, image)
+    assert decode_jpeg(path) == ValidationCode.VALID
+
+    image[-MISSING_DATA_MIN_ROWS:] = 128
+    cv2.imwrite(path, image)
+    assert decode_jpeg(path) == ValidationCode.DECODE_FAILED
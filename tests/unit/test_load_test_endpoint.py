@@ -0,0 +1,159 @@
+import base64
+import json
+import socket
+
+import cv2
+import numpy as np
+import pytest
+
+from blurring_as_a_service.endpoint.load_test_endpoint import (
+    PayloadBuilder,
+    create_synthetic_images,
+    http_sender,
+    in_process_sender,
+    make_image_unique,
+    parse_image_sizes,
+    parse_request_mix,
+    plan_requests,
+    repeated_image_ratio,
+    run_load_test,
+    start_stand_in_server,
+)
+
+
+class FakeScore:
+    @staticmethod
+    def run(raw_data):
+        data = json.loads(raw_data)
+        if data.get("response_type") == "detections":
+            return json.dumps({"detections": {}}), 200
+        return json.dumps({"error": "busy"}), 503
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_parse_options():
+    assert parse_image_sizes("800x400,20X10") == [(800, 400), (20, 10)]
+    assert parse_request_mix("image:3,detections:1") == {
+        "image": 0.75,
+        "detections": 0.25,
+    }
+    with pytest.raises(ValueError):
+        parse_request_mix("unknown:1")
+
+
+def test_plan_requests_follows_request_mix():
+    requests = plan_requests({"detections": 1.0}, n_requests=5, n_images=1)
+    assert len(requests) == 5
+    build_payload = PayloadBuilder([b"jpeg"])
+    for request in requests:
+        assert request.request_type == "detections"
+        assert json.loads(build_payload(request))["response_type"] == "detections"
+
+
+def test_payload_builder_sends_unique_images():
+    requests = plan_requests({"detections": 1.0}, 10, n_images=2)
+    build_payload = PayloadBuilder([b"jpeg", b"png"])
+    images = [json.loads(build_payload(request))["data"] for request in requests]
+    assert len(set(images)) == 10
+    assert repeated_image_ratio(requests) == 0.0
+
+    requests = plan_requests({"detections": 1.0}, 10, n_images=1)
+    build_payload = PayloadBuilder([b"jpeg"], unique_images=False)
+    assert len({build_payload(request) for request in requests}) == 1
+    assert repeated_image_ratio(requests, unique_images=False) == 0.9
+
+
+def test_make_image_unique_keeps_jpeg_pixels():
+    image = np.random.default_rng(0).integers(0, 255, (16, 24, 3), dtype=np.uint8)
+    jpeg = cv2.imencode(".jpg", image)[1].tobytes()
+    build_payload = PayloadBuilder([jpeg])
+    unique = [
+        base64.b64decode(json.loads(build_payload(request))["data"])
+        for request in plan_requests({"detections": 1.0}, 2, n_images=1)
+    ]
+    assert unique[0] != unique[1]
+    for image_bytes in unique + [make_image_unique(jpeg, 7)]:
+        decoded = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        np.testing.assert_array_equal(
+            decoded, cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        )
+
+
+def test_synthetic_images_compress_like_natural_images():
+    (jpeg,) = create_synthetic_images([(800, 400)])
+    image = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+    assert image.shape == (400, 800, 3)
+    # White noise of this size encodes to about 375 kB.
+    assert len(jpeg) < 150_000
+
+
+def test_run_load_test_builds_payloads_lazily():
+    requests = plan_requests({"detections": 1.0}, 20, n_images=1)
+    in_flight, max_in_flight = [], []
+
+    def build_payload(request):
+        in_flight.append(request)
+        max_in_flight.append(len(in_flight))
+        return PayloadBuilder([b"jpeg"])(request)
+
+    def sender(payload):
+        in_flight.pop()
+        return 200
+
+    summary = run_load_test(
+        sender, requests, concurrency=1, build_payload=build_payload
+    )
+    assert summary["status_codes"] == {200: 20}
+    assert max(max_in_flight) == 1
+    assert "max_rss_increase_mb" in summary
+
+
+def test_run_load_test_records_failed_requests():
+    def flaky_sender(payload):
+        if json.loads(payload).get("response_type") != "detections":
+            raise ConnectionResetError
+        return 200
+
+    requests = plan_requests({"image": 0.5, "detections": 0.5}, 20, n_images=1)
+    summary = run_load_test(flaky_sender, requests, 4, PayloadBuilder([b"jpeg"]))
+    n_failed = sum(request.request_type == "image" for request in requests)
+    assert summary["requests"] == 20
+    assert summary["status_codes"] == {
+        k: v for k, v in {0: n_failed, 200: 20 - n_failed}.items() if v
+    }
+    assert summary["errors"] == ({"ConnectionResetError": n_failed} if n_failed else {})
+
+
+def test_run_load_test_in_process():
+    requests = plan_requests({"image": 0.5, "detections": 0.5}, 20, n_images=1)
+    summary = run_load_test(
+        in_process_sender(FakeScore), requests, 4, PayloadBuilder([b"jpeg"])
+    )
+    assert summary["requests"] == 20
+    assert sum(summary["status_codes"].values()) == 20
+    assert {"p50_ms", "p95_ms", "p99_ms", "throughput_rps"} <= set(summary)
+
+
+def test_run_load_test_over_stand_in_server():
+    port = free_port()
+    server = start_stand_in_server(FakeScore, port)
+    try:
+        requests = plan_requests({"image": 0.5, "detections": 0.5}, 10, n_images=1)
+        summary = run_load_test(
+            http_sender(f"http://127.0.0.1:{port}/score"),
+            requests,
+            2,
+            PayloadBuilder([b"jpeg"]),
+        )
+    finally:
+        server.shutdown()
+    expected_codes = {
+        200: sum(request.request_type == "detections" for request in requests),
+        503: sum(request.request_type == "image" for request in requests),
+    }
+    assert summary["status_codes"] == {k: v for k, v in expected_codes.items() if v}
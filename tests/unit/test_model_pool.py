@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+
+from blurring_as_a_service.endpoint.source.model_pool import (
+    Deadline,
+    ModelPool,
+    ModelPoolSaturatedError,
+    RequestDeadlineExceededError,
+)
+
+
+def test_replicas_are_created_once():
+    created = []
+
+    def model_factory():
+        created.append(object())
+        return created[-1]
+
+    pool = ModelPool(model_factory, n_replicas=2)
+    assert len(created) == 2
+    with pool.replica(Deadline(1)) as first, pool.replica(Deadline(1)) as second:
+        assert {id(first), id(second)} == {id(m) for m in created}
+
+
+def test_admission_rejects_when_saturated():
+    pool = ModelPool(object, n_replicas=1, max_queued_requests=1)
+    with pool.admit(), pool.admit():
+        with pytest.raises(ModelPoolSaturatedError):
+            with pool.admit():
+                pass
+    with pool.admit():
+        pass
+
+
+def test_waiting_for_replica_respects_deadline():
+    pool = ModelPool(object, n_replicas=1)
+    with pool.replica(Deadline(1)):
+        with pytest.raises(RequestDeadlineExceededError):
+            with pool.replica(Deadline(0.05)):
+                pass
+
+
+def test_replica_is_handed_over_when_released():
+    pool = ModelPool(object, n_replicas=1)
+    acquired = threading.Event()
+
+    def hold_replica():
+        with pool.replica(Deadline(1)):
+            acquired.set()
+            time.sleep(0.05)
+
+    thread = threading.Thread(target=hold_replica)
+    thread.start()
+    acquired.wait()
+    with pool.replica(Deadline(1)) as model:
+        assert model is not None
+    thread.join()
+
+
+def test_deadline():
+    assert not Deadline(0).expired()
+    assert Deadline(0).remaining() is None
+    deadline = Deadline(0.01)
+    time.sleep(0.02)
+    assert deadline.expired()
+    with pytest.raises(RequestDeadlineExceededError):
+        deadline.check("blurring")
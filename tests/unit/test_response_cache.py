@@ -0,0 +1,70 @@
+from unittest import mock
+
+from blurring_as_a_service.endpoint.source.response_cache import ResponseCache
+
+
+def detections():
+    return {
+        "boxes": [[10.0, 20.0, 30.0, 40.0]],
+        "classes": [0],
+        "scores": [0.9],
+        "sensitive_boxes": [[10.0, 20.0, 30.0, 40.0]],
+        "metadata": {"persons_count": 1, "licence_plates_count": 0},
+    }
+
+
+def test_make_key_depends_on_content():
+    assert ResponseCache.make_key(b"image") == ResponseCache.make_key(b"image")
+    assert ResponseCache.make_key(b"image") != ResponseCache.make_key(b"other")
+
+
+def test_hit_and_miss_counters():
+    cache = ResponseCache(max_bytes=10_000, store_images=True)
+    assert cache.get("key") is None
+    cache.put("key", detections(), b"jpeg")
+    entry = cache.get("key")
+    assert entry.detections == detections()
+    assert entry.encoded_image == b"jpeg"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_images_not_stored_unless_configured():
+    cache = ResponseCache(max_bytes=10_000, store_images=False)
+    cache.put("key", detections(), b"jpeg")
+    assert cache.get("key").encoded_image is None
+
+
+def test_disabled_cache():
+    cache = ResponseCache(max_bytes=0, store_images=True)
+    cache.put("key", detections(), b"jpeg")
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_on_byte_budget():
+    cache = ResponseCache(max_bytes=10_000, store_images=True)
+    cache.put("first", detections(), b"x" * 4000)
+    cache.put("second", detections(), b"x" * 4000)
+    cache.get("first")
+    cache.put("third", detections(), b"x" * 4000)
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.get("third") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size_bytes"] <= 10_000
+
+
+def test_entries_expire_after_ttl():
+    cache = ResponseCache(max_bytes=10_000, ttl_seconds=60)
+    with mock.patch(
+        "blurring_as_a_service.endpoint.source.response_cache.time.monotonic",
+        return_value=1000.0,
+    ):
+        cache.put("key", detections())
+    with mock.patch(
+        "blurring_as_a_service.endpoint.source.response_cache.time.monotonic",
+        return_value=1061.0,
+    ):
+        assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,98 @@
+import os
+
+from blurring_as_a_service.check_corrupted_images.source.count_corrupted_images_per_folder import (
+    iter_corrupted_images_per_folder,
+)
+from blurring_as_a_service.check_corrupted_images.source.jpeg_validation import (
+    ValidationCode,
+    ValidationTier,
+)
+from blurring_as_a_service.check_corrupted_images.source.scan_index import ScanIndex
+
+VALID_JPEG = b"\xff\xd8" + b"\x00" * 100 + b"\xff\xd9"
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return str(path)
+
+
+def index_path(tmp_path):
+    # The index is kept outside the scanned container.
+    return f"{tmp_path}_scan_index.csv"
+
+
+def scan(tmp_path, validation_tier="cheap"):
+    scan_index = ScanIndex.load(str(tmp_path), index_path(tmp_path))
+    results = dict(
+        iter_corrupted_images_per_folder(
+            str(tmp_path), validation_tier, scan_index=scan_index
+        )
+    )
+    scan_index.save()
+    return scan_index, results
+
+
+def test_only_new_or_changed_images_are_checked(tmp_path):
+    write(tmp_path / "day_1" / "a.jpg", VALID_JPEG)
+    b = write(tmp_path / "day_1" / "b.jpg", VALID_JPEG)
+    scan_index, results = scan(tmp_path)
+    assert scan_index.n_checked == 2
+    assert results[str(tmp_path / "day_1")]["checked_images"] == 2
+
+    write(tmp_path / "day_1" / "b.jpg", VALID_JPEG[:-2])
+    os.utime(b, ns=(1, 1))
+    write(tmp_path / "day_2" / "c.jpg", b"")
+    scan_index, results = scan(tmp_path)
+
+    assert scan_index.n_checked == 2
+    assert results[str(tmp_path / "day_1")] == {
+        "total_images": 2,
+        "good_images": 1,
+        "corrupted_images": 1,
+        "checked_images": 1,
+    }
+    assert results[str(tmp_path / "day_2")] == {
+        "total_images": 1,
+        "empty_images": 1,
+        "checked_images": 1,
+    }
+    assert sorted(
+        (d.path, d.previous_code, d.validation_code) for d in scan_index.deltas
+    ) == [
+        (
+            os.path.join("day_1", "b.jpg"),
+            ValidationCode.VALID,
+            ValidationCode.MISSING_EOI,
+        ),
+        (os.path.join("day_2", "c.jpg"), None, ValidationCode.EMPTY),
+    ]
+
+
+def test_more_thorough_tier_rechecks_valid_images(tmp_path):
+    write(tmp_path / "day_1" / "a.jpg", VALID_JPEG)
+    write(tmp_path / "day_1" / "b.jpg", b"")
+    scan(tmp_path, "cheap")
+
+    scan_index, _ = scan(tmp_path, "medium")
+
+    assert scan_index.n_checked == 1
+    assert scan_index.deltas[0].validation_code == ValidationCode.INVALID_STRUCTURE
+
+
+def test_removed_images(tmp_path):
+    write(tmp_path / "day_1" / "a.jpg", VALID_JPEG)
+    os.remove(write(tmp_path / "day_1" / "b.jpg", VALID_JPEG))
+    scan_index = ScanIndex.load(str(tmp_path), index_path(tmp_path))
+    stat_result = os.stat(tmp_path / "day_1" / "a.jpg")
+    scan_index.record(
+        str(tmp_path / "day_1" / "b.jpg"), stat_result, ValidationTier.CHEAP, 0
+    )
+    scan_index.save()
+
+    scan_index, _ = scan(tmp_path)
+
+    assert scan_index.removed_paths() == [os.path.join("day_1", "b.jpg")]
+    assert len(ScanIndex.load(str(tmp_path), index_path(tmp_path))) == 1
+    assert sorted(os.listdir(tmp_path)) == ["day_1"]
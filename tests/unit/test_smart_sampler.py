@@ -0,0 +1,145 @@
+from unittest import mock
+
+import pandas as pd
+
+from blurring_as_a_service.cleaning_pipeline.source.smart_sampler import SmartSampler
+
+
+def make_images_df():
+    rows = []
+    for date, n_images in [("2024-01-01_00_00_00", 40), ("2024-01-02_00_00_00", 3)]:
+        for i in range(n_images):
+            rows.append(
+                {
+                    "image_upload_date": date,
+                    "image_filename": f"{date}_{i}.jpg",
+                    "count": 1 + i % 30,
+                }
+            )
+    df, _ = SmartSampler._categorize_images_into_bins(pd.DataFrame(rows))
+    return df
+
+
+def test_sample_images_equally_from_bins_quotas():
+    df = make_images_df()
+
+    sampled = SmartSampler._sample_images_equally_from_bins(df, 0.25, seed=0)
+
+    per_date = sampled.groupby("image_upload_date").size().to_dict()
+    # 25% of 40 images, and at least one image for the day with 3 images.
+    assert per_date == {"2024-01-01_00_00_00": 10, "2024-01-02_00_00_00": 1}
+    per_bin = sampled[sampled["image_upload_date"] == "2024-01-01_00_00_00"]
+    per_bin_counts = per_bin.groupby("bin_label", observed=True).size()
+    assert per_bin_counts.max() - per_bin_counts.min() <= 1
+    assert not sampled["image_filename"].duplicated().any()
+
+
+def test_sample_images_equally_from_bins_is_reproducible():
+    df = make_images_df()
+
+    first = SmartSampler._sample_images_equally_from_bins(df, 0.5, seed=42)
+    second = SmartSampler._sample_images_equally_from_bins(df, 0.5, seed=42)
+
+    assert first["image_filename"].tolist() == second["image_filename"].tolist()
+
+
+def test_get_n_random_images_per_date_is_reproducible():
+    grouped_images = {"2024-01-01_00_00_00": [f"{i}.jpg" for i in range(20)]}
+
+    first = SmartSampler._get_n_random_images_per_date(grouped_images, 5, seed=1)
+    second = SmartSampler._get_n_random_images_per_date(grouped_images, 5, seed=1)
+
+    assert first == second
+    assert len(first["2024-01-01_00_00_00"]) == 5
+
+
+def test_sample_images_for_retraining_bins_per_date():
+    df = pd.DataFrame(
+        {
+            "image_upload_date": ["2024-01-01_00_00_00"] * 4 + ["2024-01-02_00_00_00"],
+            "image_filename": ["a.jpg", "b.jpg", "c.jpg", "d.jpg", "e.jpg"],
+            "count": [1, 2, 50, 60, 500],
+        }
+    )
+    smart_sampler = SmartSampler(
+        "input",
+        "quality_check",
+        "retraining",
+        "{}",
+        "customer",
+        {"sampling_ratio": 100, "seed": 0},
+    )
+
+    with (
+        mock.patch.object(
+            SmartSampler, "_collect_images_above_threshold_from_db", return_value=df
+        ),
+        mock.patch(
+            "blurring_as_a_service.cleaning_pipeline.source.smart_sampler.copy_files"
+        ) as copy_files,
+    ):
+        smart_sampler.sample_images_for_retraining({})
+
+    copied = sorted(copy_files.call_args.args[0])
+    assert copied == [
+        "2024-01-01_00_00_00/a.jpg",
+        "2024-01-01_00_00_00/b.jpg",
+        "2024-01-01_00_00_00/c.jpg",
+        "2024-01-01_00_00_00/d.jpg",
+        "2024-01-02_00_00_00/e.jpg",
+    ]
+
+
+def test_images_by_date_to_dataframe():
+    df = SmartSampler._images_by_date_to_dataframe(
+        {"2024-01-01_00_00_00": ["a.jpg", "b.jpg"], "2024-01-02_00_00_00": ["c.jpg"]}
+    )
+
+    assert df.values.tolist() == [
+        ["2024-01-01_00_00_00", "a.jpg"],
+        ["2024-01-01_00_00_00", "b.jpg"],
+        ["2024-01-02_00_00_00", "c.jpg"],
+    ]
+
+
+def test_restrict_to_images_in_folders():
+    results = pd.DataFrame(
+        {
+            "image_filename": [
+                "2024-01-01_00_00_00/a.jpg",
+                "2024-01-02_00_00_00/sub/c.jpg",
+                "2024-01-01_00_00_00/deleted.jpg",
+            ],
+            "count": [3, 1, 2],
+        }
+    )
+
+    df = SmartSampler._restrict_to_images_in_folders(
+        results,
+        {
+            "2024-01-01_00_00_00": ["a.jpg", "b.jpg"],
+            "2024-01-02_00_00_00": ["sub/c.jpg"],
+        },
+    )
+
+    assert df.values.tolist() == [
+        ["2024-01-01_00_00_00", "a.jpg", 3],
+        ["2024-01-02_00_00_00", "sub/c.jpg", 1],
+    ]
+
+
+def test_categorize_images_into_bins_with_equal_counts():
+    df = pd.DataFrame(
+        {
+            "image_upload_date": ["2024-01-01_00_00_00"] * 2,
+            "image_filename": ["a.jpg", "b.jpg"],
+            "count": [3, 3],
+        }
+    )
+
+    df, bin_counts = SmartSampler._categorize_images_into_bins(df)
+
+    assert list(bin_counts) == ["3-3"]
+    assert df["bin_label"].tolist() == ["3-3", "3-3"]
+    sampled = SmartSampler._sample_images_equally_from_bins(df, 1.0, seed=0)
+    assert sorted(sampled["image_filename"]) == ["a.jpg", "b.jpg"]
@@ -0,0 +1,81 @@
+import json
+
+import numpy as np
+import pytest
+
+from blurring_as_a_service.performace_evaluation_pipeline.metrics import (
+    tagged_validation,
+)
+from blurring_as_a_service.performace_evaluation_pipeline.metrics.tagged_validation import (
+    load_tagged_validation,
+)
+
+
+def write_tagged_validation(folder, name, content):
+    with open(folder / name, "w") as f:
+        json.dump(content, f)
+
+
+def test_load_tagged_validation(tmp_path):
+    write_tagged_validation(
+        tmp_path,
+        "a.json",
+        {
+            "GT_boxes": [[0.1, 0.2, 0.3, 0.4], [0.5, 0.5, 0.1, 0.1]],
+            "GT_labels": [0, 3],
+            "TP_labels": [1, 0],
+            "Pred_boxes": [[0.1, 0.2, 0.3, 0.4]],
+        },
+    )
+    write_tagged_validation(
+        tmp_path, "b.json", {"GT_boxes": [], "GT_labels": [], "TP_labels": []}
+    )
+
+    loaded = load_tagged_validation(str(tmp_path), max_workers=2)
+
+    assert len(loaded) == 2
+    assert loaded.filenames == ["a.json", "b.json"]
+    np.testing.assert_array_equal(loaded.gt_labels, [0, 3])
+    np.testing.assert_array_equal(loaded.tp_labels, [True, False])
+    np.testing.assert_array_equal(loaded.file_index, [0, 0])
+    np.testing.assert_allclose(loaded.gt_boxes[1], [0.5, 0.5, 0.1, 0.1])
+    np.testing.assert_allclose(loaded.get_pred_boxes(0), [[0.1, 0.2, 0.3, 0.4]])
+    assert loaded.get_pred_boxes(1).shape == (0, 4)
+
+
+def test_load_tagged_validation_rejects_malformed_files(tmp_path):
+    write_tagged_validation(
+        tmp_path,
+        "a.json",
+        {"GT_boxes": [[0.1, 0.2, 0.3, 0.4]], "GT_labels": [0, 1], "TP_labels": [1]},
+    )
+    with pytest.raises(Exception, match="not well formed"):
+        load_tagged_validation(str(tmp_path))
+
+
+def test_load_tagged_validation_cache(tmp_path, monkeypatch):
+    content = {
+        "GT_boxes": [[0.1, 0.2, 0.3, 0.4]],
+        "GT_labels": [2],
+        "TP_labels": [0],
+        "Pred_boxes": [[0.1, 0.2, 0.3, 0.4], [0.5, 0.5, 0.1, 0.1]],
+    }
+    write_tagged_validation(tmp_path, "a.json", content)
+    cache_path = str(tmp_path / "cache.npz")
+    loaded = load_tagged_validation(str(tmp_path), cache_path=cache_path)
+
+    def fail(path):
+        raise AssertionError(f"{path} parsed although it is cached")
+
+    monkeypatch.setattr(tagged_validation, "_read_json", fail)
+    cached = load_tagged_validation(str(tmp_path), cache_path=cache_path)
+    assert cached.filenames == loaded.filenames == ["a.json"]
+    np.testing.assert_array_equal(cached.gt_labels, loaded.gt_labels)
+    np.testing.assert_array_equal(cached.pred_boxes, loaded.pred_boxes)
+    np.testing.assert_array_equal(cached.pred_offsets, [0, 2])
+
+    write_tagged_validation(tmp_path, "b.json", content)
+    with pytest.raises(AssertionError, match="parsed although it is cached"):
+        load_tagged_validation(str(tmp_path), cache_path=cache_path)
+    monkeypatch.undo()
+    assert len(load_tagged_validation(str(tmp_path), cache_path=cache_path)) == 2
@@ -0,0 +1,91 @@
+import csv
+
+from blurring_as_a_service.pre_inference_pipeline.source.workload_splitter import (
+    WorkloadSplitter,
+)
+
+VALID_JPEG = b"\xff\xd8" + b"\x00" * 100 + b"\xff\xd9"
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+
+
+def read_batches(output_folder):
+    return {
+        path.name: path.read_text().splitlines()
+        for path in sorted(output_folder.glob("*.txt"))
+    }
+
+
+def test_create_batches_quarantines_corrupted_images(tmp_path):
+    data_folder, output_folder = tmp_path / "data", tmp_path / "output"
+    output_folder.mkdir()
+    write(data_folder / "folder_1" / "img1.jpg", VALID_JPEG)
+    write(data_folder / "folder_1" / "img2.jpg", VALID_JPEG[:-2])
+    write(data_folder / "folder_2" / "img3.jpg", b"")
+    write(data_folder / "folder_2" / "img4.jpg", VALID_JPEG)
+
+    WorkloadSplitter.create_batches(
+        data_folder=str(data_folder),
+        datastore_input_path="input",
+        number_of_batches=1,
+        exclude_file="",
+        output_folder=str(output_folder),
+        execution_time="2024-01-01_00_00_00",
+        quarantine_corrupted_images=True,
+    )
+
+    batch = read_batches(output_folder)["2024-01-01_00_00_00_batch_0.txt"]
+    assert sorted(batch) == ["input/folder_1/img1.jpg", "input/folder_2/img4.jpg"]
+    with open(output_folder / "2024-01-01_00_00_00_quarantine.csv") as f:
+        quarantined = sorted(tuple(row.values()) for row in csv.DictReader(f))
+    assert quarantined == [
+        ("input/folder_1/img2.jpg", "missing_eoi"),
+        ("input/folder_2/img3.jpg", "empty"),
+    ]
+
+
+def test_create_batches_quarantine_keeps_other_formats(tmp_path):
+    data_folder, output_folder = tmp_path / "data", tmp_path / "output"
+    output_folder.mkdir()
+    write(data_folder / "folder_1" / "img1.png", b"\x89PNG\r\n\x1a\n" + b"\x00" * 100)
+    write(data_folder / "folder_1" / "img2.JPG", VALID_JPEG)
+    write(data_folder / "folder_1" / "img3.jpeg", VALID_JPEG[:-2])
+
+    WorkloadSplitter.create_batches(
+        data_folder=str(data_folder),
+        datastore_input_path="input",
+        number_of_batches=1,
+        exclude_file="",
+        output_folder=str(output_folder),
+        execution_time="2024-01-01_00_00_00",
+        quarantine_corrupted_images=True,
+    )
+
+    batch = read_batches(output_folder)["2024-01-01_00_00_00_batch_0.txt"]
+    assert sorted(batch) == ["input/folder_1/img1.png", "input/folder_1/img2.JPG"]
+    with open(output_folder / "2024-01-01_00_00_00_quarantine.csv") as f:
+        quarantined = [tuple(row.values()) for row in csv.DictReader(f)]
+    assert quarantined == [("input/folder_1/img3.jpeg", "missing_eoi")]
+
+
+def test_create_batches_without_quarantine(tmp_path):
+    data_folder, output_folder = tmp_path / "data", tmp_path / "output"
+    output_folder.mkdir()
+    write(data_folder / "folder_1" / "img1.jpg", VALID_JPEG)
+    write(data_folder / "folder_1" / "img2.jpg", b"")
+
+    WorkloadSplitter.create_batches(
+        data_folder=str(data_folder),
+        datastore_input_path="input",
+        number_of_batches=1,
+        exclude_file="",
+        output_folder=str(output_folder),
+        execution_time="2024-01-01_00_00_00",
+    )
+
+    batch = read_batches(output_folder)["2024-01-01_00_00_00_batch_0.txt"]
+    assert sorted(batch) == ["input/folder_1/img1.jpg", "input/folder_1/img2.jpg"]
+    assert not list(output_folder.glob("*.csv"))